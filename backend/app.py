@@ -1,47 +1,245 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Blueprint, current_app, jsonify, request, send_from_directory, Response, g
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 from dotenv import load_dotenv
 import uuid
 import json
+import threading
+import functools
 
 # 서비스 모듈 가져오기
-from services.gemini_service import extract_characters_from_text, analyze_novel_structure
-from services.text_storage_service import save_processed_text, get_processed_text_path, get_metadata, save_metadata, save_character_analysis, save_novel_structure_analysis
-from services.text_storage_service import BASE_STORAGE_PATH, NOVELS_ORIGINAL_FOLDER, CHARACTER_ANALYSIS_FOLDER, NOVELS_PROCESSED_FOLDER, METADATA_FILE
+from services.gemini_service import aextract_characters_from_text, aanalyze_novel_structure, warm_up_model_clients
+from services.async_runtime import async_runtime
+from services.rate_governor import gemini_rate_governor
+from services.gemini_model_pool import gemini_model_pool
+from services.matching_cache import matching_cache
+from services.text_index_service import index_path_for
+from services.text_storage_service import save_uploaded_text_stream, get_processed_text_path, open_text_reader, get_metadata, save_metadata, save_character_analysis, save_novel_structure_analysis
+from services.text_storage_service import BASE_STORAGE_PATH, NOVELS_ORIGINAL_FOLDER, CHARACTER_ANALYSIS_FOLDER, NOVELS_PROCESSED_FOLDER, METADATA_FILE, ensure_storage
 # 매칭 서비스 모듈 가져오기 (voice_actor_service 기능 포함)
 from services.matching_service import match_characters_with_voices, load_matching_result, load_voice_actors
-from services.matching_service import NOVELS_MATCHED_PATH, BASE_PATH
+from services.matching_service import NOVELS_MATCHED_PATH, BASE_PATH, update_story_segment
 # ElevenLabs 서비스 모듈 가져오기
-from services.elevenlabs_service import get_available_voices, generate_audiobook_segment, generate_complete_audiobook, check_generation_status, AUDIO_OUTPUT_FOLDER, ELEVENLABS_API_KEY, check_api_key
+# 분석 파이프라인 (등장인물/구조 분석 동시 실행)
+from services.pipeline_service import run_analysis_pipeline
+# 챕터 단위 처리 (챕터별 구조 분석/오디오 폴더/상태)
+from services.chapter_service import detect_chapters, get_chapters, start_chapter_pipeline, is_chapter_pipeline_running, chapter_audio_dir
+from services.chapter_service import chapter_audio_key, chapter_structure_filename
+from services.recast_service import recast_characters
+from services.audio_blob_store import audio_blob_store
+from services.segment_pack import get_pack_reader, compact_all
+from services.metrics import metrics_registry, cache_collector
+from services.tracing import trace_store
+from services.job_store import job_store, JobAlreadyRunningError
+from services.work_queue import work_queue, WORK_QUEUE_ENABLED
+from services.synthesis_scheduler import AdmissionRejectedError, bind_schedule, reset_schedule
+from services.request_profiler import request_profiler, is_admin_request
+from services.elevenlabs_service import aget_available_voices, generate_audiobook_segment, generate_complete_audiobook, check_generation_status, AUDIO_OUTPUT_FOLDER, ELEVENLABS_API_KEY, check_api_key
+from services.elevenlabs_service import validate_character_voice_map, voice_registry, regenerate_segment, synthesis_scheduler
 
 # 환경 변수 로드
 load_dotenv()
 
-# Flask 앱 초기화
-app = Flask(__name__)
-# CORS 설정 수정
-CORS(app, resources={
-    r"/api/*": {
-        "origins": "http://localhost:5173", # 프론트엔드 주소 명시
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "supports_credentials": True
-    }
-})
-
 # 파일 업로드 설정
 ALLOWED_EXTENSIONS = {'txt'}
-MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
+# 장편 연재물 전체를 한 파일로 올릴 수 있도록 한도를 높임 (업로드는 청크 단위로 디스크에 스트리밍)
+MAX_CONTENT_LENGTH = int(os.getenv('MAX_UPLOAD_MB', 200)) * 1024 * 1024  # 기본 200MB
+# 소설 범위 조회 한 번에 반환하는 최대 문단/문장 수 (요청한 범위가 더 크면 잘라서 반환)
+TEXT_RANGE_MAX_ITEMS = int(os.getenv('TEXT_RANGE_MAX_ITEMS', 200))
+
+# 앞단 리버스 프록시 수. 0보다 크면 그 수만큼의 X-Forwarded-For 값을 믿고 실제 클라이언트 주소를 복원 (ProxyFix)
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 0))
+# 인증 프록시가 로그인한 사용자 ID를 넣어 주는 헤더 (예: X-Forwarded-User). 합성 스케줄러의 사용자 구분에 사용.
+# 클라이언트가 직접 보낸 값을 믿지 않도록 TRUSTED_PROXY_HOPS가 설정된 경우에만 사용
+TENANT_HEADER = os.getenv('TENANT_HEADER', '')
+
+# 모든 API 라우트 (create_app에서 앱에 등록)
+api = Blueprint('api', __name__)
+
+_process_services_started = False
+_process_services_lock = threading.Lock()
+_default_app = None
+
+
+def _collect_gemini_quota():
+    """Gemini 할당량 윈도우 사용량 (포화 여부 확인용)"""
+    stats = gemini_rate_governor.get_stats()
+    return [
+        ("gemini_quota_requests_in_window", "gauge", "최근 1분 동안 예약된 Gemini 요청 수", [({}, stats["requests_in_window"])]),
+        ("gemini_quota_tokens_in_window", "gauge", "최근 1분 동안 예약된 Gemini 토큰 수", [({}, stats["tokens_in_window"])]),
+        ("gemini_quota_rpm_limit", "gauge", "Gemini 분당 요청 수 한도", [({}, stats["rpm_limit"])]),
+        ("gemini_quota_tpm_limit", "gauge", "Gemini 분당 토큰 수 한도", [({}, stats["tpm_limit"])]),
+    ]
+
+
+def start_process_services():
+    """
+    프로세스당 한 번만 실행하는 초기화 (지표 수집 함수 등록, 백그라운드 스레드 시작).
+    워커 프로세스마다 호출해야 하므로 fork 이후(create_app 안)에서 실행합니다.
+    """
+    global _process_services_started
+    with _process_services_lock:
+        if _process_services_started:
+            return
+        _process_services_started = True
+
+    # /metrics 조회 시점에 기존 통계를 지표로 변환
+    metrics_registry.register_collector(cache_collector("matching", matching_cache.get_stats))
+    metrics_registry.register_collector(cache_collector("voices", lambda: voice_registry.stats, hit_keys=("hits", "stale_hits")))
+    metrics_registry.register_collector(_collect_gemini_quota)
+
+    # 자주 사용하는 Gemini 모델 클라이언트 예열 (google.generativeai import가 느리므로 요청 처리와 별도로 백그라운드에서)
+    threading.Thread(target=warm_up_model_clients, name="gemini-warm-up", daemon=True).start()
+
+    # ElevenLabs 음성 목록 주기적 백그라운드 갱신
+    if ELEVENLABS_API_KEY:
+        voice_registry.start_background_refresh()
+
+    # 오디오 저장소: 기존 audio_output 폴더를 내용 해시 저장소로 이전한 뒤 주기적으로 GC
+    audio_blob_store.start_background_gc(migrate_root=AUDIO_OUTPUT_FOLDER)
+
+
+class AudiobookFlask(Flask):
+    """
+    async 뷰를 asgiref(요청마다 새 이벤트 루프) 대신 프로세스 공유 이벤트 루프(async_runtime)에서 실행하는 Flask.
+    서비스 계층의 HTTP 클라이언트 / 동시성 제한이 같은 루프에 있으므로 뷰에서 바로 await 할 수 있습니다.
+    """
+
+    def async_to_sync(self, func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            return async_runtime.run(func(*args, **kwargs))
+        return run
+
+
+def _read_text_file(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def create_app(config=None, start_services=True):
+    """
+    Flask 앱을 만듭니다.
+
+    Args:
+        config (dict, optional): app.config에 덮어쓸 설정
+        start_services (bool, optional): 백그라운드 스레드(모델 예열, 음성 목록 갱신, 오디오 GC)를 시작할지 여부.
+                                         테스트나 일회성 스크립트에서는 False로 두면 요청 처리에 필요한 것만 준비합니다.
+
+    Returns:
+        Flask: 라우트가 등록된 앱
+    """
+    ensure_storage()
+
+    app = AudiobookFlask(__name__)
+    # CORS 설정 수정
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": "http://localhost:5173", # 프론트엔드 주소 명시
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "X-Tenant-Id", "X-Priority"],
+            "supports_credentials": True
+        }
+    })
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    if config:
+        app.config.update(config)
+    if TRUSTED_PROXY_HOPS > 0:
+        # 프록시 뒤에서 모든 요청이 프록시 주소(한 사용자)로 보이지 않도록 실제 클라이언트 주소를 복원
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS, x_host=TRUSTED_PROXY_HOPS)
+
+    # 요청 프로파일링 (X-Profile 헤더 또는 PROFILE_SAMPLE_RATE 비율의 요청만)
+    request_profiler.init_app(app)
+    app.register_blueprint(api)
+
+    if start_services:
+        start_process_services()
+    return app
+
+
+def __getattr__(name):
+    # "from app import app" / "gunicorn app:app" 호환: 처음 접근할 때 기본 앱을 만듦
+    global _default_app
+    if name == "app":
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@api.before_request
+def bind_request_schedule():
+    # 합성 스케줄러의 사용자(공정 분배 단위)는 인증 프록시가 넣어 준 사용자 ID, 없으면 (ProxyFix로 복원한) 클라이언트 주소.
+    # 우선순위 등급은 서버가 작업 종류 / 세그먼트 수로 결정.
+    # 클라이언트가 보낸 값은 믿지 않고, 관리자 요청만 헤더로 사용자와 등급을 지정할 수 있음
+    tenant, priority = _request_tenant(), None
+    if is_admin_request(request):
+        tenant = request.headers.get('X-Tenant-Id') or tenant
+        priority = request.headers.get('X-Priority') or request.args.get('priority')
+    g.schedule_token = bind_schedule(tenant, priority)
+
+
+def _request_tenant():
+    if TENANT_HEADER and TRUSTED_PROXY_HOPS > 0:
+        user_id = request.headers.get(TENANT_HEADER)
+        if user_id:
+            return f"user:{user_id}"
+    return request.remote_addr
+
+
+@api.teardown_request
+def reset_request_schedule(exc):
+    token = g.pop('schedule_token', None)
+    if token is not None:
+        reset_schedule(token)
+
+
+@api.errorhandler(AdmissionRejectedError)
+def admission_rejected(error):
+    # 합성 대기량이 상한을 넘은 경우 (입장 제어). 잠시 후 다시 시도하도록 Retry-After를 붙임
+    response = jsonify({"error": str(error), "priority": error.priority, "retry_after": error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+@api.errorhandler(JobAlreadyRunningError)
+def job_already_running(error):
+    # 같은 소설의 같은 작업이 (다른 워커 프로세스에서라도) 이미 실행 중인 경우
+    return jsonify({"error": str(error), "job": error.job}), 409
+
+
+def _json_object_body():
+    """
+    요청 본문의 JSON 객체를 반환합니다. 본문이 없거나 JSON 요청이 아니면 빈 dict,
+    JSON이 깨졌거나 객체가 아니면(리스트, 숫자 등) None을 반환합니다.
+    """
+    if not request.is_json or not request.get_data(cache=True):
+        return {}
+    body = request.get_json(silent=True)
+    return body if isinstance(body, dict) else None
+
 
-app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+def _segment_edit_error(body):
+    """세그먼트 수정 내용의 타입을 검사합니다. 문제가 없으면 None, 있으면 오류 메시지."""
+    for field in ("text", "speaker"):
+        if field in body and not (isinstance(body[field], str) and body[field].strip()):
+            return f"{field}는 비어 있지 않은 문자열이어야 합니다."
+    for field in ("emotion", "tone", "voice_id"):
+        if field in body and not isinstance(body[field], str):
+            return f"{field}는 문자열이어야 합니다."
+    if "expression_level" in body:
+        level = body["expression_level"]
+        if isinstance(level, bool) or not isinstance(level, (int, float)) or not 0 <= level <= 1:
+            return "expression_level은 0에서 1 사이의 숫자여야 합니다."
+    return None
 
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@app.route('/', methods=['GET'])
+@api.route('/', methods=['GET'])
 def root():
     """
     루트 경로 - API 정보 제공
@@ -57,10 +255,11 @@ def root():
             '/api/processed_texts/<file_id>': 'Get a specific processed text file',
             '/api/metadata': 'Get all processed texts metadata',
             '/api/metadata/<file_id>': 'Get metadata for a specific processed text',
+            '/api/pipeline/<file_id>': 'Run character/structure analysis and voice matching in one call',
         }
     })
 
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     """
     서버 상태 확인용 엔드포인트
@@ -74,19 +273,144 @@ def health_check():
         'environment': os.getenv('FLASK_ENV', 'development'),
         'api_keys': {
             'google': 'configured' if gemini_api_key_present else 'missing'
-        }
+        },
+        # Gemini 할당량 사용 현황 (대기 시간과 모델 지연을 분리하여 집계)
+        'gemini_quota': gemini_rate_governor.get_stats(),
+        # 풀에 있는 모델 클라이언트별 지연 통계
+        'gemini_clients': gemini_model_pool.get_stats(),
+        # 등장인물-성우 매칭 캐시 적중 현황
+        'matching_cache': matching_cache.get_stats(),
+        # 공유 이벤트 루프의 외부 HTTP 호출 현황 (진행 중 / 최대 동시 호출 수)
+        'async_runtime': async_runtime.get_stats(),
+        # 합성 스케줄러: 우선순위 등급별 대기 요청 수, 평균/최대 슬롯 대기 시간, 입장 제어 현황
+        'scheduler': synthesis_scheduler.get_stats(),
+        # 분산 작업 큐 현황 (항목 상태별 개수, 임대 중인 워커). WORK_QUEUE_ENABLED일 때만
+        'work_queue': work_queue.get_stats() if WORK_QUEUE_ENABLED else {'enabled': False}
     })
 
-@app.route('/api/extract_characters', methods=['POST'])
-def extract_characters_route():
+@api.route('/metrics', methods=['GET'])
+def metrics_route():
+    """
+    Prometheus 형식 지표 (외부 API 지연/429, 대기 시간, 세그먼트 처리량, 캐시 적중률, 진행 중인 작업 수)
+    """
+    return Response(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@api.route('/api/traces', methods=['GET'])
+def list_traces_route():
+    """
+    작업 타임라인 트레이스 목록 (최신순, 진행 중인 작업 포함).
+
+    쿼리 파라미터 (선택적):
+    - file_id (str): 해당 소설의 작업만 조회
+    """
+    return jsonify({"traces": trace_store.list(request.args.get('file_id'))}), 200
+
+@api.route('/api/traces/<trace_id>', methods=['GET'])
+def download_trace_route(trace_id):
+    """
+    작업 타임라인을 Chrome 트레이스 JSON으로 내려받습니다. chrome://tracing 또는 ui.perfetto.dev에서 엽니다.
+    진행 중인 작업은 현재까지 기록된 구간만 포함합니다.
+    """
+    trace = trace_store.get_chrome_trace(trace_id)
+    if trace is None:
+        return jsonify({"error": f"트레이스 '{trace_id}'를 찾을 수 없습니다."}), 404
+    return Response(
+        json.dumps(trace, ensure_ascii=False),
+        content_type="application/json; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{trace_id}.json"'}
+    )
+
+@api.route('/api/jobs', methods=['GET'])
+def list_jobs_route():
+    """
+    최근 작업 목록 (최신순). 모든 워커 프로세스의 작업과 진행률을 함께 보여 줍니다.
+
+    쿼리 파라미터 (선택적):
+    - file_id (str): 해당 소설의 작업만 조회
+    - limit (int): 최대 개수 (기본 50)
+    """
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    return jsonify({"jobs": job_store.list_jobs(request.args.get('file_id'), limit)}), 200
+
+@api.route('/api/admin/profiles', methods=['GET'])
+def get_request_profiles_route():
+    """
+    요청 프로파일링 현황 (설정, 라우트별 집계, 최근 프로파일링한 요청).
+    관리자 요청만 허용 (X-Admin-Token 헤더가 ADMIN_TOKEN과 일치하는 요청. ADMIN_ALLOW_LOCAL=true면 토큰 없이 로컬 요청도 허용).
+    """
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    return jsonify(request_profiler.get_summary()), 200
+
+@api.route('/api/admin/profiles/collapsed', methods=['GET'])
+def get_collapsed_stacks_route():
+    """
+    스택 샘플링 결과를 접힌 스택 형식으로 반환합니다. (flamegraph.pl / speedscope 입력)
+
+    쿼리 파라미터 (선택적):
+    - route (str): "GET /api/audiobook/status/<file_id>" 형식의 라우트만 조회
+    """
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    return Response(request_profiler.collapsed_stacks(request.args.get('route')), content_type="text/plain; charset=utf-8")
+
+@api.route('/api/admin/profiles/pstats', methods=['GET'])
+def get_pstats_report_route():
+    """
+    cProfile 방식으로 프로파일링한 요청의 라우트별 함수 통계.
+
+    쿼리 파라미터 (선택적):
+    - route (str): 조회할 라우트
+    - sort (str): 정렬 기준 (cumulative, tottime, calls 등. 기본 cumulative)
+    - limit (int): 라우트별 출력할 함수 수 (기본 50)
     """
-    소설 텍스트에서 등장인물 정보를 추출하는 엔드포인트.
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    try:
+        report = request_profiler.pstats_report(request.args.get('route'), request.args.get('sort', 'cumulative'),
+                                                request.args.get('limit', 50, type=int))
+    except KeyError as e:
+        return jsonify({"error": f"지원하지 않는 정렬 기준입니다: {e}"}), 400
+    return Response(report, content_type="text/plain; charset=utf-8")
+
+@api.route('/api/admin/profiles/config', methods=['POST'])
+def configure_request_profiler_route():
+    """
+    프로파일링 설정을 실행 중에 변경합니다.
+
+    요청 본문 (선택적):
+    - sample_rate (float): 무작위로 프로파일링할 요청 비율 (0~1, 0이면 헤더로 요청한 경우만)
+    - mode (str): "sample" 또는 "cprofile"
+    - interval_seconds (float): 스택 샘플링 간격
+    """
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    body = request.json if request.is_json else {}
+    try:
+        config = request_profiler.configure(body.get('sample_rate'), body.get('mode'), body.get('interval_seconds'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(config), 200
+
+@api.route('/api/admin/profiles', methods=['DELETE'])
+def reset_request_profiles_route():
+    """집계된 프로파일링 결과를 비웁니다."""
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    request_profiler.reset()
+    return jsonify({"success": True}), 200
+
+@api.route('/api/extract_characters', methods=['POST'])
+async def extract_characters_route():
+    """
+    소설 텍스트에서 등장인물 정보를 추출하는 엔드포인트. (async 뷰 - 공유 이벤트 루프에서 실행)
     요청 본문:
         - text (str, optional): 분석할 소설 전체 텍스트.
         - file_id (str, optional): 저장된 텍스트 파일의 ID.
     둘 중 하나는 반드시 제공되어야 합니다. `text`가 우선됩니다.
     """
-    data = request.get_json()
+    # 본문(소설 전체일 수 있음) 읽기와 파일 I/O는 루프를 막지 않도록 스레드 풀에서
+    data = await async_runtime.run_blocking(request.get_json)
     if not data:
         return jsonify({"error": "Request body is missing or not JSON"}), 400
 
@@ -102,12 +426,11 @@ def extract_characters_route():
         if not text_path or not os.path.exists(text_path):
             return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
         try:
-            with open(text_path, 'r', encoding='utf-8') as f:
-                novel_text_content = f.read()
+            novel_text_content = await async_runtime.run_blocking(_read_text_file, text_path)
             if not novel_text_content.strip(): # 파일 내용이 비어있는 경우
                  return jsonify({"error": f"The file with id '{file_id}' is empty."}), 400
         except Exception as e:
-            app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
+            current_app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
             return jsonify({"error": f"Could not read text content from file_id '{file_id}'."}), 500
     
     if not novel_text_content.strip(): # 최종적으로 텍스트 내용이 없는 경우 (직접 전달된 텍스트가 공백 등)
@@ -115,7 +438,7 @@ def extract_characters_route():
 
     try:
         # gemini_service.py의 함수 호출
-        characters_list = extract_characters_from_text(novel_text_content) # 성공 시 list 반환
+        characters_list = await aextract_characters_from_text(novel_text_content) # 성공 시 list 반환
 
         if isinstance(characters_list, list):
             return jsonify({
@@ -124,22 +447,22 @@ def extract_characters_route():
                 "model": "gemini-2.0-flash" # 모델명은 예시
             }), 200
         else:
-            app.logger.error(f"Character extraction returned unexpected type: {type(characters_list)}")
+            current_app.logger.error(f"Character extraction returned unexpected type: {type(characters_list)}")
             return jsonify({"error": "Failed to extract characters due to unexpected response type."}), 500
 
     except ValueError as ve:
-        app.logger.error(f"Character extraction failed (ValueError): {str(ve)}")
+        current_app.logger.error(f"Character extraction failed (ValueError): {str(ve)}")
         return jsonify({"error": str(ve)}), 400
     except json.JSONDecodeError as jde:
-        app.logger.error(f"Character extraction failed (JSONDecodeError): {str(jde)}")
+        current_app.logger.error(f"Character extraction failed (JSONDecodeError): {str(jde)}")
         return jsonify({"error": f"Failed to parse character data from AI: {str(jde)}"}), 500
     except Exception as e:
-        app.logger.error(f"Gemini character extraction failed (app.py): {str(e)}")
+        current_app.logger.error(f"Gemini character extraction failed (app.py): {str(e)}")
         client_error = {"error": "Failed to extract characters using Gemini."}
         # client_error['details'] = str(e) # 디버깅 시 주석 해제하여 상세 오류 확인 가능
         return jsonify(client_error), 500
 
-@app.route('/api/upload/txt', methods=['POST'])
+@api.route('/api/upload/txt', methods=['POST'])
 def upload_txt_file_route():
     if 'file' not in request.files:
         return jsonify({"error": "No file part in the request"}), 400
@@ -152,61 +475,64 @@ def upload_txt_file_route():
     if file and allowed_file(file.filename):
         original_filename = file.filename
         try:
-            extracted_text = file.read().decode('utf-8')
-            if not extracted_text.strip():
-                return jsonify({"error": "File is empty or contains only whitespace."}), 400
-
-            storage_result = save_processed_text(original_filename, extracted_text)
+            # 전체 내용을 메모리에 올리지 않고 청크 단위로 인코딩 판별/변환하며 저장
+            storage_result = save_uploaded_text_stream(original_filename, file.stream, max_bytes=MAX_CONTENT_LENGTH)
             
             if storage_result and 'id' in storage_result:
                 file_id = storage_result['id']
-                app.logger.info(f"File uploaded and saved: {file_id} for {original_filename}")
+                preview = storage_result['preview']
+                current_app.logger.info(f"File uploaded and saved: {file_id} for {original_filename} ({storage_result['encoding']})")
                 return jsonify({
                     "message": f"File '{original_filename}' uploaded and saved successfully.",
                     "file_id": file_id,
                     "original_filename": original_filename,
                     "processed_filename": storage_result['filename'],
-                    "text_preview": extracted_text[:200] + '...' if len(extracted_text) > 200 else extracted_text
+                    "encoding": storage_result['encoding'],
+                    "size_bytes": storage_result['size_bytes'],
+                    "char_count": storage_result['char_count'],
+                    "sha256": storage_result['sha256'],
+                    "text_preview": preview[:200] + '...' if len(preview) > 200 else preview
                 }), 200
             else:
-                app.logger.error(f"Failed to save processed text for {original_filename}.")
+                current_app.logger.error(f"Failed to save processed text for {original_filename}.")
                 return jsonify({"error": "Failed to save processed text and metadata."}), 500
         except UnicodeDecodeError:
-            app.logger.error(f"UnicodeDecodeError for file {original_filename}")
-            return jsonify({"error": "Failed to decode file content. Please ensure the file is UTF-8 encoded."}), 400
+            current_app.logger.error(f"UnicodeDecodeError for file {original_filename}")
+            return jsonify({"error": "Failed to decode file content. Please ensure the file is UTF-8, UTF-16 or CP949/EUC-KR encoded."}), 400
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
-            app.logger.error(f"File processing failed for {original_filename}: {str(e)}")
+            current_app.logger.error(f"File processing failed for {original_filename}: {str(e)}")
             return jsonify({"error": f"Failed to process file: {str(e)}"}), 500
     else:
         return jsonify({"error": "File type not allowed or invalid file."}), 400
 
-@app.route('/api/analyze/characters/<file_id>', methods=['POST'])
-def analyze_characters_route(file_id):
+@api.route('/api/analyze/characters/<file_id>', methods=['POST'])
+async def analyze_characters_route(file_id):
     """
-    지정된 file_id의 텍스트를 읽어 등장인물 분석을 수행하고 결과를 저장합니다.
+    지정된 file_id의 텍스트를 읽어 등장인물 분석을 수행하고 결과를 저장합니다. (async 뷰)
     """
-    app.logger.info(f"Character analysis requested for file_id: {file_id}")
+    current_app.logger.info(f"Character analysis requested for file_id: {file_id}")
     text_path = get_processed_text_path(file_id)
     if not text_path or not os.path.exists(text_path):
-        app.logger.error(f"Processed text file not found for id: {file_id}")
+        current_app.logger.error(f"Processed text file not found for id: {file_id}")
         return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
     
     try:
-        with open(text_path, 'r', encoding='utf-8') as f:
-            novel_text_content = f.read()
+        novel_text_content = await async_runtime.run_blocking(_read_text_file, text_path)
         if not novel_text_content.strip():
-             app.logger.warning(f"File {file_id} is empty.")
+             current_app.logger.warning(f"File {file_id} is empty.")
              return jsonify({"error": f"The file with id '{file_id}' is empty."}), 400
     except Exception as e:
-        app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
+        current_app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
         return jsonify({"error": f"Could not read text content from file_id '{file_id}'."}), 500
 
     try:
-        characters_data = extract_characters_from_text(novel_text_content)
+        characters_data = await aextract_characters_from_text(novel_text_content)
         if characters_data: # characters_data가 None이 아니면 성공으로 간주
-            analysis_saved_filename = save_character_analysis(file_id, characters_data)
+            analysis_saved_filename = await async_runtime.run_blocking(save_character_analysis, file_id, characters_data)
             if analysis_saved_filename:
-                app.logger.info(f"Character analysis for {file_id} saved to {analysis_saved_filename}")
+                current_app.logger.info(f"Character analysis for {file_id} saved to {analysis_saved_filename}")
                 return jsonify({
                     "message": "Character analysis successful.",
                     "file_id": file_id,
@@ -214,48 +540,47 @@ def analyze_characters_route(file_id):
                     "model_info": "gemini-1.5-flash-latest (example)"
                 }), 200
             else:
-                app.logger.error(f"Failed to save character analysis file for {file_id}")
+                current_app.logger.error(f"Failed to save character analysis file for {file_id}")
                 return jsonify({"error": "Failed to save character analysis file."}), 500
         else: # characters_data가 None이거나 (gemini_service에서 빈 응답 등으로 인해) 또는 예상치 못한 falsy 값일 때
-            app.logger.warning(f"Character analysis for {file_id} returned no data or unexpected data from service. Data: {characters_data}")
+            current_app.logger.warning(f"Character analysis for {file_id} returned no data or unexpected data from service. Data: {characters_data}")
             return jsonify({"error": "Character analysis did not return expected data from service."}), 500
     except ValueError as ve: # API 키 누락, 빈 텍스트 입력, 또는 gemini_service 내에서 JSON 파싱 실패 등
-        app.logger.error(f"Character analysis ValueError for {file_id}: {str(ve)}")
+        current_app.logger.error(f"Character analysis ValueError for {file_id}: {str(ve)}")
         return jsonify({"error": f"Character analysis input error: {str(ve)}"}), 400 # API 키 누락 등
     except RuntimeError as re:
-        app.logger.error(f"Character analysis RuntimeError for {file_id}: {str(re)}")
+        current_app.logger.error(f"Character analysis RuntimeError for {file_id}: {str(re)}")
         return jsonify({"error": f"Character analysis runtime error: {str(re)}"}), 500 # API 호출 실패 등
     except Exception as e:
-        app.logger.error(f"Unexpected error during character analysis for {file_id}: {str(e)}")
+        current_app.logger.error(f"Unexpected error during character analysis for {file_id}: {str(e)}")
         return jsonify({"error": f"Unexpected error during character analysis: {str(e)}"}), 500
 
-@app.route('/api/analyze/structure/<file_id>', methods=['POST'])
-def analyze_structure_route(file_id):
+@api.route('/api/analyze/structure/<file_id>', methods=['POST'])
+async def analyze_structure_route(file_id):
     """
-    지정된 file_id의 텍스트를 읽어 소설 구조 분석을 수행하고 결과를 저장합니다.
+    지정된 file_id의 텍스트를 읽어 소설 구조 분석을 수행하고 결과를 저장합니다. (async 뷰)
     """
-    app.logger.info(f"Structure analysis requested for file_id: {file_id}")
+    current_app.logger.info(f"Structure analysis requested for file_id: {file_id}")
     text_path = get_processed_text_path(file_id)
     if not text_path or not os.path.exists(text_path):
-        app.logger.error(f"Processed text file not found for id: {file_id}")
+        current_app.logger.error(f"Processed text file not found for id: {file_id}")
         return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
     
     try:
-        with open(text_path, 'r', encoding='utf-8') as f:
-            novel_text_content = f.read()
+        novel_text_content = await async_runtime.run_blocking(_read_text_file, text_path)
         if not novel_text_content.strip():
-             app.logger.warning(f"File {file_id} is empty.")
+             current_app.logger.warning(f"File {file_id} is empty.")
              return jsonify({"error": f"The file with id '{file_id}' is empty."}), 400
     except Exception as e:
-        app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
+        current_app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
         return jsonify({"error": f"Could not read text content from file_id '{file_id}'."}), 500
 
     try:
-        structured_data = analyze_novel_structure(novel_text_content)
+        structured_data = await aanalyze_novel_structure(novel_text_content)
         if structured_data: # 현재 analyze_novel_structure는 성공 시 list/dict, 실패/빈 응답 시 None 또는 예외 발생
-            analysis_saved_filename = save_novel_structure_analysis(file_id, structured_data)
+            analysis_saved_filename = await async_runtime.run_blocking(save_novel_structure_analysis, file_id, structured_data)
             if analysis_saved_filename:
-                app.logger.info(f"Novel structure analysis for {file_id} saved to {analysis_saved_filename}")
+                current_app.logger.info(f"Novel structure analysis for {file_id} saved to {analysis_saved_filename}")
                 return jsonify({
                     "message": "Novel structure analysis successful.",
                     "file_id": file_id,
@@ -263,51 +588,51 @@ def analyze_structure_route(file_id):
                     "model_info": "gemini-1.5-flash-latest (example)"
                 }), 200
             else:
-                app.logger.error(f"Failed to save novel structure analysis file for {file_id}")
+                current_app.logger.error(f"Failed to save novel structure analysis file for {file_id}")
                 return jsonify({"error": "Failed to save novel structure analysis file."}), 500
         else: # analyze_novel_structure가 None을 반환한 경우 (예: API 빈 응답)
-            app.logger.warning(f"Novel structure analysis for {file_id} returned no data from service.")
+            current_app.logger.warning(f"Novel structure analysis for {file_id} returned no data from service.")
             # gemini_service에서 예외를 발생시키지 않고 None을 반환하는 케이스가 있다면 이 부분이 실행될 수 있음.
             # 현재 gemini_service는 빈 응답 시 None을 반환하거나, 파싱 실패 시 ValueError를 발생시킴.
             return jsonify({"error": "Novel structure analysis did not return data from service."}), 500
     except ValueError as ve: # gemini_service 내에서 발생 (API 키, 빈 텍스트, JSON 파싱 실패 등)
-        app.logger.error(f"Novel structure analysis ValueError for {file_id}: {str(ve)}")
+        current_app.logger.error(f"Novel structure analysis ValueError for {file_id}: {str(ve)}")
         return jsonify({"error": f"Novel structure analysis input/parsing error: {str(ve)}"}), 400
     except RuntimeError as re: # gemini_service 내 Gemini API 호출 실패
-        app.logger.error(f"Novel structure analysis RuntimeError for {file_id}: {str(re)}")
+        current_app.logger.error(f"Novel structure analysis RuntimeError for {file_id}: {str(re)}")
         return jsonify({"error": f"Novel structure analysis runtime error: {str(re)}"}), 500
     except Exception as e:
-        app.logger.error(f"Unexpected error during novel structure analysis for {file_id}: {str(e)}")
+        current_app.logger.error(f"Unexpected error during novel structure analysis for {file_id}: {str(e)}")
         return jsonify({"error": f"Unexpected error during novel structure analysis: {str(e)}"}), 500
 
-@app.route('/api/match/characters_voices/<file_id>', methods=['POST'])
+@api.route('/api/match/characters_voices/<file_id>', methods=['POST'])
 def match_characters_voices_route(file_id):
     """
     소설 등장인물과 성우를 매칭하는 엔드포인트.
     """
-    app.logger.info(f"Character-Voice matching requested for file_id: {file_id}")
+    current_app.logger.info(f"Character-Voice matching requested for file_id: {file_id}")
     
     # 파일 ID 유효성 검사
     if not get_processed_text_path(file_id):
-        app.logger.error(f"Processed text file not found for id: {file_id}")
+        current_app.logger.error(f"Processed text file not found for id: {file_id}")
         return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
     
     # 등장인물 분석 결과가 있는지 확인
     metadata = get_metadata(file_id)
     if not metadata or "character_analysis_file" not in metadata:
-        app.logger.error(f"Character analysis not found for file_id: {file_id}")
+        current_app.logger.error(f"Character analysis not found for file_id: {file_id}")
         return jsonify({"error": "등장인물 분석이 먼저 필요합니다."}), 400
     
     # 소설 구조 분석 결과가 있는지 확인
     if not metadata or "structure_analysis_file" not in metadata:
-        app.logger.error(f"Structure analysis not found for file_id: {file_id}")
+        current_app.logger.error(f"Structure analysis not found for file_id: {file_id}")
         return jsonify({"error": "소설 구조 분석이 먼저 필요합니다."}), 400
     
     # 매칭 수행 (use_gemini 파라미터 제거)
     match_result = match_characters_with_voices(file_id)
     
     if not match_result.get("success"):
-        app.logger.error(f"Matching failed: {match_result.get('error')}")
+        current_app.logger.error(f"Matching failed: {match_result.get('error')}")
         return jsonify({"error": match_result.get("error")}), 500
     
     # 성공 응답
@@ -318,32 +643,168 @@ def match_characters_voices_route(file_id):
         "character_voice_map": match_result.get("character_voice_map")
     }), 200
 
-@app.route('/api/match/characters_voices/<file_id>', methods=['GET'])
+@api.route('/api/match/characters_voices/<file_id>', methods=['GET'])
 def get_character_voice_mapping_route(file_id):
     """
     저장된 등장인물-성우 매칭 결과를 조회하는 엔드포인트
     """
-    app.logger.info(f"Requesting character-voice mapping for file_id: {file_id}")
+    current_app.logger.info(f"Requesting character-voice mapping for file_id: {file_id}")
     
     # 매칭 결과 로드
     match_result = load_matching_result(file_id)
     
     if not match_result.get("success"):
-        app.logger.error(f"Failed to load matching results: {match_result.get('error')}")
+        current_app.logger.error(f"Failed to load matching results: {match_result.get('error')}")
         return jsonify({"error": match_result.get("error")}), 404
     
     # 성공 응답
     return jsonify(match_result.get("data")), 200
 
-@app.route('/api/voice_actors', methods=['GET'])
+@api.route('/api/pipeline/<file_id>', methods=['POST'])
+def run_pipeline_route(file_id):
+    """
+    등장인물 분석, 구조 분석, 성우 매칭(및 선택적으로 오디오북 생성)을 한 번의 요청으로 실행하는 엔드포인트.
+    등장인물 분석과 구조 분석은 동시에 실행되고, 매칭은 등장인물 분석이 끝나는 즉시 시작됩니다.
+
+    요청 본문 (선택):
+    - generate (bool, optional): 매칭 후 오디오북 생성까지 실행할지 여부
+    """
+    current_app.logger.info(f"Pipeline requested for file_id: {file_id}")
+    text_path = get_processed_text_path(file_id)
+    if not text_path or not os.path.exists(text_path):
+        current_app.logger.error(f"Processed text file not found for id: {file_id}")
+        return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
+
+    try:
+        with open(text_path, 'r', encoding='utf-8') as f:
+            novel_text_content = f.read()
+        if not novel_text_content.strip():
+            current_app.logger.warning(f"File {file_id} is empty.")
+            return jsonify({"error": f"The file with id '{file_id}' is empty."}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error reading processed file {file_id}: {str(e)}")
+        return jsonify({"error": f"Could not read text content from file_id '{file_id}'."}), 500
+
+    generate_audio = request.json.get('generate', False) if request.is_json and request.json else False
+    if generate_audio and not check_api_key():
+        return jsonify({"error": "오디오북 생성에 필요한 ElevenLabs API 키가 설정되어 있지 않습니다."}), 400
+
+    try:
+        pipeline_result = run_analysis_pipeline(file_id, novel_text_content, generate_audio=generate_audio)
+    except (JobAlreadyRunningError, AdmissionRejectedError):
+        raise
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error during pipeline for {file_id}: {str(e)}")
+        return jsonify({"error": f"Unexpected error during pipeline: {str(e)}"}), 500
+
+    current_app.logger.info(f"Pipeline for {file_id} finished: {pipeline_result['stages']}")
+    if not pipeline_result.get("success"):
+        return jsonify({"error": "One or more pipeline stages failed.", **pipeline_result}), 500
+
+    return jsonify({"message": "Pipeline completed successfully.", **pipeline_result}), 200
+
+@api.route('/api/chapters/<file_id>/detect', methods=['POST'])
+def detect_chapters_route(file_id):
+    """
+    소설을 챕터로 나눕니다. 제목 줄("제 N장" 등)을 자동으로 찾거나, 요청 본문의 챕터 목록을 사용합니다.
+
+    요청 본문 (선택적):
+    - chapters (list): [{"title": str, "paragraph_start": int}, ...]
+    """
+    if file_id not in get_metadata():
+        return jsonify({"error": f"소설 파일 ID '{file_id}'를 찾을 수 없습니다."}), 404
+    if is_chapter_pipeline_running(file_id):
+        return jsonify({"error": "챕터 처리가 진행 중입니다. 완료된 후 다시 시도해주세요."}), 409
+    user_chapters = request.json.get('chapters') if request.is_json else None
+    try:
+        chapters = detect_chapters(file_id, user_chapters)
+    except (ValueError, TypeError, KeyError) as e:
+        return jsonify({"error": str(e)}), 400
+    if chapters is None:
+        return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
+    return jsonify({"file_id": file_id, "chapters": chapters}), 200
+
+@api.route('/api/chapters/<file_id>', methods=['GET'])
+def get_chapters_route(file_id):
+    """
+    챕터별 처리 상태와 생성된 오디오 파일 목록을 반환합니다. 완료된(published) 챕터는 바로 재생할 수 있습니다.
+    """
+    chapters = get_chapters(file_id)
+    if chapters is None:
+        return jsonify({"error": f"소설 파일 ID '{file_id}'에 대한 챕터 정보가 없습니다. 먼저 챕터를 나눠주세요."}), 404
+    return jsonify({
+        "file_id": file_id,
+        "running": is_chapter_pipeline_running(file_id),
+        "chapters": chapters
+    }), 200
+
+@api.route('/api/chapters/<file_id>/process', methods=['POST'])
+def process_chapters_route(file_id):
+    """
+    챕터별 구조 분석과 오디오 생성을 백그라운드에서 병렬로 실행합니다.
+
+    요청 본문 (선택적):
+    - generate (bool): 구조 분석 후 오디오 생성까지 실행할지 여부 (기본 true)
+    - chapters (list): 처리할 챕터 인덱스(정수) 목록 (기본 전체). 감지된 챕터에 없는 인덱스가 있으면 400
+    """
+    if file_id not in get_metadata():
+        return jsonify({"error": f"소설 파일 ID '{file_id}'를 찾을 수 없습니다."}), 404
+    body = _json_object_body()
+    if body is None:
+        return jsonify({"error": "요청 본문은 JSON 객체여야 합니다."}), 400
+    chapter_indices = body.get('chapters')
+    if chapter_indices is not None:
+        if not isinstance(chapter_indices, list) or not chapter_indices or \
+                not all(isinstance(index, int) and not isinstance(index, bool) for index in chapter_indices):
+            return jsonify({"error": "chapters는 챕터 인덱스(정수)의 목록이어야 합니다."}), 400
+        # 챕터 계획이 아직 없으면 파이프라인과 같은 방식으로 먼저 나눠서 확인
+        chapters = (get_metadata(file_id) or {}).get("chapters") or detect_chapters(file_id) or []
+        unknown = sorted(set(chapter_indices) - {chapter["index"] for chapter in chapters})
+        if unknown:
+            return jsonify({"error": "존재하지 않는 챕터 인덱스가 있습니다.", "unknown_chapters": unknown}), 400
+    generate_audio = bool(body.get('generate', True))
+    if generate_audio and not check_api_key():
+        return jsonify({"error": "오디오북 생성에 필요한 ElevenLabs API 키가 설정되어 있지 않습니다."}), 400
+
+    if not start_chapter_pipeline(file_id, chapter_indices, generate_audio):
+        return jsonify({"error": "이미 챕터 처리가 진행 중입니다."}), 409
+    return jsonify({
+        "message": "챕터 처리를 시작했습니다. 진행 상황은 GET /api/chapters/<file_id>로 확인하세요.",
+        "file_id": file_id
+    }), 202
+
+@api.route('/api/chapters/<file_id>/<int:chapter_index>/audio/<segment_id>', methods=['GET'])
+def get_chapter_audio_file_route(file_id, chapter_index, segment_id):
+    """
+    챕터의 세그먼트 오디오 파일을 제공합니다.
+    """
+    # 파일 ID 유효성 검사 (file_id가 경로로 쓰이므로 등록된 소설만 허용)
+    if file_id not in get_metadata():
+        return jsonify({"error": f"소설 파일 ID '{file_id}'를 찾을 수 없습니다."}), 404
+    try:
+        segment_number = int(segment_id)
+    except ValueError:
+        return jsonify({"error": "유효하지 않은 세그먼트 ID입니다. 세그먼트 ID는 숫자여야 합니다."}), 400
+    return _send_segment(chapter_audio_dir(file_id, chapter_index), segment_number)
+
+@api.route('/api/voice_actors', methods=['GET'])
 def get_voice_actors_route():
     """
     사용 가능한 성우 목록을 조회하는 엔드포인트
+
+    쿼리 파라미터 (선택):
+    - gender: 성별 (Male / Female)
+    - age_group: 나이대 (Young / Middle age / Old)
+    - feature: 특성 태그 (여러 번 지정하면 모두 포함하는 성우만 반환)
     """
-    voice_actors = load_voice_actors()
+    voice_actors = load_voice_actors(
+        gender=request.args.get('gender'),
+        age_group=request.args.get('age_group'),
+        feature=request.args.getlist('feature') or None
+    )
     
     if not voice_actors:
-        app.logger.warning("No voice actors found")
+        current_app.logger.warning("No voice actors found")
         return jsonify({"message": "성우 데이터가 없습니다.", "voice_actors": []}), 200
     
     # 성우 정보에 feature가, name, id 필드가 확실히 포함되어 있는지 확인
@@ -357,7 +818,7 @@ def get_voice_actors_route():
         "voice_actors": voice_actors
     }), 200
 
-@app.route('/api/processed_texts/<file_id>', methods=['GET'])
+@api.route('/api/processed_texts/<file_id>', methods=['GET'])
 def get_single_processed_text(file_id):
     text_path = get_processed_text_path(file_id)
     if not text_path or not os.path.exists(text_path):
@@ -365,18 +826,73 @@ def get_single_processed_text(file_id):
     
     return send_from_directory(NOVELS_ORIGINAL_FOLDER, os.path.basename(text_path))
 
-@app.route('/api/processed_texts/<file_id>', methods=['DELETE'])
+@api.route('/api/processed_texts/<file_id>/index', methods=['GET'])
+def get_processed_text_index(file_id):
+    """
+    저장된 소설의 문단/문장/챕터 인덱스 요약과 챕터 목록을 반환합니다.
+    """
+    reader = open_text_reader(file_id)
+    if reader is None:
+        return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
+    with reader:
+        return jsonify({"file_id": file_id, **reader.summary(), "chapter_list": reader.chapters()}), 200
+
+@api.route('/api/processed_texts/<file_id>/range', methods=['GET'])
+def get_processed_text_range(file_id):
+    """
+    저장된 소설의 일부만 잘라서 반환합니다. 전체 파일을 읽지 않고 오프셋 인덱스로 바로 접근합니다.
+
+    Query:
+        unit: paragraph(기본) / sentence / chapter
+        start, end: 범위 [start, end) (chapter는 start만 사용).
+                    한 번에 최대 TEXT_RANGE_MAX_ITEMS개까지 반환하며, 응답의 end가 실제로 반환한 범위의 끝입니다.
+    """
+    unit = request.args.get('unit', 'paragraph')
+    try:
+        start = int(request.args.get('start', 0))
+        end = int(request.args['end']) if 'end' in request.args else start + 20
+    except ValueError:
+        return jsonify({"error": "start와 end는 정수여야 합니다."}), 400
+    if start < 0 or end < start:
+        return jsonify({"error": "범위는 0 <= start <= end 여야 합니다."}), 400
+    end = min(end, start + TEXT_RANGE_MAX_ITEMS)
+
+    reader = open_text_reader(file_id)
+    if reader is None:
+        return jsonify({"error": f"Processed text file with id '{file_id}' not found."}), 404
+    with reader:
+        if unit == 'paragraph':
+            items = reader.paragraphs(start, end)
+            total = reader.paragraph_count
+        elif unit == 'sentence':
+            items = reader.sentences(start, end)
+            total = reader.sentence_count
+        elif unit == 'chapter':
+            try:
+                items = [reader.chapter_text(start)]
+            except IndexError as e:
+                return jsonify({"error": str(e)}), 404
+            total = len(reader.chapters())
+        else:
+            return jsonify({"error": f"지원하지 않는 단위입니다: {unit}"}), 400
+    if unit == 'chapter':
+        end = start + 1
+    else:
+        end = max(start, min(end, total))
+    return jsonify({"file_id": file_id, "unit": unit, "start": start, "end": end, "total": total, "items": items}), 200
+
+@api.route('/api/processed_texts/<file_id>', methods=['DELETE'])
 def delete_processed_text(file_id):
     """
     지정된 file_id의 소설 파일 및 관련 메타데이터를 삭제합니다.
     모든 관련 폴더(app_data 내부)에서 해당 파일을 삭제합니다.
     """
-    app.logger.info(f"Delete request for file_id: {file_id}")
+    current_app.logger.info(f"Delete request for file_id: {file_id}")
     
     # 메타데이터에서 파일 정보 확인
     metadata = get_metadata()
     if file_id not in metadata:
-        app.logger.error(f"File ID {file_id} not found in metadata")
+        current_app.logger.error(f"File ID {file_id} not found in metadata")
         return jsonify({"error": f"File with id '{file_id}' not found."}), 404
     
     file_metadata = metadata[file_id]
@@ -388,7 +904,11 @@ def delete_processed_text(file_id):
             original_filepath = os.path.join(NOVELS_ORIGINAL_FOLDER, saved_filename)
             if os.path.exists(original_filepath):
                 os.remove(original_filepath)
-                app.logger.info(f"Deleted original file: {original_filepath}")
+                current_app.logger.info(f"Deleted original file: {original_filepath}")
+            # 문단/문장 오프셋 인덱스 (사이드카 파일)
+            index_filepath = index_path_for(original_filepath)
+            if os.path.exists(index_filepath):
+                os.remove(index_filepath)
         
         # 2. 캐릭터 분석 파일 삭제
         character_analysis_file = file_metadata.get('character_analysis_file')
@@ -396,7 +916,7 @@ def delete_processed_text(file_id):
             character_filepath = os.path.join(CHARACTER_ANALYSIS_FOLDER, character_analysis_file)
             if os.path.exists(character_filepath):
                 os.remove(character_filepath)
-                app.logger.info(f"Deleted character analysis file: {character_filepath}")
+                current_app.logger.info(f"Deleted character analysis file: {character_filepath}")
         
         # 3. 소설 구조 분석 파일 삭제
         structure_analysis_file = file_metadata.get('structure_analysis_file')
@@ -404,17 +924,24 @@ def delete_processed_text(file_id):
             structure_filepath = os.path.join(NOVELS_PROCESSED_FOLDER, structure_analysis_file)
             if os.path.exists(structure_filepath):
                 os.remove(structure_filepath)
-                app.logger.info(f"Deleted structure analysis file: {structure_filepath}")
+                current_app.logger.info(f"Deleted structure analysis file: {structure_filepath}")
+        
+        # 3-1. 챕터별 구조 분석 파일 삭제
+        for filename in os.listdir(NOVELS_PROCESSED_FOLDER):
+            if filename.startswith(f"{file_id}_ch") and filename.endswith("_structure.json"):
+                os.remove(os.path.join(NOVELS_PROCESSED_FOLDER, filename))
+                current_app.logger.info(f"Deleted chapter structure file: {filename}")
         
-        # 4. 오디오북 파일 삭제 (audio_output 폴더)
+        # 4. 오디오북 파일 삭제 (audio_output 폴더, 챕터별 폴더 포함)
+        #    세그먼트 파일은 공유 블롭에 대한 링크이므로 참조만 제거되고, 실제 공간은 GC가 회수함
         audio_output_dir = os.path.join(AUDIO_OUTPUT_FOLDER, file_id)
         if os.path.exists(audio_output_dir):
             try:
                 import shutil
                 shutil.rmtree(audio_output_dir)
-                app.logger.info(f"Deleted audiobook directory: {audio_output_dir}")
+                current_app.logger.info(f"Deleted audiobook directory: {audio_output_dir}")
             except Exception as e:
-                app.logger.error(f"Error deleting audiobook directory {audio_output_dir}: {str(e)}")
+                current_app.logger.error(f"Error deleting audiobook directory {audio_output_dir}: {str(e)}")
         
         # 5. 매칭된 소설 파일 삭제 (novels_matched 폴더 - from matching_service)
         novels_matched_folder = str(NOVELS_MATCHED_PATH)
@@ -422,12 +949,12 @@ def delete_processed_text(file_id):
         matched_filepath = os.path.join(novels_matched_folder, matched_filename)
         if os.path.exists(matched_filepath):
             os.remove(matched_filepath)
-            app.logger.info(f"Deleted matched novel file: {matched_filepath}")
+            current_app.logger.info(f"Deleted matched novel file: {matched_filepath}")
         
         # 6. 메타데이터에서 항목 제거
         del metadata[file_id]
         save_metadata(metadata)
-        app.logger.info(f"Removed metadata for file_id: {file_id}")
+        current_app.logger.info(f"Removed metadata for file_id: {file_id}")
         
         return jsonify({
             "message": f"File with id '{file_id}' and related data successfully deleted.",
@@ -435,22 +962,22 @@ def delete_processed_text(file_id):
         }), 200
     
     except Exception as e:
-        app.logger.error(f"Error deleting file {file_id}: {str(e)}")
+        current_app.logger.error(f"Error deleting file {file_id}: {str(e)}")
         return jsonify({"error": f"Failed to delete file: {str(e)}"}), 500
 
-@app.route('/api/metadata', methods=['GET'])
+@api.route('/api/metadata', methods=['GET'])
 def get_all_metadata_route():
     all_metadata = get_metadata()
     return jsonify(all_metadata)
 
-@app.route('/api/metadata/<file_id>', methods=['GET'])
+@api.route('/api/metadata/<file_id>', methods=['GET'])
 def get_single_metadata_route(file_id):
     metadata_item = get_metadata(file_id)
     if metadata_item:
         return jsonify(metadata_item)
     return jsonify({"error": "Metadata not found for the given ID"}), 404
 
-@app.route('/api/audiobook/generate/<file_id>', methods=['POST'])
+@api.route('/api/audiobook/generate/<file_id>', methods=['POST'])
 def generate_audiobook_route(file_id):
     """
     지정된 file_id의 소설을 오디오북으로 생성하는 엔드포인트.
@@ -461,11 +988,11 @@ def generate_audiobook_route(file_id):
     try:
         # API 키 확인 및 디버깅
         elevenlabs_key = os.getenv("ELEVENLABS_API_KEY")
-        app.logger.info(f"ELEVENLABS_API_KEY 환경 변수 확인: {'설정됨' if elevenlabs_key else '설정되지 않음'}")
-        app.logger.info(f"ELEVENLABS_API_KEY 길이: {len(elevenlabs_key) if elevenlabs_key else 0}")
+        current_app.logger.info(f"ELEVENLABS_API_KEY 환경 변수 확인: {'설정됨' if elevenlabs_key else '설정되지 않음'}")
+        current_app.logger.info(f"ELEVENLABS_API_KEY 길이: {len(elevenlabs_key) if elevenlabs_key else 0}")
         
         if not check_api_key():
-            app.logger.error("ELEVENLABS_API_KEY가 환경 변수에 설정되어 있지 않습니다.")
+            current_app.logger.error("ELEVENLABS_API_KEY가 환경 변수에 설정되어 있지 않습니다.")
             return jsonify({"error": "오디오북 생성에 필요한 ElevenLabs API 키가 설정되어 있지 않습니다."}), 400
         
         # 파일 ID 유효성 검사
@@ -487,18 +1014,18 @@ def generate_audiobook_route(file_id):
         try:
             with open(matching_result_file, 'r', encoding='utf-8') as f:
                 matching_data = json.load(f)
-            app.logger.info(f"매칭 결과 데이터 타입: {type(matching_data)}, 구조: {matching_data.keys() if isinstance(matching_data, dict) else '딕셔너리 아님'}")
+            current_app.logger.info(f"매칭 결과 데이터 타입: {type(matching_data)}, 구조: {matching_data.keys() if isinstance(matching_data, dict) else '딕셔너리 아님'}")
         except Exception as e:
-            app.logger.error(f"Error loading matching result for {file_id}: {str(e)}")
+            current_app.logger.error(f"Error loading matching result for {file_id}: {str(e)}")
             return jsonify({"error": f"매칭 결과 파일 로드 중 오류가 발생했습니다: {str(e)}"}), 500
         
         # 구조 분석 결과 로드
         try:
             with open(structure_file, 'r', encoding='utf-8') as f:
                 structure_data = json.load(f)
-            app.logger.info(f"구조 분석 데이터 타입: {type(structure_data)}, 길이: {len(structure_data) if isinstance(structure_data, (list, dict)) else '배열/딕셔너리 아님'}")
+            current_app.logger.info(f"구조 분석 데이터 타입: {type(structure_data)}, 길이: {len(structure_data) if isinstance(structure_data, (list, dict)) else '배열/딕셔너리 아님'}")
         except Exception as e:
-            app.logger.error(f"Error loading structure analysis for {file_id}: {str(e)}")
+            current_app.logger.error(f"Error loading structure analysis for {file_id}: {str(e)}")
             return jsonify({"error": f"구조 분석 결과 파일 로드 중 오류가 발생했습니다: {str(e)}"}), 500
         
         # 오디오북 생성 데이터 구성
@@ -524,8 +1051,17 @@ def generate_audiobook_route(file_id):
             story_items = structure_data["segments"]
         
         # 데이터 유효성 로깅
-        app.logger.info(f"character_voice_map 항목 수: {len(character_voice_map)}")
-        app.logger.info(f"story_items 항목 수: {len(story_items)}")
+        current_app.logger.info(f"character_voice_map 항목 수: {len(character_voice_map)}")
+        current_app.logger.info(f"story_items 항목 수: {len(story_items)}")
+        
+        # 생성 시작 전에 모든 voice_id를 한 번에 검증 (세그먼트마다 실패하는 것을 방지)
+        validation = validate_character_voice_map(character_voice_map)
+        if not validation.get("valid"):
+            current_app.logger.error(f"유효하지 않은 voice_id: {validation.get('invalid')}")
+            return jsonify({
+                "error": "일부 등장인물에 유효하지 않은 성우 음성 ID가 배정되어 있습니다. 매칭을 다시 확인해주세요.",
+                "invalid_voice_ids": validation.get("invalid")
+            }), 400
         
         # 오디오북 생성 데이터 구성
         story_data = {
@@ -558,7 +1094,7 @@ def generate_audiobook_route(file_id):
         if status_code != 200:
             # API 키 관련 오류 확인
             if 'API key' in str(result.get('error', '')):
-                app.logger.error(f"ElevenLabs API 키 오류: {result.get('error')}")
+                current_app.logger.error(f"ElevenLabs API 키 오류: {result.get('error')}")
                 return jsonify({"error": "ElevenLabs API 키가 유효하지 않거나 설정되지 않았습니다. 관리자에게 문의하세요."}), 400
             return jsonify(result), status_code
         
@@ -567,11 +1103,105 @@ def generate_audiobook_route(file_id):
             "generation_results": result
         }), 200
         
+    except (JobAlreadyRunningError, AdmissionRejectedError):
+        raise
     except Exception as e:
-        app.logger.error(f"Error generating audiobook for {file_id}: {str(e)}")
+        current_app.logger.error(f"Error generating audiobook for {file_id}: {str(e)}")
         return jsonify({"error": f"오디오북 생성 중 오류가 발생했습니다: {str(e)}"}), 500
 
-@app.route('/api/audiobook/status/<file_id>', methods=['GET'])
+@api.route('/api/audiobook/segments/<file_id>/<int:order>', methods=['POST'])
+def regenerate_audiobook_segment_route(file_id, order):
+    """
+    세그먼트 하나만 수정하여 다시 생성하는 엔드포인트. 책 전체를 다시 생성하지 않습니다.
+    
+    요청 본문 (모두 선택적):
+    - text, speaker, emotion, tone, expression_level: 세그먼트 수정 내용
+    - voice_id: 이 세그먼트에만 사용할 음성 ID (없으면 화자의 매칭 음성)
+    - chapter (int): 챕터 세그먼트인 경우 챕터 인덱스
+    """
+    if not check_api_key():
+        return jsonify({"error": "오디오북 생성에 필요한 ElevenLabs API 키가 설정되어 있지 않습니다."}), 400
+    if file_id not in get_metadata():
+        return jsonify({"error": f"소설 파일 ID '{file_id}'를 찾을 수 없습니다."}), 404
+    
+    body = _json_object_body()
+    if body is None:
+        return jsonify({"error": "요청 본문은 JSON 객체여야 합니다."}), 400
+    edit_error = _segment_edit_error(body)
+    if edit_error:
+        return jsonify({"error": edit_error}), 400
+    chapter = body.get('chapter')
+    try:
+        structure_filename = chapter_structure_filename(file_id, chapter) if chapter is not None else None
+        audio_key = chapter_audio_key(file_id, chapter) if chapter is not None else file_id
+    except (TypeError, ValueError):
+        return jsonify({"error": "chapter는 정수여야 합니다."}), 400
+    
+    # 1. 수정된 세그먼트를 미리 계산 (파일은 검증과 재생성이 성공한 뒤에 수정)
+    segment = update_story_segment(file_id, order, body, structure_filename, persist=False)
+    if segment is None:
+        return jsonify({"error": f"세그먼트 {order}를 찾을 수 없습니다."}), 404
+    
+    # 2. 음성 결정 및 검증
+    matching = load_matching_result(file_id)
+    character_voice_map = matching["data"].get("character_voice_map", {}) if matching.get("success") else {}
+    voice_id = segment.get("voice_id") or character_voice_map.get(segment.get("speaker"))
+    if not voice_id:
+        return jsonify({"error": f"화자 '{segment.get('speaker')}'에게 배정된 음성이 없습니다. voice_id를 지정해주세요."}), 400
+    validation = validate_character_voice_map({segment.get("speaker"): voice_id})
+    if not validation.get("valid"):
+        return jsonify({"error": "유효하지 않은 음성 ID입니다.", "invalid_voice_ids": validation.get("invalid")}), 400
+    
+    # 3. 해당 세그먼트만 다시 생성 (파일 교체 + 매니페스트 버전 증가)
+    result, status_code = regenerate_segment(audio_key, {**segment, "order": order, "voice_id": voice_id})
+    if status_code != 200:
+        return jsonify(result), status_code
+    
+    # 4. 재생성에 성공한 수정 내용만 구조/매칭 파일에 반영 (수정 내용이 없으면 현재 세그먼트를 그대로 다시 생성한 것)
+    update_story_segment(file_id, order, body, structure_filename)
+    
+    if chapter is not None:
+        audio_url = f"/api/chapters/{file_id}/{int(chapter)}/audio/{order}?v={result['version']}"
+    else:
+        audio_url = f"/api/audiobook/files/{file_id}/{order}?v={result['version']}"
+    return jsonify({
+        "message": f"세그먼트 {order}를 다시 생성했습니다.",
+        "file_id": file_id,
+        "segment": {**segment, "voice_id": voice_id},
+        "version": result["version"],
+        "audio_url": audio_url
+    }), 200
+
+@api.route('/api/audiobook/recast/<file_id>', methods=['POST'])
+def recast_audiobook_route(file_id):
+    """
+    등장인물의 성우를 바꾸고 해당 인물의 대사만 다시 생성하는 엔드포인트.
+    
+    요청 본문:
+    - character_voice_map (dict): 바꿀 등장인물 이름 → 새 voice_id
+    """
+    if not check_api_key():
+        return jsonify({"error": "오디오북 생성에 필요한 ElevenLabs API 키가 설정되어 있지 않습니다."}), 400
+    if file_id not in get_metadata():
+        return jsonify({"error": f"소설 파일 ID '{file_id}'를 찾을 수 없습니다."}), 404
+    
+    body = _json_object_body()
+    if body is None:
+        return jsonify({"error": "요청 본문은 JSON 객체여야 합니다."}), 400
+    voice_changes = body.get('character_voice_map')
+    if not isinstance(voice_changes, dict) or not voice_changes:
+        return jsonify({"error": "변경할 character_voice_map이 필요합니다."}), 400
+    if not all(isinstance(voice_id, str) and voice_id for voice_id in voice_changes.values()):
+        return jsonify({"error": "character_voice_map의 값은 비어 있지 않은 voice_id 문자열이어야 합니다."}), 400
+    
+    validation = validate_character_voice_map(voice_changes)
+    if not validation.get("valid"):
+        return jsonify({"error": "유효하지 않은 음성 ID가 있습니다.", "invalid_voice_ids": validation.get("invalid")}), 400
+    
+    result, status_code = recast_characters(file_id, voice_changes)
+    return jsonify(result), status_code
+
+@api.route('/api/audiobook/status/<file_id>', methods=['GET'])
 def check_audiobook_status_route(file_id):
     """
     지정된 file_id의 오디오북 생성 상태를 확인하는 엔드포인트.
@@ -631,16 +1261,18 @@ def check_audiobook_status_route(file_id):
                         if "speaker" in item:
                             segment_texts[filename] = f"{item['speaker']}: {segment_texts[filename]}"
             except Exception as e:
-                app.logger.error(f"Error loading matched data for {file_id}: {str(e)}")
+                current_app.logger.error(f"Error loading matched data for {file_id}: {str(e)}")
                 # 오류 발생해도 계속 진행 (텍스트 정보는 선택적)
         
         # 기존 status_result에 segment_texts 추가해서 반환
         status_result["segment_texts"] = segment_texts
+        # 어느 워커에서 실행 중이든 공유 작업 저장소의 진행률을 함께 반환
+        status_result["job"] = job_store.active_job(file_id, "generate") or job_store.active_job(file_id)
         
         return jsonify(status_result), 200
         
     except Exception as e:
-        app.logger.error(f"Error checking audiobook status for {file_id}: {str(e)}")
+        current_app.logger.error(f"Error checking audiobook status for {file_id}: {str(e)}")
         return jsonify({
             "file_id": file_id,
             "status": "error",
@@ -651,7 +1283,36 @@ def check_audiobook_status_route(file_id):
             "segment_texts": {}
         }), 200  # 오류 상태도 200으로 처리
 
-@app.route('/api/audiobook/files/<file_id>/<segment_id>', methods=['GET'])
+def _send_segment(output_dir, segment_number):
+    """
+    세그먼트 오디오를 전송합니다. 개별 파일(재생성된 세그먼트 포함)이 있으면 그것을, 없으면 팩의 메모리 맵 영역을 일정 크기의 bytes 조각으로 나눠 전송합니다.
+    팩에서 전송할 때도 Range 요청(부분 전송)을 지원합니다.
+    """
+    audio_filename = f"{segment_number:03d}.mp3"
+    if os.path.exists(os.path.join(output_dir, audio_filename)):
+        return send_from_directory(output_dir, audio_filename, as_attachment=False)
+    
+    reader = get_pack_reader(output_dir)
+    length = reader.length(segment_number) if reader else None
+    if length is None:
+        return jsonify({"error": f"요청한 오디오 파일을 찾을 수 없습니다."}), 404
+    
+    start, stop, status = 0, length, 200
+    if request.range:
+        byte_range = request.range.range_for_length(length)
+        if byte_range is None:
+            return Response(status=416, headers={"Content-Range": f"bytes */{length}"})
+        start, stop = byte_range
+        status = 206
+    
+    response = Response(reader.iter_chunks(segment_number, start, stop), status=status, mimetype="audio/mpeg", direct_passthrough=True)
+    response.content_length = stop - start
+    response.accept_ranges = "bytes"
+    if status == 206:
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{length}"
+    return response
+
+@api.route('/api/audiobook/files/<file_id>/<segment_id>', methods=['GET'])
 def get_audiobook_file_route(file_id, segment_id):
     """
     지정된 file_id와 segment_id에 해당하는 오디오 파일을 제공하는 엔드포인트.
@@ -674,26 +1335,68 @@ def get_audiobook_file_route(file_id, segment_id):
         except ValueError:
             return jsonify({"error": f"유효하지 않은 세그먼트 ID입니다. 세그먼트 ID는 숫자여야 합니다."}), 400
         
-        # 파일 존재 확인
-        audio_file_path = os.path.join(output_dir, audio_filename)
-        if not os.path.exists(audio_file_path):
-            return jsonify({"error": f"요청한 오디오 파일을 찾을 수 없습니다."}), 404
-        
-        # 파일 전송
-        return send_from_directory(output_dir, audio_filename, as_attachment=False)
+        # 파일 전송 (개별 파일 또는 팩)
+        return _send_segment(output_dir, segment_number)
         
     except Exception as e:
-        app.logger.error(f"Error serving audiobook file for {file_id}, segment {segment_id}: {str(e)}")
+        current_app.logger.error(f"Error serving audiobook file for {file_id}, segment {segment_id}: {str(e)}")
         return jsonify({"error": f"오디오 파일 제공 중 오류가 발생했습니다: {str(e)}"}), 500
 
-@app.route('/api/elevenlabs/voices', methods=['GET'])
-def get_elevenlabs_voices_route():
+@api.route('/api/storage/audio', methods=['GET'])
+def get_audio_storage_stats_route():
+    """
+    오디오 저장소 사용 현황 (블롭 수, 실제/논리 사용량, 참조 없는 블롭 수).
+    """
+    return jsonify(audio_blob_store.get_stats()), 200
+
+@api.route('/api/storage/audio/gc', methods=['POST'])
+def run_audio_storage_gc_route():
+    """
+    오디오 저장소 가비지 컬렉션을 즉시 실행합니다. 필요하면 기존 폴더 이전도 함께 실행합니다.
+
+    요청 본문 (선택적):
+    - migrate (bool): 기존 audio_output 폴더를 저장소로 이전할지 여부
+    - grace_seconds (int): 참조 없는 블롭 삭제 유예 시간
+
+    관리자 요청만 허용 (X-Admin-Token 헤더가 ADMIN_TOKEN과 일치하는 요청. ADMIN_ALLOW_LOCAL=true면 토큰 없이 로컬 요청도 허용).
+    """
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    body = request.json if request.is_json else {}
+    result = {}
+    if body.get('migrate'):
+        result["migration"] = audio_blob_store.migrate(AUDIO_OUTPUT_FOLDER)
+    result["gc"] = audio_blob_store.collect_garbage(body.get('grace_seconds'))
+    return jsonify(result), 200
+
+@api.route('/api/storage/audio/compact', methods=['POST'])
+def compact_audio_storage_route():
+    """
+    책별 세그먼트 파일을 하나의 팩(데이터 파일 + 고정 폭 인덱스)으로 압축합니다.
+
+    요청 본문 (선택적):
+    - file_id (str): 압축할 소설 (없으면 모든 책/챕터 폴더)
+
+    관리자 요청만 허용 (X-Admin-Token 헤더가 ADMIN_TOKEN과 일치하는 요청. ADMIN_ALLOW_LOCAL=true면 토큰 없이 로컬 요청도 허용).
+    """
+    if not is_admin_request(request):
+        return jsonify({"error": "관리자만 접근할 수 있습니다."}), 403
+    body = request.json if request.is_json else {}
+    file_id = body.get('file_id')
+    if file_id:
+        if file_id not in get_metadata():
+            return jsonify({"error": f"소설 파일 ID '{file_id}'를 찾을 수 없습니다."}), 404
+        return jsonify({"compacted": compact_all(os.path.join(AUDIO_OUTPUT_FOLDER, file_id))}), 200
+    return jsonify({"compacted": compact_all(AUDIO_OUTPUT_FOLDER)}), 200
+
+@api.route('/api/elevenlabs/voices', methods=['GET'])
+async def get_elevenlabs_voices_route():
     """
-    ElevenLabs에서 사용 가능한 음성 목록을 가져오는 엔드포인트.
+    ElevenLabs에서 사용 가능한 음성 목록을 가져오는 엔드포인트. (async 뷰)
     """
     try:
         # 음성 목록 가져오기
-        voices_result, status_code = get_available_voices()
+        voices_result, status_code = await aget_available_voices()
         
         if status_code != 200:
             return jsonify(voices_result), status_code
@@ -701,11 +1404,11 @@ def get_elevenlabs_voices_route():
         return jsonify(voices_result), 200
         
     except Exception as e:
-        app.logger.error(f"Error getting ElevenLabs voices: {str(e)}")
+        current_app.logger.error(f"Error getting ElevenLabs voices: {str(e)}")
         return jsonify({"error": f"ElevenLabs 음성 목록 가져오기 중 오류가 발생했습니다: {str(e)}"}), 500
 
 if __name__ == '__main__':
     # 포트를 8000으로 변경
     port = int(os.getenv('PORT', 8000))
     print(f"서버가 http://localhost:{port} 에서 실행 중입니다.")
-    app.run(debug=True, host='0.0.0.0', port=port) 
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=port) 
\ No newline at end of file
@@ -0,0 +1,2 @@
+# benchmarks 패키지 초기화 파일
+# 외부 API 없이 실행하는 성능 측정 도구 (backend 폴더에서 python -m benchmarks.<모듈>로 실행)
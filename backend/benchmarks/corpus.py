@@ -0,0 +1,85 @@
+import random
+
+# 합성 소설 등장인물 (이름, 설명, 말투)
+CAST = [
+    ("민준", "20대 후반 남성 형사. 냉정하고 논리적이지만 동료에게는 다정하다.", "\"증거부터 확인하죠.\""),
+    ("서연", "20대 초반 여성 대학생. 밝고 호기심이 많으며 말이 빠르다.", "\"정말요? 그럼 같이 가 봐요!\""),
+    ("지훈", "30대 남성 기자. 냉소적이고 말끝을 흐리는 버릇이 있다.", "\"글쎄, 그게 다일까...\""),
+    ("하은", "10대 소녀. 수줍음이 많고 조용하지만 관찰력이 뛰어나다.", "\"저기... 아까 그 사람 봤어요.\""),
+    ("영호", "60대 남성 노인. 느긋하고 구수한 말투의 마을 어른.", "\"허허, 젊은이들이 급하구먼.\""),
+    ("수진", "40대 여성 의사. 차분하고 단호하다.", "\"지금은 쉬셔야 합니다.\""),
+]
+
+NARRATION_SENTENCES = [
+    "창밖으로 비가 조용히 내리고 있었다.",
+    "골목 끝의 가로등이 깜빡이며 흐릿한 빛을 흘렸다.",
+    "그는 한참 동안 아무 말 없이 서류를 넘겼다.",
+    "바람이 불 때마다 낡은 창틀이 삐걱거렸다.",
+    "멀리서 기차 소리가 희미하게 들려왔다.",
+    "방 안에는 식어 버린 커피 냄새가 남아 있었다.",
+    "그녀는 손끝으로 책상 모서리를 천천히 쓸었다.",
+    "시계 바늘은 어느새 자정을 가리키고 있었다.",
+    "누구도 먼저 입을 열지 않았다.",
+    "작은 마을은 그날따라 유난히 고요했다.",
+]
+
+DIALOGUE_LINES = [
+    "여기서 뭘 하고 있었던 거죠?",
+    "처음부터 다시 설명해 주세요.",
+    "그날 밤, 분명히 누군가 있었어요.",
+    "이건 우연이라고 보기 어렵네요.",
+    "조금만 더 기다려 봅시다.",
+    "설마 그 사람이 범인이라는 건가요?",
+    "말도 안 돼요. 저는 아무것도 몰라요!",
+    "지금 당장 확인해야 합니다.",
+    "괜찮아요, 천천히 말해도 돼요.",
+    "그 편지는 어디서 찾은 겁니까?",
+]
+
+SPEECH_VERBS = ["말했다", "물었다", "대답했다", "외쳤다", "중얼거렸다"]
+
+
+def _topic_particle(name):
+    """받침 유무에 따라 은/는을 고릅니다."""
+    last = name[-1]
+    if "가" <= last <= "힣":
+        return "은" if (ord(last) - ord("가")) % 28 else "는"
+    return "는"
+
+
+def generate_novel(target_chars, seed=0, chapter_chars=20000):
+    """
+    벤치마크용 합성 한국어 소설을 만듭니다. 같은 seed는 항상 같은 텍스트를 만듭니다.
+
+    챕터 제목("제N장"), 내레이션 문단, 화자 표기가 붙은 대사 줄("..." 민준은 말했다.)로 구성되며,
+    대역 Gemini 서버가 이 형식에서 등장인물과 구조를 재현할 수 있습니다.
+
+    Args:
+        target_chars (int): 목표 글자 수 (대략적인 값 - 마지막 문단까지 포함)
+        seed (int, optional): 난수 시드
+        chapter_chars (int, optional): 챕터 하나의 대략적인 글자 수
+
+    Returns:
+        str: 소설 텍스트
+    """
+    rng = random.Random(seed)
+    lines = []
+    total = 0
+    chapter = 0
+    chapter_length = chapter_chars
+    while total < target_chars:
+        if chapter_length >= chapter_chars:
+            chapter += 1
+            chapter_length = 0
+            heading = f"제{chapter}장"
+            lines.extend(["", heading, ""])
+            total += len(heading)
+        if rng.random() < 0.45:
+            name = rng.choice(CAST)[0]
+            line = f"\"{rng.choice(DIALOGUE_LINES)}\" {name}{_topic_particle(name)} {rng.choice(SPEECH_VERBS)}."
+        else:
+            line = " ".join(rng.choice(NARRATION_SENTENCES) for _ in range(rng.randint(2, 5)))
+        lines.append(line)
+        total += len(line)
+        chapter_length += len(line)
+    return "\n".join(lines).strip() + "\n"
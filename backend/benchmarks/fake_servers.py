@@ -0,0 +1,270 @@
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import CAST
+
+# 합성 소설의 대사 줄: "대사" 이름은/는 말했다.
+DIALOGUE_LINE_PATTERN = re.compile(r'^"(.+?)"\s*([가-힣]+?)[은는]\s+(?:말했다|물었다|대답했다|외쳤다|중얼거렸다)')
+
+RATE_LIMIT_BODY = {"error": {"code": 429, "message": "Resource has been exhausted (fake server).", "status": "RESOURCE_EXHAUSTED"}}
+
+
+class LatencyModel:
+    """
+    응답 지연 분포. 문자열로 지정합니다.
+
+    - "fixed:0.05"          항상 0.05초
+    - "uniform:0.02,0.2"    0.02~0.2초 균등 분포
+    - "lognormal:0.08,0.5"  중앙값 0.08초, 시그마 0.5의 로그 정규 분포 (긴 꼬리)
+    """
+
+    def __init__(self, spec="fixed:0", seed=None):
+        kind, _, params = spec.partition(":")
+        self.kind = kind
+        self.params = [float(p) for p in params.split(",") if p] or [0.0]
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"알 수 없는 지연 분포입니다: {spec}")
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self):
+        with self._lock:
+            if self.kind == "uniform":
+                low, high = self.params[0], self.params[1] if len(self.params) > 1 else self.params[0]
+                return self._rng.uniform(low, high)
+            if self.kind == "lognormal":
+                median, sigma = self.params[0], self.params[1] if len(self.params) > 1 else 0.5
+                return self._rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+            return self.params[0]
+
+
+class _FakeServer:
+    """
+    로컬 스레드 HTTP 서버 위에서 동작하는 외부 API 대역의 공통 부분.
+    요청마다 지연 분포만큼 기다리고, rate_limit_ratio 확률로 429를 돌려줍니다.
+
+    사용 예:
+        with FakeElevenLabsServer(latency="lognormal:0.05,0.4") as server:
+            os.environ["ELEVENLABS_API_BASE"] = server.base_url
+    """
+
+    def __init__(self, latency="fixed:0", rate_limit_ratio=0.0, seed=0):
+        self.latency = LatencyModel(latency, seed=seed)
+        self.rate_limit_ratio = rate_limit_ratio
+        self._rng = random.Random(seed + 1)
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "bytes_sent": 0}
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                server._dispatch(self, "GET")
+
+            def do_POST(self):
+                server._dispatch(self, "POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def get_stats(self):
+        with self._stats_lock:
+            return dict(self.stats, latency=self.latency.spec, rate_limit_ratio=self.rate_limit_ratio)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _dispatch(self, handler, method):
+        self._count("requests")
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        time.sleep(self.latency.sample())
+
+        with self._stats_lock:
+            throttled = self._rng.random() < self.rate_limit_ratio
+        if throttled:
+            self._count("throttled")
+            self._send_json(handler, 429, RATE_LIMIT_BODY, headers={"Retry-After": "1"})
+            return
+
+        try:
+            status, payload, headers = self.handle(method, handler.path, body, handler.headers)
+        except Exception as e:
+            status, payload, headers = 500, {"error": {"code": 500, "message": str(e)}}, {}
+        if isinstance(payload, (bytes, bytearray)):
+            self._send_bytes(handler, status, payload, headers)
+        else:
+            self._send_json(handler, status, payload, headers)
+
+    def _send_bytes(self, handler, status, data, headers=None):
+        handler.send_response(status)
+        for key, value in (headers or {}).items():
+            handler.send_header(key, value)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+        self._count("bytes_sent", len(data))
+
+    def _send_json(self, handler, status, payload, headers=None):
+        data = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send_bytes(handler, status, data, {"Content-Type": "application/json; charset=utf-8", **(headers or {})})
+
+    def handle(self, method, path, body, headers):
+        """(상태 코드, JSON 객체 또는 바이트, 추가 헤더)를 반환합니다."""
+        raise NotImplementedError
+
+
+class FakeGeminiServer(_FakeServer):
+    """
+    Gemini REST API(generateContent / countTokens) 대역.
+
+    시스템 지시문으로 호출 종류(등장인물 분석 / 구조 분석 / 성우 매칭)를 구분하고,
+    입력 텍스트에서 결정적인 응답을 만듭니다. 합성 소설(corpus.generate_novel) 형식의 대사 줄에서 화자를 읽어냅니다.
+    """
+
+    def handle(self, method, path, body, headers):
+        if method != "POST":
+            return 404, {"error": {"code": 404, "message": path}}, {}
+        request = json.loads(body or b"{}")
+        system_text = _parts_text(request.get("systemInstruction") or request.get("system_instruction") or {})
+        user_text = "".join(_parts_text(content) for content in request.get("contents", []))
+
+        if path.split("?")[0].endswith(":countTokens"):
+            return 200, {"totalTokens": len(system_text) + len(user_text)}, {}
+        if not path.split("?")[0].endswith(":generateContent"):
+            return 404, {"error": {"code": 404, "message": path}}, {}
+
+        if "성우 매칭" in system_text:
+            # 로컬 엔진 결과를 그대로 두도록 빈 매핑을 반환
+            output = {}
+        elif "구조적 분석" in system_text:
+            output = fake_structure(user_text)
+        else:
+            output = fake_characters(user_text)
+        text = json.dumps(output, ensure_ascii=False)
+        return 200, {
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(system_text) + len(user_text),
+                "candidatesTokenCount": len(text),
+                "totalTokenCount": len(system_text) + len(user_text) + len(text),
+            },
+        }, {}
+
+
+class FakeElevenLabsServer(_FakeServer):
+    """
+    ElevenLabs API(음성 목록 / text-to-speech) 대역.
+
+    음성 합성 응답은 텍스트 길이에 비례하는 크기(audio_bytes_per_char)의 결정적인 바이트열입니다.
+    같은 (음성, 텍스트)는 같은 바이트를 돌려주므로 내용 기반 저장소의 중복 제거도 실제와 같이 동작합니다.
+    """
+
+    def __init__(self, voice_ids=(), audio_bytes_per_char=256, min_audio_bytes=1024, **kwargs):
+        super().__init__(**kwargs)
+        self.voice_ids = list(voice_ids)
+        self.audio_bytes_per_char = audio_bytes_per_char
+        self.min_audio_bytes = min_audio_bytes
+
+    def handle(self, method, path, body, headers):
+        path = path.split("?")[0]
+        if method == "GET" and path == "/v1/voices":
+            voices = [{"voice_id": voice_id, "name": f"fake-{voice_id}"} for voice_id in self.voice_ids]
+            etag = '"' + hashlib.sha256(",".join(self.voice_ids).encode()).hexdigest()[:16] + '"'
+            if headers.get("If-None-Match") == etag:
+                return 304, None, {"ETag": etag}
+            return 200, {"voices": voices}, {"ETag": etag}
+        if method == "POST" and path.startswith("/v1/text-to-speech/"):
+            voice_id = path.rsplit("/", 1)[-1]
+            text = json.loads(body or b"{}").get("text", "")
+            size = max(self.min_audio_bytes, len(text) * self.audio_bytes_per_char)
+            return 200, _fake_audio(voice_id, text, size), {"Content-Type": "audio/mpeg"}
+        return 404, {"detail": {"status": "not_found", "message": path}}, {}
+
+
+def _parts_text(content):
+    return "".join(part.get("text", "") for part in content.get("parts", []) if isinstance(part, dict))
+
+
+def _fake_audio(voice_id, text, size):
+    seed = hashlib.sha256(f"{voice_id}\0{text}".encode("utf-8")).digest()
+    header = b"ID3\x04\x00\x00\x00\x00\x00\x00"
+    body = seed * (size // len(seed) + 1)
+    return (header + body)[:size]
+
+
+def fake_characters(text):
+    """대사 줄의 화자를 등장 횟수 순으로 모아 등장인물 분석 결과를 만듭니다."""
+    known = {name: (description, speech) for name, description, speech in CAST}
+    counts = {}
+    for line in text.splitlines():
+        match = DIALOGUE_LINE_PATTERN.match(line.strip())
+        if match:
+            counts[match.group(2)] = counts.get(match.group(2), 0) + 1
+    characters = []
+    for name in sorted(counts, key=lambda n: -counts[n]):
+        description, speech = known.get(name, (f"{name}. 특징이 드러나지 않은 인물.", ""))
+        characters.append({"name": name, "description": description, "speech_pattern": speech})
+    return characters
+
+
+def fake_structure(text):
+    """줄 단위로 대사/내레이션 세그먼트를 만듭니다."""
+    segments = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        match = DIALOGUE_LINE_PATTERN.match(line)
+        if match:
+            segment = {"type": "dialogue", "speaker": match.group(2), "text": match.group(1)}
+        else:
+            segment = {"type": "narration", "speaker": "Narrator", "text": line}
+        segment.update({
+            "order": len(segments) + 1,
+            "emotion": "중립",
+            "tone": "차분함" if segment["type"] == "narration" else "일반",
+            "expression_guide": "",
+        })
+        segments.append(segment)
+    return segments
@@ -0,0 +1,385 @@
+"""
+Flask API 주요 엔드포인트(상태 폴링, 세그먼트 파일 제공, 메타데이터 목록) 부하 테스트.
+
+1. seed: 수천 개 프로젝트가 들어 있는 app_data를 만듭니다. (메타데이터, 매칭 결과, 세그먼트 오디오, 매니페스트)
+2. run: 시드된 app_data로 서버를 별도 프로세스에서 띄우고(또는 --target 서버에) 시나리오대로 부하를 준 뒤
+   엔드포인트별 요청 수, 오류 수, 초당 요청 수, p50/p90/p99 지연을 보고합니다.
+   --workers 1,2,4를 주면 워커 수마다 serve.py(prefork)로 서버를 다시 띄워 같은 시나리오를 실행하고 처리량 곡선을 출력합니다.
+
+시나리오는 benchmarks/scenarios/*.json (이름으로 지정) 또는 임의의 JSON 파일 경로입니다.
+    {"name", "duration_seconds", "warmup_seconds",
+     "workers": [{"endpoint": "status|segment|metadata|metadata_item", "clients", "think_time_seconds",
+                  "hot_projects"(선택, 앞쪽 N개 프로젝트만 사용), "range_bytes"(선택, 임의 위치 Range 요청)}]}
+
+사용 예 (backend 폴더에서):
+    python -m benchmarks.load_test seed --data-dir /tmp/loadtest_data --projects 3000
+    python -m benchmarks.load_test run --data-dir /tmp/loadtest_data --scenario polling
+    python -m benchmarks.load_test run --target http://127.0.0.1:8000 --scenario mixed --output result.json
+    python -m benchmarks.load_test run --data-dir /tmp/loadtest_data --scenario throughput --workers 1,2,4,8
+"""
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+import subprocess
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scenarios')
+ACTOR_LIST_FILE = os.path.join(BACKEND_DIR, 'app_data', 'actor_list.json')
+
+# 세그먼트 요청 대상을 고를 때 상태를 미리 조회해 둘 프로젝트 수
+SEGMENT_SAMPLE_PROJECTS = 50
+SERVER_START_TIMEOUT = 60
+
+
+# --- 시드 데이터 ---
+
+def seed_app_data(data_dir, projects, segments, audio_bytes, pack=False):
+    """
+    data_dir에 부하 테스트용 app_data를 만듭니다. 서비스 모듈은 APP_DATA_DIR 설정 후에 import합니다.
+
+    오디오는 실제 저장 경로(save_audio_file → 내용 해시 저장소)를 거쳐 기록되므로 서버 시작 시 이전 작업이 생기지 않습니다.
+    """
+    os.environ["APP_DATA_DIR"] = os.path.abspath(data_dir)
+    os.makedirs(data_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(data_dir, 'actor_list.json')):
+        with open(ACTOR_LIST_FILE, 'rb') as src, open(os.path.join(data_dir, 'actor_list.json'), 'wb') as dst:
+            dst.write(src.read())
+
+    from datetime import datetime
+    from services.text_storage_service import load_metadata, save_metadata, ensure_storage
+    from services.matching_service import NOVELS_MATCHED_PATH
+    from services.elevenlabs_service import save_audio_file, AUDIO_OUTPUT_FOLDER
+    from services.segment_pack import compact_folder
+
+    metadata = load_metadata()
+    ensure_storage()
+    started = time.monotonic()
+    for p in range(projects):
+        file_id = f"loadtest-{p:06d}"
+        speakers = ["Narrator", "민준", "서연", "지훈"]
+        story_items = [{
+            "order": order,
+            "type": "narration" if order % 3 else "dialogue",
+            "speaker": speakers[order % len(speakers)],
+            "text": f"부하 테스트 프로젝트 {p}의 {order}번째 문장입니다.",
+            "emotion": "중립",
+            "tone": "일반",
+        } for order in range(1, segments + 1)]
+        character_voice_map = {speaker: f"voice-{i}" for i, speaker in enumerate(speakers)}
+        with open(os.path.join(NOVELS_MATCHED_PATH, f"{file_id}_matching.json"), 'w', encoding='utf-8') as f:
+            json.dump({"character_voice_map": character_voice_map, "story_items": story_items}, f, ensure_ascii=False)
+
+        manifest = {}
+        for item in story_items:
+            # 세그먼트마다 다른 내용 (중복 제거로 하나의 블롭에 링크가 몰리지 않도록)
+            data = os.urandom(audio_bytes)
+            result, _ = save_audio_file(data, file_id, item["order"])
+            manifest[str(item["order"])] = {"version": 1, "voice_id": character_voice_map[item["speaker"]],
+                                            "sha256": result.get("sha256"), "updated_at": datetime.now().isoformat()}
+        output_dir = os.path.join(AUDIO_OUTPUT_FOLDER, file_id)
+        with open(os.path.join(output_dir, "audiobook_info.json"), 'w', encoding='utf-8') as f:
+            json.dump({"total_segments": segments, "start_time": datetime.now().isoformat(), "segments": manifest}, f)
+        if pack:
+            compact_folder(output_dir)
+
+        metadata[file_id] = {
+            "original_filename": f"loadtest_{p}.txt",
+            "saved_filename": f"{file_id}.txt",
+            "upload_timestamp": datetime.now().isoformat(),
+            "size_bytes": segments * 80,
+            "char_count": segments * 30,
+        }
+        if (p + 1) % 500 == 0:
+            print(f"  {p + 1}/{projects} 프로젝트 생성 ({time.monotonic() - started:.1f}초)", flush=True)
+    save_metadata(metadata)
+    print(f"시드 완료: {data_dir} (프로젝트 {projects}개 × 세그먼트 {segments}개, {time.monotonic() - started:.1f}초)")
+
+
+# --- 서버 ---
+
+def serve(data_dir, port):
+    """(자식 프로세스) 시드된 app_data로 Flask 개발 서버를 띄웁니다. 요청 로그는 끕니다."""
+    import logging
+    os.environ["APP_DATA_DIR"] = os.path.abspath(data_dir)
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    from app import create_app
+    create_app().run(host="127.0.0.1", port=port, threaded=True, use_reloader=False)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server_process(data_dir, workers=None):
+    """
+    시드된 app_data로 서버 프로세스를 띄웁니다.
+    workers를 주면 개발 서버 대신 serve.py(prefork, 워커 N개)로 띄웁니다.
+    """
+    port = _free_port()
+    env = {**os.environ, "PYTHONIOENCODING": "utf-8"}
+    if workers:
+        env["APP_DATA_DIR"] = os.path.abspath(data_dir)
+        command = [sys.executable, "serve.py", "--server", "prefork", "--workers", str(workers), "--port", str(port)]
+    else:
+        command = [sys.executable, "-m", "benchmarks.load_test", "serve", "--data-dir", data_dir, "--port", str(port)]
+    proc = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("서버 프로세스가 시작 중에 종료되었습니다.")
+        try:
+            requests.get(f"{base_url}/api/health", timeout=1)
+            return proc, base_url
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("서버가 제한 시간 안에 시작되지 않았습니다.")
+
+
+# --- 부하 생성 ---
+
+def load_scenario(name_or_path):
+    path = name_or_path if os.path.exists(name_or_path) else os.path.join(SCENARIO_DIR, f"{name_or_path}.json")
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class LoadTarget:
+    """서버의 프로젝트 목록과 세그먼트 목록을 미리 조회해 두고 요청 URL을 만듭니다."""
+
+    def __init__(self, base_url, seed=0):
+        self.base_url = base_url.rstrip("/")
+        self._rng = random.Random(seed)
+        self.project_ids = sorted(requests.get(f"{self.base_url}/api/metadata", timeout=60).json().keys())
+        if not self.project_ids:
+            raise RuntimeError("서버에 프로젝트가 없습니다. 먼저 seed를 실행하세요.")
+        self.segments = {}
+        for file_id in self._rng.sample(self.project_ids, min(SEGMENT_SAMPLE_PROJECTS, len(self.project_ids))):
+            status = requests.get(f"{self.base_url}/api/audiobook/status/{file_id}", timeout=60).json()
+            files = [name.split(".")[0] for name in status.get("audio_files", [])]
+            if files:
+                self.segments[file_id] = files
+
+    def request_for(self, worker, rng):
+        """(엔드포인트 이름, URL, 헤더)를 반환합니다."""
+        endpoint = worker["endpoint"]
+        projects = self.project_ids[:worker["hot_projects"]] if worker.get("hot_projects") else self.project_ids
+        if endpoint == "status":
+            return endpoint, f"{self.base_url}/api/audiobook/status/{rng.choice(projects)}", {}
+        if endpoint == "metadata":
+            return endpoint, f"{self.base_url}/api/metadata", {}
+        if endpoint == "metadata_item":
+            return endpoint, f"{self.base_url}/api/metadata/{rng.choice(projects)}", {}
+        if endpoint == "segment":
+            if not self.segments:
+                raise RuntimeError("오디오 세그먼트가 있는 프로젝트가 없습니다.")
+            file_id = rng.choice(list(self.segments))
+            url = f"{self.base_url}/api/audiobook/files/{file_id}/{rng.choice(self.segments[file_id])}"
+            headers = {}
+            if worker.get("range_bytes"):
+                start = rng.randrange(0, 4) * worker["range_bytes"]
+                headers["Range"] = f"bytes={start}-{start + worker['range_bytes'] - 1}"
+                return "segment_range", url, headers
+            return endpoint, url, headers
+        raise ValueError(f"알 수 없는 엔드포인트입니다: {endpoint}")
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_scenario(base_url, scenario, seed=0):
+    """
+    시나리오의 클라이언트 스레드들을 실행하고 엔드포인트별 결과를 반환합니다. 워밍업 구간의 요청은 집계하지 않습니다.
+
+    Returns:
+        dict: {엔드포인트: {requests, errors, rps, p50_ms, p90_ms, p99_ms, max_ms, bytes}}
+    """
+    target = LoadTarget(base_url, seed=seed)
+    warmup = scenario.get("warmup_seconds", 0)
+    duration = scenario.get("duration_seconds", 10)
+    start = time.monotonic()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+    samples = {}  # 엔드포인트 → [(지연 초, 성공 여부, 바이트)]
+    samples_lock = threading.Lock()
+
+    def _client(worker, client_seed):
+        rng = random.Random(client_seed)
+        session = requests.Session()
+        think = worker.get("think_time_seconds", 0)
+        local = {}
+        while True:
+            now = time.monotonic()
+            if now >= stop_at:
+                break
+            endpoint, url, headers = target.request_for(worker, rng)
+            sent = time.monotonic()
+            try:
+                response = session.get(url, headers=headers, timeout=30)
+                ok = response.status_code in (200, 206)
+                size = len(response.content)
+            except requests.exceptions.RequestException:
+                ok, size = False, 0
+            elapsed = time.monotonic() - sent
+            if sent >= measure_from:
+                local.setdefault(endpoint, []).append((elapsed, ok, size))
+            if think:
+                time.sleep(rng.uniform(0.5, 1.5) * think)
+        with samples_lock:
+            for endpoint, values in local.items():
+                samples.setdefault(endpoint, []).extend(values)
+
+    threads = []
+    for w, worker in enumerate(scenario["workers"]):
+        for c in range(worker.get("clients", 1)):
+            thread = threading.Thread(target=_client, args=(worker, seed * 100003 + w * 1009 + c), daemon=True)
+            thread.start()
+            threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    report = {}
+    for endpoint, values in sorted(samples.items()):
+        latencies = sorted(v[0] * 1000 for v in values)
+        report[endpoint] = {
+            "requests": len(values),
+            "errors": sum(1 for v in values if not v[1]),
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(_percentile(latencies, 0.50), 2),
+            "p90_ms": round(_percentile(latencies, 0.90), 2),
+            "p99_ms": round(_percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2),
+            "bytes": sum(v[2] for v in values),
+        }
+    return report
+
+
+def print_report(scenario, report):
+    print(f"\n시나리오: {scenario['name']} - {scenario.get('description', '')} ({scenario.get('duration_seconds')}초)")
+    print(f"{'엔드포인트':<16} {'요청':>8} {'오류':>6} {'req/s':>9} {'p50(ms)':>9} {'p90(ms)':>9} {'p99(ms)':>9} {'max(ms)':>9}")
+    print("-" * 84)
+    for endpoint, stats in report.items():
+        print(f"{endpoint:<16} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>9} "
+              f"{stats['p50_ms']:>9} {stats['p90_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+
+
+def print_worker_curve(curve):
+    """워커 수별 전체 처리량 / 지연 요약"""
+    print(f"\n{'워커':>4} {'req/s':>9} {'배율':>6} {'오류':>6} {'p50(ms)':>9} {'p99(ms)':>9}")
+    print("-" * 48)
+    base = curve[0]["rps"] or 1
+    for point in curve:
+        print(f"{point['workers']:>4} {point['rps']:>9} {point['rps'] / base:>6.2f} {point['errors']:>6} "
+              f"{point['p50_ms']:>9} {point['p99_ms']:>9}")
+
+
+def _curve_point(workers, report):
+    requests_total = sum(stats["requests"] for stats in report.values()) or 1
+    return {
+        "workers": workers,
+        "rps": round(sum(stats["rps"] for stats in report.values()), 1),
+        "errors": sum(stats["errors"] for stats in report.values()),
+        # 엔드포인트별 분위수를 요청 수로 가중 평균한 근사값
+        "p50_ms": round(sum(stats["p50_ms"] * stats["requests"] for stats in report.values()) / requests_total, 2),
+        "p99_ms": round(max(stats["p99_ms"] for stats in report.values()), 2) if report else None,
+    }
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Flask API 주요 엔드포인트 부하 테스트")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = sub.add_parser("seed", help="부하 테스트용 app_data 생성")
+    seed_parser.add_argument("--data-dir", required=True)
+    seed_parser.add_argument("--projects", type=int, default=2000)
+    seed_parser.add_argument("--segments", type=int, default=20, help="프로젝트당 세그먼트 수")
+    seed_parser.add_argument("--audio-bytes", type=int, default=64 * 1024, help="세그먼트 오디오 크기")
+    seed_parser.add_argument("--pack", action="store_true", help="세그먼트를 팩 형식으로 압축")
+
+    serve_parser = sub.add_parser("serve", help="시드된 app_data로 서버 실행")
+    serve_parser.add_argument("--data-dir", required=True)
+    serve_parser.add_argument("--port", type=int, default=8000)
+
+    run_parser = sub.add_parser("run", help="시나리오 실행")
+    run_parser.add_argument("--scenario", action="append", required=True,
+                            help="시나리오 이름(polling, seek, listing, mixed) 또는 JSON 경로. 여러 번 지정 가능")
+    group = run_parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--data-dir", help="시드된 app_data (이 데이터로 서버를 별도 프로세스에서 실행)")
+    group.add_argument("--target", help="이미 실행 중인 서버 주소 (예: http://127.0.0.1:8000)")
+    run_parser.add_argument("--duration", type=float, help="시나리오의 측정 시간(초) 덮어쓰기")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="결과 JSON 저장 경로")
+    run_parser.add_argument("--workers", help="워커 수 목록 (예: 1,2,4,8). --data-dir와 함께 사용하며 워커 수마다 serve.py로 서버를 띄움")
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.workers:
+        if not args.data_dir:
+            parser.error("--workers는 --data-dir와 함께 사용해야 합니다.")
+        args.workers = [int(value) for value in args.workers.split(",") if value.strip()]
+    return args
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    if args.command == "seed":
+        seed_app_data(args.data_dir, args.projects, args.segments, args.audio_bytes, pack=args.pack)
+        return 0
+    if args.command == "serve":
+        serve(args.data_dir, args.port)
+        return 0
+
+    scenarios = []
+    for name in args.scenario:
+        scenario = load_scenario(name)
+        if args.duration:
+            scenario["duration_seconds"] = args.duration
+        scenarios.append(scenario)
+
+    results = {}
+    for workers in (args.workers or [None]):
+        server = None
+        base_url = args.target
+        if args.data_dir:
+            server, base_url = start_server_process(args.data_dir, workers)
+            if workers:
+                print(f"\n=== 워커 {workers}개 ===")
+        try:
+            for scenario in scenarios:
+                report = run_scenario(base_url, scenario, seed=args.seed)
+                print_report(scenario, report)
+                result = results.setdefault(scenario["name"], {"scenario": scenario, "endpoints": report})
+                if workers:
+                    result.setdefault("workers", []).append(dict(_curve_point(workers, report), endpoints=report))
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=15)
+
+    if args.workers:
+        for name, result in results.items():
+            print(f"\n워커 수별 처리량: {name}")
+            print_worker_curve(result["workers"])
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+오프라인 파이프라인 벤치마크.
+
+실제 API 할당량을 쓰지 않고 로컬 대역 서버(Gemini / ElevenLabs)를 띄운 뒤,
+합성 한국어 소설로 업로드 → 분석 → 매칭 → generate_complete_audiobook 전체를 실행합니다.
+크기마다 별도 프로세스와 임시 app_data(APP_DATA_DIR)에서 실행하므로 실제 데이터와 캐시는 건드리지 않고,
+최대 RSS도 크기별로 따로 측정됩니다.
+
+사용 예 (backend 폴더에서):
+    python -m benchmarks.pipeline_benchmark --sizes 10000,100000
+    python -m benchmarks.pipeline_benchmark --tts-latency lognormal:0.08,0.5 --tts-429 0.05
+    python -m benchmarks.pipeline_benchmark --save-baseline benchmarks/baseline.json
+    python -m benchmarks.pipeline_benchmark --baseline benchmarks/baseline.json --tolerance 0.15
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACTOR_LIST_FILE = os.path.join(BACKEND_DIR, 'app_data', 'actor_list.json')
+
+DEFAULT_SIZES = "10000,100000,1000000"
+RESULT_MARKER = "BENCHMARK_RESULT "
+
+# 기준 결과와 비교하는 지표 (이름, 값이 클수록 좋은지 여부)
+COMPARED_METRICS = (("wall_seconds", False), ("segments_per_second", True), ("peak_rss_mb", False))
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_single(size, seed):
+    """
+    (자식 프로세스) 한 크기의 소설로 전체 파이프라인을 실행하고 결과 dict를 반환합니다.
+    환경 변수(APP_DATA_DIR, 대역 서버 주소)가 설정된 뒤에 서비스 모듈을 import해야 합니다.
+    """
+    from benchmarks.corpus import generate_novel
+    from services.text_storage_service import save_uploaded_text_stream, ensure_storage
+    from services.pipeline_service import run_analysis_pipeline
+    from services.rate_governor import gemini_rate_governor
+
+    ensure_storage()
+    text = generate_novel(size, seed=seed)
+    started = time.monotonic()
+
+    upload_started = time.monotonic()
+    saved = save_uploaded_text_stream(f"benchmark_{size}.txt", io.BytesIO(text.encode("utf-8")))
+    upload_seconds = time.monotonic() - upload_started
+
+    summary = run_analysis_pipeline(saved["id"], text, generate_audio=True)
+    wall_seconds = time.monotonic() - started
+
+    stages = {"upload": {"status": "completed", "duration_seconds": round(upload_seconds, 3)}}
+    stages.update({name: info for name, info in summary["stages"].items() if name != "_total"})
+    generation = summary.get("generation") or {}
+    generate_seconds = stages.get("generate", {}).get("duration_seconds") or 0
+    successful = generation.get("successful_segments") or 0
+    governor = gemini_rate_governor.get_stats()
+
+    return {
+        "size_chars": len(text),
+        "success": summary["success"],
+        "wall_seconds": round(wall_seconds, 3),
+        "characters": summary.get("character_count"),
+        "segments": summary.get("segment_count"),
+        "successful_segments": successful,
+        "failed_segments": generation.get("failed_segments"),
+        "segments_per_second": round(successful / generate_seconds, 2) if generate_seconds else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "stages": stages,
+        "gemini_queue_wait_seconds": round(governor.get("total_queue_wait_seconds", 0.0), 3),
+        "gemini_retries": governor.get("retries"),
+    }
+
+
+def _child_env(args, data_dir, gemini_url, elevenlabs_url):
+    env = dict(os.environ)
+    env.update({
+        "APP_DATA_DIR": data_dir,
+        "GOOGLE_API_KEY": "benchmark",
+        "GEMINI_API_ENDPOINT": gemini_url,
+        "ELEVENLABS_API_KEY": "benchmark",
+        "ELEVENLABS_API_BASE": elevenlabs_url,
+        "GEMINI_RPM_LIMIT": str(args.gemini_rpm),
+        "GEMINI_TPM_LIMIT": str(args.gemini_tpm),
+        "GEMINI_BACKOFF_BASE": str(args.backoff_base),
+        "ELEVENLABS_MAX_CONCURRENCY": str(args.tts_concurrency),
+        "PYTHONIOENCODING": "utf-8",
+    })
+    return env
+
+
+def run_benchmarks(args):
+    from benchmarks.fake_servers import FakeGeminiServer, FakeElevenLabsServer
+
+    with open(ACTOR_LIST_FILE, 'r', encoding='utf-8') as f:
+        voice_ids = [actor["id"] for actor in json.load(f)]
+
+    results = {}
+    gemini = FakeGeminiServer(latency=args.gemini_latency, rate_limit_ratio=args.gemini_429, seed=args.seed)
+    elevenlabs = FakeElevenLabsServer(voice_ids=voice_ids, audio_bytes_per_char=args.audio_bytes_per_char,
+                                      latency=args.tts_latency, rate_limit_ratio=args.tts_429, seed=args.seed)
+    with gemini, elevenlabs:
+        for size in args.sizes:
+            data_dir = tempfile.mkdtemp(prefix=f"audiobook_bench_{size}_")
+            try:
+                shutil.copy(ACTOR_LIST_FILE, os.path.join(data_dir, 'actor_list.json'))
+                before = (gemini.get_stats(), elevenlabs.get_stats())
+                proc = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.pipeline_benchmark", "--child-size", str(size), "--seed", str(args.seed)],
+                    cwd=BACKEND_DIR, env=_child_env(args, data_dir, gemini.base_url, elevenlabs.base_url),
+                    capture_output=True, text=True, encoding="utf-8"
+                )
+                lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+                if proc.returncode != 0 or not lines:
+                    results[str(size)] = {"success": False, "error": proc.stderr.strip().splitlines()[-5:]}
+                    continue
+                result = json.loads(lines[-1][len(RESULT_MARKER):])
+                after = (gemini.get_stats(), elevenlabs.get_stats())
+                result["fake_servers"] = {
+                    name: {key: after[i][key] - before[i][key] for key in ("requests", "throttled", "bytes_sent")}
+                    for i, name in enumerate(("gemini", "elevenlabs"))
+                }
+                results[str(size)] = result
+            finally:
+                if not args.keep_data:
+                    shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "config": {
+            "seed": args.seed,
+            "gemini_latency": args.gemini_latency,
+            "gemini_429": args.gemini_429,
+            "tts_latency": args.tts_latency,
+            "tts_429": args.tts_429,
+            "tts_concurrency": args.tts_concurrency,
+            "audio_bytes_per_char": args.audio_bytes_per_char,
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    기준 결과와 비교하여 허용 범위(tolerance, 비율)를 넘게 나빠진 지표 목록을 반환합니다.
+    """
+    regressions = []
+    for size, result in report["results"].items():
+        base = baseline.get("results", {}).get(size)
+        if not base or not result.get("success"):
+            continue
+        comparison = {}
+        for metric, higher_is_better in COMPARED_METRICS:
+            current, previous = result.get(metric), base.get(metric)
+            if not current or not previous:
+                continue
+            change = (current - previous) / previous
+            comparison[metric] = {"baseline": previous, "current": current, "change": round(change, 3)}
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{size}자 {metric}: {previous} → {current} ({change:+.1%})")
+        result["baseline_comparison"] = comparison
+    return regressions
+
+
+def print_report(report):
+    header = f"{'크기(자)':>10} {'세그먼트':>8} {'실패':>5} {'전체(초)':>9} {'세그먼트/초':>11} {'RSS(MB)':>8}  단계별(초)"
+    print(header)
+    print("-" * 100)
+    for size, result in report["results"].items():
+        if not result.get("success") and "error" in result:
+            print(f"{size:>10} 실패: {result['error']}")
+            continue
+        stages = " ".join(f"{name}={info.get('duration_seconds')}" for name, info in result["stages"].items())
+        print(f"{result['size_chars']:>10} {result['successful_segments']:>8} {result['failed_segments'] or 0:>5} "
+              f"{result['wall_seconds']:>9} {str(result['segments_per_second']):>11} {str(result['peak_rss_mb']):>8}  {stages}")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="로컬 대역 서버를 이용한 오디오북 파이프라인 벤치마크")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="쉼표로 구분한 소설 글자 수 (기본: 10k, 100k, 1M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gemini-latency", default="lognormal:0.5,0.3", help="Gemini 응답 지연 분포 (fixed:/uniform:/lognormal:)")
+    parser.add_argument("--gemini-429", type=float, default=0.0, help="Gemini 429 응답 비율 (0~1)")
+    parser.add_argument("--tts-latency", default="lognormal:0.05,0.4", help="ElevenLabs 응답 지연 분포")
+    parser.add_argument("--tts-429", type=float, default=0.0, help="ElevenLabs 429 응답 비율 (0~1)")
+    parser.add_argument("--tts-concurrency", type=int, default=3, help="ELEVENLABS_MAX_CONCURRENCY")
+    parser.add_argument("--audio-bytes-per-char", type=int, default=256, help="합성 오디오 크기 (글자당 바이트)")
+    parser.add_argument("--gemini-rpm", type=int, default=100000, help="GEMINI_RPM_LIMIT (기본: 사실상 무제한)")
+    parser.add_argument("--gemini-tpm", type=int, default=10 ** 9, help="GEMINI_TPM_LIMIT (기본: 사실상 무제한)")
+    parser.add_argument("--backoff-base", type=float, default=0.05, help="GEMINI_BACKOFF_BASE (초)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--save-baseline", help="결과를 기준 결과로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="허용하는 성능 저하 비율 (기본 10%%)")
+    parser.add_argument("--keep-data", action="store_true", help="임시 app_data를 지우지 않음")
+    parser.add_argument("--child-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    return args
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    if args.child_size:
+        import logging
+        logging.basicConfig(level=logging.WARNING)
+        print(RESULT_MARKER + json.dumps(run_single(args.child_size, args.seed), ensure_ascii=False), flush=True)
+        return 0
+
+    report = run_benchmarks(args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    print_report(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"결과 저장: {path}")
+
+    if regressions:
+        print("\n기준 대비 성능 저하:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    return 0 if all(result.get("success") for result in report["results"].values()) else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+앱 시작 시간 벤치마크.
+
+워커 프로세스를 새로 띄울 때 드는 비용을 측정합니다. 시나리오마다 새 인터프리터를 여러 번 실행하여
+프로세스 전체 시간(인터프리터 시작 포함)과 import 이후 구간 시간의 중앙값을 구합니다.
+임시 app_data(APP_DATA_DIR)에서 실행하므로 실제 데이터는 건드리지 않습니다.
+
+사용 예 (backend 폴더에서):
+    python -m benchmarks.startup_benchmark
+    python -m benchmarks.startup_benchmark --repeat 10 --importtime 15
+    python -m benchmarks.startup_benchmark --save-baseline benchmarks/startup_baseline.json
+    python -m benchmarks.startup_benchmark --baseline benchmarks/startup_baseline.json --tolerance 0.2
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACTOR_LIST_FILE = os.path.join(BACKEND_DIR, 'app_data', 'actor_list.json')
+RESULT_MARKER = "STARTUP_RESULT "
+
+# 시나리오 이름 -> 자식 프로세스에서 실행할 코드
+SCENARIOS = {
+    "import": "import app",
+    "create_app": "import app; app.create_app(start_services=False)",
+    "first_request": (
+        "import app; client = app.create_app(start_services=False).test_client(); "
+        "assert client.get('/api/health').status_code == 200"
+    ),
+    "create_app_with_services": "import app; app.create_app()",
+}
+
+_CHILD_TEMPLATE = """
+import time
+_started = time.perf_counter()
+{code}
+print({marker!r} + str(time.perf_counter() - _started), flush=True)
+"""
+
+
+def _run_child(code, env):
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", _CHILD_TEMPLATE.format(code=code, marker=RESULT_MARKER)],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True, encoding="utf-8")
+    process_seconds = time.perf_counter() - started
+    lines = [line for line in proc.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-3:])
+    return process_seconds, float(lines[-1][len(RESULT_MARKER):])
+
+
+def _import_time_top(env, limit):
+    """-X importtime 결과에서 누적 시간이 큰 최상위 import 목록"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                          cwd=BACKEND_DIR, env=env, capture_output=True, text=True, encoding="utf-8")
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if cumulative.isdigit():
+            # 들여쓰기 깊이 = app이 직접 import한 모듈인지 판단
+            depth = (len(line.split("|")[2]) - len(line.split("|")[2].lstrip())) // 2
+            entries.append({"module": name, "cumulative_ms": round(int(cumulative) / 1000, 1), "depth": depth})
+    entries.sort(key=lambda entry: entry["cumulative_ms"], reverse=True)
+    return entries[:limit]
+
+
+def run_benchmarks(args):
+    data_dir = tempfile.mkdtemp(prefix="audiobook_startup_")
+    try:
+        shutil.copy(ACTOR_LIST_FILE, os.path.join(data_dir, 'actor_list.json'))
+        env = dict(os.environ, APP_DATA_DIR=data_dir, PYTHONIOENCODING="utf-8", PYTHONWARNINGS="ignore")
+        # 첫 실행은 .pyc 생성 / 디스크 캐시 예열용으로 버림
+        _run_child(SCENARIOS["import"], env)
+
+        results = {}
+        for name in args.scenarios:
+            samples = [_run_child(SCENARIOS[name], env) for _ in range(args.repeat)]
+            results[name] = {
+                "process_seconds": round(statistics.median(s[0] for s in samples), 3),
+                "in_process_seconds": round(statistics.median(s[1] for s in samples), 3),
+                "max_process_seconds": round(max(s[0] for s in samples), 3),
+            }
+        report = {"config": {"repeat": args.repeat, "python": sys.version.split()[0]}, "results": results}
+        if args.importtime:
+            report["slowest_imports"] = _import_time_top(env, args.importtime)
+        return report
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """기준 결과보다 허용 범위(비율)를 넘게 느려진 시나리오 목록을 반환합니다."""
+    regressions = []
+    for name, result in report["results"].items():
+        previous = baseline.get("results", {}).get(name, {}).get("process_seconds")
+        if not previous:
+            continue
+        change = (result["process_seconds"] - previous) / previous
+        result["baseline_comparison"] = {"baseline": previous, "change": round(change, 3)}
+        if change > tolerance:
+            regressions.append(f"{name}: {previous}초 → {result['process_seconds']}초 ({change:+.1%})")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'시나리오':<26} {'프로세스(초)':>12} {'import 이후(초)':>16} {'최대(초)':>9}")
+    print("-" * 68)
+    for name, result in report["results"].items():
+        print(f"{name:<26} {result['process_seconds']:>12} {result['in_process_seconds']:>16} {result['max_process_seconds']:>9}")
+    if report.get("slowest_imports"):
+        print("\n누적 import 시간이 큰 모듈:")
+        for entry in report["slowest_imports"]:
+            print(f"  {entry['cumulative_ms']:>8.1f}ms  {'  ' * entry['depth']}{entry['module']}")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="앱 시작(import / create_app / 첫 요청) 시간 벤치마크")
+    parser.add_argument("--scenario", dest="scenarios", action="append", choices=sorted(SCENARIOS),
+                        help="실행할 시나리오 (여러 번 지정 가능, 기본: 전체)")
+    parser.add_argument("--repeat", type=int, default=5, help="시나리오별 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--importtime", type=int, default=0, help="누적 import 시간이 큰 모듈 N개 출력")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--save-baseline", help="결과를 기준 결과로 저장할 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용하는 시작 시간 증가 비율 (기본 20%%)")
+    args = parser.parse_args(argv)
+    args.scenarios = args.scenarios or list(SCENARIOS)
+    return args
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    try:
+        report = run_benchmarks(args)
+    except RuntimeError as e:
+        print(f"시작 실패: {e}")
+        return 2
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_with_baseline(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    print_report(report)
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"결과 저장: {path}")
+
+    if regressions:
+        print("\n기준 대비 시작 시간 증가:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
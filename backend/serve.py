@@ -0,0 +1,178 @@
+"""
+운영용 서버 실행 스크립트 (워커 프로세스 여러 개).
+
+`python app.py`는 디버그용 단일 프로세스 개발 서버입니다. 운영에서는 이 스크립트로 워커 N개를 띄웁니다.
+워커끼리는 작업/진행 상태(app_data/jobs.sqlite3)와 파일 잠금(metadata.json, audiobook_info.json, 오디오 저장소)을 공유하고,
+Gemini 할당량과 ElevenLabs 동시 요청 수는 WEB_CONCURRENCY(워커 수)로 나눠 워커마다 몫을 가집니다.
+
+서버 종류:
+- gunicorn: gthread 워커 (설치되어 있으면 POSIX 기본값)
+- prefork:  표준 라이브러리만 사용하는 POSIX 사전 fork 서버 (부모가 소켓을 열고 자식 N개가 같은 소켓에서 요청을 받음)
+- waitress: 단일 프로세스 멀티스레드 (Windows용, --workers 무시)
+
+사용 예 (backend 폴더에서):
+    python serve.py --workers 4
+    python serve.py --server gunicorn --workers 4 --threads 8 --port 8000
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import traceback
+import importlib.util
+
+DEFAULT_WORKERS = int(os.environ.get("WEB_CONCURRENCY", min(4, os.cpu_count() or 1)))
+DEFAULT_THREADS = int(os.environ.get("WEB_THREADS", 8))
+# 오디오북 생성 요청은 끝날 때까지 응답하지 않으므로 워커 타임아웃을 길게 둠 (초)
+WORKER_TIMEOUT = int(os.environ.get("WORKER_TIMEOUT", 3600))
+
+
+def _load_app():
+    # 워커 프로세스 안에서(fork 이후) 앱을 만들어야 백그라운드 스레드와 DB 연결이 워커마다 따로 생김
+    from app import create_app
+    return create_app()
+
+
+def serve_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class _Application(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("timeout", WORKER_TIMEOUT)
+            self.cfg.set("preload_app", False)
+
+        def load(self):
+            return _load_app()
+
+    _Application().run()
+
+
+def serve_waitress(args):
+    from waitress import serve
+    serve(_load_app(), host=args.host, port=args.port, threads=args.threads)
+
+
+def _run_prefork_child(sock, args):
+    from werkzeug.serving import make_server
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = make_server(args.host, args.port, _load_app(), threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def serve_prefork(args):
+    """부모 프로세스가 소켓을 열고 워커를 fork합니다. 워커가 죽으면 새로 띄웁니다."""
+    sock = socket.socket(socket.AF_INET6 if ":" in args.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    children = {}
+    stopping = False
+
+    def _spawn():
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_prefork_child(sock, args)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    for _ in range(args.workers):
+        _spawn()
+    print(f"prefork 서버 시작: http://{args.host}:{args.port} (워커 {args.workers}개, pid {list(children)})", flush=True)
+
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            pid = 0
+        if pid and pid in children:
+            started = children.pop(pid)
+            print(f"워커 {pid} 종료 (상태 {status}), 다시 시작합니다.", flush=True)
+            # 시작하자마자 죽는 경우(import 오류 등) 빠르게 반복하지 않도록 잠시 대기
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+            _spawn()
+        else:
+            time.sleep(0.2)
+
+    for pid in list(children):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    deadline = time.monotonic() + 10
+    while children and time.monotonic() < deadline:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            children.pop(pid, None)
+        else:
+            time.sleep(0.1)
+    for pid in children:
+        os.kill(pid, signal.SIGKILL)
+    sock.close()
+
+
+def _choose_server(name):
+    if name != "auto":
+        return name
+    if os.name != "posix":
+        return "waitress"
+    return "gunicorn" if importlib.util.find_spec("gunicorn") else "prefork"
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="오디오북 API 운영 서버 (워커 프로세스 여러 개)")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "prefork", "waitress"), default="auto")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="워커 프로세스 수")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS, help="워커당 요청 처리 스레드 수 (gunicorn / waitress)")
+    parser.add_argument("--host", default=os.environ.get("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    server = _choose_server(args.server)
+    if server == "waitress":
+        args.workers = 1
+    args.workers = max(1, args.workers)
+    # 워커가 import할 때 읽어서 프로젝트 전체 할당량을 워커 수로 나눔
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    if server == "gunicorn":
+        serve_gunicorn(args)
+    elif server == "prefork":
+        if os.name != "posix":
+            print("prefork 서버는 POSIX에서만 사용할 수 있습니다. --server waitress를 사용하세요.")
+            return 2
+        serve_prefork(args)
+    else:
+        serve_waitress(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import os
+import json
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+import concurrent.futures
+
+import requests
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp가 없으면 requests를 스레드 풀에서 실행 (동시 호출 수가 ASYNC_BLOCKING_WORKERS로 제한됨)
+    aiohttp = None
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 공유 HTTP 클라이언트의 최대 동시 연결 수 / 요청 제한 시간 (초)
+ASYNC_HTTP_LIMIT = int(os.environ.get("ASYNC_HTTP_LIMIT", 1000))
+ASYNC_HTTP_TIMEOUT = float(os.environ.get("ASYNC_HTTP_TIMEOUT", 300))
+# 이벤트 루프에서 실행할 수 없는 블로킹 작업(파일 I/O, 동기 SDK 호출 등)용 스레드 수
+ASYNC_BLOCKING_WORKERS = int(os.environ.get("ASYNC_BLOCKING_WORKERS", 32))
+
+# 서비스 코드에서 잡을 HTTP 오류 (어느 백엔드를 쓰든 같은 except 절로 처리)
+HTTP_ERRORS = (requests.exceptions.RequestException, asyncio.TimeoutError) + ((aiohttp.ClientError,) if aiohttp else ())
+
+
+class HttpResponse:
+    """공유 HTTP 클라이언트 응답. requests.Response에서 서비스 코드가 쓰던 속성만 제공합니다."""
+
+    __slots__ = ("status_code", "headers", "content")
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(f"{self.status_code} Error: {self.text[:200]}")
+
+
+class AsyncRuntime:
+    """
+    프로세스 전체에서 공유하는 이벤트 루프 (전용 데몬 스레드에서 실행).
+
+    - 외부 API 호출(Gemini, ElevenLabs)은 이 루프의 코루틴으로 실행되므로, 동시에 진행 중인 호출 수가 스레드 수에 묶이지 않습니다.
+    - 동기 코드는 run()으로 코루틴을 제출하고 결과를 기다립니다. 호출한 쪽의 컨텍스트(작업 트레이스, 작업 진행률, Flask 요청)를 이어받습니다.
+    - HTTP 호출은 연결을 재사용하는 공유 클라이언트(aiohttp)로 보냅니다.
+    - fork 이후 자식 프로세스에서는 루프와 클라이언트를 새로 만듭니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._session = None
+        self._executor = None
+        self._stats = {"in_flight": 0, "peak_in_flight": 0, "requests": 0}
+
+    # --- 루프 ---
+
+    def _ensure_loop(self):
+        if self._loop is not None and self._pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run, name="async-io", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=ASYNC_BLOCKING_WORKERS, thread_name_prefix="async-blocking")
+                self._session = None
+                self._pid = os.getpid()
+                self._loop = loop
+        return self._loop
+
+    def in_loop_thread(self):
+        return self._thread is not None and self._thread is threading.current_thread() and self._pid == os.getpid()
+
+    def submit(self, coro):
+        """
+        코루틴을 공유 루프에 제출하고 concurrent.futures.Future를 반환합니다.
+        제출한 쪽의 contextvars(트레이스, 작업, Flask 요청 컨텍스트)를 복사해서 실행합니다.
+        """
+        loop = self._ensure_loop()
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def _start():
+            if not future.set_running_or_notify_cancel():
+                coro.close()
+                return
+            task = loop.create_task(coro, name=getattr(coro, "__qualname__", None), context=context)
+
+            def _done(done_task):
+                if done_task.cancelled():
+                    future.cancel()
+                elif done_task.exception() is not None:
+                    future.set_exception(done_task.exception())
+                else:
+                    future.set_result(done_task.result())
+
+            task.add_done_callback(_done)
+
+        loop.call_soon_threadsafe(_start)
+        return future
+
+    def run(self, coro, timeout=None):
+        """
+        동기 코드에서 코루틴을 실행하고 결과를 반환합니다. (예외는 그대로 전달)
+        루프 스레드 안에서 호출하면 교착 상태가 되므로 RuntimeError를 발생시킵니다.
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("공유 이벤트 루프 안에서는 동기 래퍼를 호출할 수 없습니다. async 함수를 await 하세요.")
+        return self.submit(coro).result(timeout)
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """블로킹 함수를 스레드 풀에서 실행하고 기다립니다. (현재 컨텍스트 유지)"""
+        self._ensure_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    # --- HTTP ---
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=ASYNC_HTTP_LIMIT),
+                timeout=aiohttp.ClientTimeout(total=ASYNC_HTTP_TIMEOUT),
+            )
+        return self._session
+
+    async def request(self, method, url, headers=None, json=None):
+        """
+        공유 HTTP 클라이언트로 요청을 보내고 본문까지 읽은 응답을 반환합니다.
+
+        Returns:
+            HttpResponse: 상태 코드, 헤더, 본문
+
+        Raises:
+            HTTP_ERRORS 중 하나: 연결 실패, 제한 시간 초과 등
+        """
+        self._stats["requests"] += 1
+        self._stats["in_flight"] += 1
+        self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+        try:
+            if aiohttp is not None:
+                async with self._get_session().request(method, url, headers=headers, json=json) as response:
+                    content = await response.read()
+                    return HttpResponse(response.status, response.headers, content)
+            response = await self.run_blocking(requests.request, method, url, headers=headers, json=json,
+                                               timeout=ASYNC_HTTP_TIMEOUT)
+            return HttpResponse(response.status_code, response.headers, response.content)
+        finally:
+            self._stats["in_flight"] -= 1
+
+    def get_stats(self):
+        return dict(self._stats, http_backend="aiohttp" if aiohttp is not None else "requests-threadpool",
+                    blocking_workers=ASYNC_BLOCKING_WORKERS)
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+async_runtime = AsyncRuntime()
@@ -0,0 +1,270 @@
+import os
+import time
+import errno
+import hashlib
+import logging
+import threading
+
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.file_lock import InterProcessLock
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 내용 주소 기반 오디오 저장소 경로 (audio_blobs/<해시 앞 2자리>/<sha256>.mp3)
+AUDIO_BLOB_FOLDER = os.path.join(BASE_STORAGE_PATH, 'audio_blobs')
+
+# 참조가 없어진 블롭을 삭제하기 전 유예 시간 (초) - 막 저장되어 아직 연결되지 않은 블롭 보호
+AUDIO_BLOB_GC_GRACE_SECONDS = int(os.environ.get("AUDIO_BLOB_GC_GRACE_SECONDS", 600))
+# 백그라운드 GC 실행 간격 (초)
+AUDIO_BLOB_GC_INTERVAL = int(os.environ.get("AUDIO_BLOB_GC_INTERVAL", 3600))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class AudioBlobStore:
+    """
+    오디오 세그먼트를 내용 해시(sha256)로 한 번만 저장하는 저장소.
+
+    책별 폴더의 NNN.mp3는 블롭에 대한 하드 링크이므로 기존 경로/서빙 코드는 그대로 동작하며,
+    블롭의 링크 수 - 1이 곧 참조 수입니다. 책 폴더를 지우면 참조만 줄어들고,
+    참조가 0이 된 블롭은 가비지 컬렉터가 정리합니다.
+    하드 링크를 지원하지 않는 파일 시스템에서는 일반 파일로 저장합니다. (중복 제거 없음)
+    """
+
+    def __init__(self, root=AUDIO_BLOB_FOLDER, gc_grace_seconds=AUDIO_BLOB_GC_GRACE_SECONDS):
+        self.root = root
+        self.gc_grace_seconds = gc_grace_seconds
+        # 링크 생성과 GC 삭제가 겹치지 않도록 보호 (워커 프로세스 간 공유).
+        # 잠금 파일은 GC가 훑는 블롭 폴더 밖에 둠 (지워지면 다른 프로세스가 새 inode를 잠가 상호 배제가 깨짐)
+        self._lock = InterProcessLock(f"{root}.lock")
+        self._links_supported = True
+        self._gc_thread = None
+        self._stop_event = threading.Event()
+
+    def blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], f"{digest}.mp3")
+
+    def refcount(self, digest):
+        """블롭을 참조하는 책별 파일 수. 블롭이 없으면 0."""
+        try:
+            return os.stat(self.blob_path(digest)).st_nlink - 1
+        except FileNotFoundError:
+            return 0
+
+    def _link_into(self, blob, dest_path):
+        """블롭을 dest_path에 원자적으로 연결합니다. (lock 보유 상태에서 호출)"""
+        tmp_path = dest_path + ".link"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        os.link(blob, tmp_path)
+        os.replace(tmp_path, dest_path)
+
+    def put_bytes(self, data, dest_path):
+        """
+        오디오 데이터를 저장소에 넣고 dest_path(책별 세그먼트 경로)에 연결합니다.
+
+        Returns:
+            str: 내용 해시 (sha256)
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        if not self._links_supported:
+            self._write_plain(data, dest_path)
+            return digest
+
+        blob = self.blob_path(digest)
+        with self._lock:
+            if not os.path.exists(blob):
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                tmp_blob = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_blob, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_blob, blob)
+            try:
+                self._link_into(blob, dest_path)
+            except OSError as e:
+                if e.errno not in (errno.EPERM, errno.EXDEV, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+                    raise
+                logger.warning(f"하드 링크를 사용할 수 없어 중복 제거 없이 저장합니다: {e}")
+                self._links_supported = False
+                self._write_plain(data, dest_path)
+        return digest
+
+    @staticmethod
+    def _write_plain(data, dest_path):
+        tmp_path = dest_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, dest_path)
+
+    def adopt_file(self, path):
+        """
+        이미 존재하는 세그먼트 파일을 저장소로 옮깁니다. 같은 내용의 블롭이 있으면 그 블롭으로 교체하여 공간을 회수합니다.
+
+        Returns:
+            tuple: (내용 해시, 회수한 바이트 수)
+        """
+        digest = _file_sha256(path)
+        blob = self.blob_path(digest)
+        with self._lock:
+            if os.path.exists(blob):
+                if os.path.samefile(blob, path):
+                    return digest, 0
+                size = os.path.getsize(path)
+                self._link_into(blob, path)
+                return digest, size
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            os.link(path, blob)
+            return digest, 0
+
+    def migrate(self, audio_root):
+        """
+        audio_root 아래(챕터 폴더 포함)의 모든 세그먼트 파일을 저장소로 옮깁니다. 이미 옮겨진 파일은 건너뜁니다.
+
+        Returns:
+            dict: 처리한 파일 수, 중복 제거된 파일 수, 회수한 바이트 수
+        """
+        stats = {"files": 0, "migrated": 0, "deduplicated": 0, "bytes_reclaimed": 0, "errors": 0}
+        if not self._links_supported:
+            return stats
+        for dirpath, _, filenames in os.walk(audio_root):
+            for filename in filenames:
+                if not filename.endswith(".mp3"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                stats["files"] += 1
+                try:
+                    # 링크 수가 2 이상이면 이미 저장소 블롭과 연결된 파일
+                    if os.stat(path).st_nlink > 1:
+                        continue
+                    _, reclaimed = self.adopt_file(path)
+                    stats["migrated"] += 1
+                    if reclaimed:
+                        stats["deduplicated"] += 1
+                        stats["bytes_reclaimed"] += reclaimed
+                except OSError as e:
+                    stats["errors"] += 1
+                    logger.warning(f"오디오 저장소 이전 실패 ({path}): {e}")
+                    if e.errno in (errno.EPERM, errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP):
+                        self._links_supported = False
+                        return stats
+        logger.info(f"오디오 저장소 이전 완료: {stats}")
+        return stats
+
+    def _blob_dirs(self):
+        """해시 앞 2자리 폴더들의 (경로, 파일명 리스트)"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return
+        for name in names:
+            dirpath = os.path.join(self.root, name)
+            if len(name) == 2 and all(c in "0123456789abcdef" for c in name) and os.path.isdir(dirpath):
+                yield dirpath, os.listdir(dirpath)
+
+    def collect_garbage(self, grace_seconds=None):
+        """
+        참조가 없는(링크 수 1) 블롭 중 유예 시간이 지난 것을 삭제합니다.
+
+        Returns:
+            dict: 검사한 블롭 수, 삭제한 블롭 수, 회수한 바이트 수
+        """
+        grace = self.gc_grace_seconds if grace_seconds is None else grace_seconds
+        now = time.time()
+        stats = {"scanned": 0, "removed": 0, "bytes_freed": 0}
+        with self._lock:
+            for dirpath, filenames in self._blob_dirs():
+                for filename in filenames:
+                    # 해시 폴더의 블롭(*.mp3)과 중단된 저장의 잔여 파일(*.tmp)만 대상
+                    if not filename.endswith((".mp3", ".tmp")):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    if filename.endswith(".tmp"):
+                        # 중단된 저장의 잔여 파일
+                        if now - st.st_mtime > grace:
+                            os.remove(path)
+                        continue
+                    stats["scanned"] += 1
+                    if st.st_nlink <= 1 and now - st.st_mtime > grace:
+                        os.remove(path)
+                        stats["removed"] += 1
+                        stats["bytes_freed"] += st.st_size
+        if stats["removed"]:
+            logger.info(f"오디오 저장소 GC: {stats}")
+        return stats
+
+    def start_background_gc(self, interval_seconds=AUDIO_BLOB_GC_INTERVAL, migrate_root=None):
+        """
+        주기적으로 GC를 실행하는 데몬 스레드를 시작합니다. migrate_root를 주면 먼저 기존 폴더를 이전합니다.
+        워커 프로세스가 여러 개면 담당 잠금을 잡은 한 프로세스만 이전/GC를 실행하며,
+        그 프로세스가 종료되면 다음 주기에 다른 워커가 이어받습니다.
+        """
+        if self._gc_thread and self._gc_thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def _loop():
+            leader_lock = InterProcessLock(f"{self.root}.gc-leader.lock")
+            is_leader = False
+            wait_seconds = 0
+            while not self._stop_event.wait(wait_seconds):
+                wait_seconds = interval_seconds
+                if not is_leader:
+                    is_leader = leader_lock.acquire(blocking=False)
+                    if is_leader and migrate_root:
+                        try:
+                            self.migrate(migrate_root)
+                        except Exception as e:
+                            logger.error(f"오디오 저장소 이전 중 오류: {e}")
+                    continue
+                try:
+                    self.collect_garbage()
+                except Exception as e:
+                    logger.error(f"오디오 저장소 GC 중 오류: {e}")
+
+        self._gc_thread = threading.Thread(target=_loop, name="audio-blob-gc", daemon=True)
+        self._gc_thread.start()
+
+    def stop_background_gc(self):
+        self._stop_event.set()
+
+    def get_stats(self):
+        """저장소의 블롭 수, 실제 사용 바이트, 참조 수 합계, 참조 없는 블롭 수를 반환합니다."""
+        stats = {"blobs": 0, "stored_bytes": 0, "references": 0, "logical_bytes": 0, "unreferenced": 0,
+                 "links_supported": self._links_supported}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if not filename.endswith(".mp3"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, filename))
+                except FileNotFoundError:
+                    continue
+                refs = st.st_nlink - 1
+                stats["blobs"] += 1
+                stats["stored_bytes"] += st.st_size
+                stats["references"] += refs
+                stats["logical_bytes"] += st.st_size * refs
+                if refs <= 0:
+                    stats["unreferenced"] += 1
+        return stats
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+audio_blob_store = AudioBlobStore()
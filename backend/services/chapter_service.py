@@ -0,0 +1,309 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+from services.gemini_service import extract_characters_from_text, analyze_novel_structure
+from services.text_storage_service import (
+    get_metadata, update_metadata_entry, update_chapter_entry, open_text_reader, get_processed_text_path,
+    save_character_analysis, NOVELS_PROCESSED_FOLDER
+)
+from services.matching_service import match_with_cache, load_voice_actors, load_character_analysis, load_matching_result, save_matching_result
+from services.elevenlabs_service import synthesize_segments, synthesis_scheduler, AUDIO_OUTPUT_FOLDER
+from services.pipeline_service import PipelineStage, run_stage_graph
+from services.segment_pack import list_segment_files, compact_folder, AUDIO_PACK_SEGMENTS
+from services.metrics import JOBS_IN_PROGRESS
+from services.tracing import span, traced_job, bind_trace
+from services.job_store import job_store, tracked_job, JobAlreadyRunningError
+from services.synthesis_scheduler import PRIORITY_BULK
+from services.work_queue import WORK_QUEUE_ENABLED, ITEM_DONE, register_handler, run_batch
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 동시에 처리할 최대 챕터 단계 수 (구조 분석/합성)
+CHAPTER_MAX_WORKERS = int(os.environ.get("CHAPTER_MAX_WORKERS", 4))
+
+# 챕터 상태
+CHAPTER_PENDING = "pending"
+CHAPTER_ANALYZING = "analyzing"
+CHAPTER_ANALYZED = "analyzed"
+CHAPTER_SYNTHESIZING = "synthesizing"
+CHAPTER_PUBLISHED = "published"
+CHAPTER_FAILED = "failed"
+
+
+
+def chapter_key(chapter_index):
+    return f"{int(chapter_index):03d}"
+
+
+def chapter_structure_filename(file_id, chapter_index):
+    """챕터별 구조 분석 파일명 (novels_processed 폴더)"""
+    return f"{file_id}_ch{chapter_key(chapter_index)}_structure.json"
+
+
+def chapter_audio_key(file_id, chapter_index):
+    """챕터별 오디오 출력 폴더 키 (audio_output 기준 상대 경로)"""
+    return os.path.join(file_id, "chapters", chapter_key(chapter_index))
+
+
+def chapter_audio_dir(file_id, chapter_index):
+    return os.path.join(AUDIO_OUTPUT_FOLDER, chapter_audio_key(file_id, chapter_index))
+
+
+def detect_chapters(file_id, user_chapters=None):
+    """
+    소설을 챕터로 나누고 챕터 계획을 메타데이터에 저장합니다.
+
+    제목 줄("제 N장", "N화", "프롤로그" 등)을 오프셋 인덱스에서 찾아 사용하며, 사용자가 챕터 시작 문단을 지정하면 그것을 따릅니다.
+    제목이 없으면 전체를 하나의 챕터로 봅니다.
+
+    Args:
+        file_id (str): 소설 파일 ID
+        user_chapters (list, optional): [{"title": str, "paragraph_start": int}, ...]
+
+    Returns:
+        list: 챕터 정보 리스트, 파일이 없으면 None
+
+    Raises:
+        ValueError: 사용자 지정 챕터 범위가 잘못된 경우
+    """
+    reader = open_text_reader(file_id)
+    if reader is None:
+        return None
+    with reader:
+        paragraph_count = reader.paragraph_count
+        if user_chapters:
+            starts = sorted(user_chapters, key=lambda c: int(c.get("paragraph_start", 0)))
+            spans = []
+            for i, chapter in enumerate(starts):
+                start = int(chapter.get("paragraph_start", 0))
+                end = int(starts[i + 1]["paragraph_start"]) if i + 1 < len(starts) else paragraph_count
+                if not 0 <= start < end <= paragraph_count:
+                    raise ValueError(f"잘못된 챕터 범위입니다: {chapter}")
+                spans.append((chapter.get("title") or f"{i + 1}장", start, end))
+        else:
+            detected = reader.chapters()
+            spans = [(c["title"], c["paragraph_start"], c["paragraph_end"]) for c in detected]
+            # 첫 제목 앞의 본문(머리말 등)도 하나의 챕터로 포함
+            if spans and spans[0][1] > 0:
+                spans.insert(0, ("서두", 0, spans[0][1]))
+            if not spans and paragraph_count:
+                spans = [("전체", 0, paragraph_count)]
+
+    chapters = [{
+        "index": i,
+        "title": title,
+        "paragraph_start": start,
+        "paragraph_end": end,
+        "status": CHAPTER_PENDING,
+        "structure_file": None,
+        "audio_dir": chapter_audio_key(file_id, i),
+        "segment_count": 0,
+        "updated_at": datetime.now().isoformat()
+    } for i, (title, start, end) in enumerate(spans)]
+
+    update_metadata_entry(file_id, {"chapters": chapters, "chapters_timestamp": datetime.now().isoformat()})
+    logger.info(f"챕터 계획 저장: {file_id} ({len(chapters)}개)")
+    return chapters
+
+
+def get_chapters(file_id):
+    """메타데이터의 챕터 목록에 챕터별 생성된 오디오 파일 목록을 덧붙여 반환합니다. 챕터 계획이 없으면 None."""
+    entry = get_metadata(file_id)
+    if not entry or not entry.get("chapters"):
+        return None
+    chapters = []
+    for chapter in entry["chapters"]:
+        audio_dir = chapter_audio_dir(file_id, chapter["index"])
+        audio_files = list_segment_files(audio_dir)
+        chapters.append({**chapter, "audio_files": audio_files})
+    return chapters
+
+
+def load_chapter_structure(file_id, chapter_index):
+    """챕터 구조 분석 결과(세그먼트 리스트)를 로드합니다. 없으면 빈 리스트."""
+    filepath = os.path.join(NOVELS_PROCESSED_FOLDER, chapter_structure_filename(file_id, chapter_index))
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        structure_data = json.load(f)
+    return structure_data["segments"] if isinstance(structure_data, dict) and "segments" in structure_data else structure_data
+
+
+def analyze_chapter(file_id, chapter):
+    """
+    챕터 하나의 구조를 분석하여 챕터 구조 파일로 저장합니다.
+
+    Returns:
+        list: 세그먼트 리스트
+    """
+    reader = open_text_reader(file_id)
+    if reader is None:
+        raise FileNotFoundError(f"소설 파일을 찾을 수 없습니다: {file_id}")
+    with reader:
+        chapter_text = reader.paragraph_range_text(chapter["paragraph_start"], chapter["paragraph_end"])
+    structure_data = analyze_novel_structure(chapter_text)
+    if not structure_data:
+        raise RuntimeError("소설 구조 분석 결과가 비어 있습니다.")
+    if isinstance(structure_data, dict) and "error" in structure_data:
+        raise ValueError(structure_data["error"])
+    # 임대가 만료되어 두 워커가 같은 챕터를 분석하더라도 읽는 쪽이 쓰는 도중의 파일을 보지 않도록 원자적으로 교체
+    filepath = os.path.join(NOVELS_PROCESSED_FOLDER, chapter_structure_filename(file_id, chapter["index"]))
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(structure_data, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, filepath)
+    return structure_data["segments"] if isinstance(structure_data, dict) and "segments" in structure_data else structure_data
+
+
+@register_handler("analyze_chapter")
+def _analyze_queued_chapter(payload):
+    """큐 워커에서 챕터 구조를 분석합니다. 결과 파일은 공유 저장소(novels_processed)에 기록됩니다."""
+    segments = analyze_chapter(payload["file_id"], payload["chapter"])
+    return {"segment_count": len(segments)}
+
+
+def _set_status(file_id, chapter_index, status, **fields):
+    update_chapter_entry(file_id, chapter_index, {"status": status, "updated_at": datetime.now().isoformat(), **fields})
+
+
+def _load_or_build_cast(file_id):
+    """
+    챕터 합성에 사용할 등장인물-성우 매핑을 준비합니다.
+    저장된 매칭 결과가 있으면 재사용하고, 없으면 전체 텍스트로 등장인물 분석과 매칭을 수행합니다.
+    """
+    matching = load_matching_result(file_id)
+    if matching.get("success") and matching["data"].get("character_voice_map"):
+        return matching["data"]["character_voice_map"]
+
+    characters = load_character_analysis(file_id)
+    if not characters:
+        with open(get_processed_text_path(file_id), 'r', encoding='utf-8') as f:
+            novel_text = f.read()
+        characters = extract_characters_from_text(novel_text)
+        if not characters:
+            raise RuntimeError("등장인물 분석 결과가 비어 있습니다.")
+        save_character_analysis(file_id, characters)
+
+    voice_actors = load_voice_actors()
+    if not voice_actors:
+        raise RuntimeError("성우 데이터를 불러오지 못했습니다.")
+    character_voice_map = match_with_cache(characters, voice_actors)
+    if not character_voice_map:
+        raise RuntimeError("등장인물-성우 매칭 결과가 비어 있습니다.")
+    # 세그먼트는 챕터별 구조 파일에 있으므로 매칭 결과에는 매핑만 저장
+    save_matching_result(file_id, {"character_voice_map": character_voice_map, "story_items": []})
+    return character_voice_map
+
+
+@tracked_job("chapters")
+@JOBS_IN_PROGRESS.track_inprogress(kind="chapters")
+@traced_job("chapters")
+def run_chapter_pipeline(file_id, chapter_indices=None, generate_audio=True, max_workers=CHAPTER_MAX_WORKERS):
+    """
+    챕터별 구조 분석과 음성 합성을 병렬로 실행합니다.
+
+    각 챕터의 합성은 해당 챕터의 구조 분석과 성우 매칭이 끝나는 즉시 시작되며,
+    합성이 끝난 챕터는 다른 챕터의 진행과 관계없이 바로 "published" 상태가 됩니다.
+
+    Args:
+        file_id (str): 소설 파일 ID
+        chapter_indices (list, optional): 처리할 챕터 인덱스 (없으면 전체)
+        generate_audio (bool, optional): 구조 분석 후 음성 합성까지 실행할지 여부
+        max_workers (int, optional): 동시에 실행할 최대 단계 수
+
+    Returns:
+        dict: 성공 여부와 단계별 실행 정보
+    """
+    entry = get_metadata(file_id) or {}
+    chapters = entry.get("chapters") or detect_chapters(file_id)
+    if not chapters:
+        return {"success": False, "file_id": file_id, "error": "처리할 챕터가 없습니다."}
+    targets = [c for c in chapters if chapter_indices is None or c["index"] in chapter_indices]
+
+    def make_structure_stage(chapter):
+        def structure_stage(_):
+            index = chapter["index"]
+            _set_status(file_id, index, CHAPTER_ANALYZING)
+            try:
+                if WORK_QUEUE_ENABLED:
+                    # 구조 분석을 공유 큐에 게시하고 (어느 노드든) 워커가 공유 저장소에 결과 파일을 기록
+                    with span("queue.analyze_chapter", "wait", chapter=index):
+                        outcome, = run_batch("analyze_chapter", [{"file_id": file_id, "chapter": chapter}], concurrency=1)
+                    if outcome["status"] != ITEM_DONE:
+                        raise RuntimeError(outcome["error"])
+                    segments = load_chapter_structure(file_id, index)
+                else:
+                    segments = analyze_chapter(file_id, chapter)
+            except Exception as e:
+                _set_status(file_id, index, CHAPTER_FAILED, error=str(e))
+                raise
+            _set_status(file_id, index, CHAPTER_ANALYZED, structure_file=chapter_structure_filename(file_id, index),
+                        segment_count=len(segments), error=None)
+            return segments
+        return structure_stage
+
+    def make_audio_stage(chapter):
+        def audio_stage(deps):
+            index = chapter["index"]
+            segments = deps[f"structure_{index}"]
+            _set_status(file_id, index, CHAPTER_SYNTHESIZING)
+            generation_results, failed_segments = synthesize_segments(chapter_audio_key(file_id, index), segments, deps["cast"])
+            if failed_segments:
+                _set_status(file_id, index, CHAPTER_FAILED, error=f"{len(failed_segments)}개 세그먼트 합성 실패",
+                            failed_segments=[f.get("order") for f in failed_segments])
+                raise RuntimeError(f"챕터 {index}: {len(failed_segments)}개 세그먼트 합성 실패")
+            if AUDIO_PACK_SEGMENTS:
+                with span("pack.compact", "io", chapter=index):
+                    compact_folder(chapter_audio_dir(file_id, index))
+            _set_status(file_id, index, CHAPTER_PUBLISHED, generated_segments=len(generation_results),
+                        published_at=datetime.now().isoformat(), error=None, failed_segments=[])
+            return len(generation_results)
+        return audio_stage
+
+    stages = []
+    if generate_audio:
+        stages.append(PipelineStage("cast", lambda _: _load_or_build_cast(file_id)))
+    for chapter in targets:
+        stages.append(PipelineStage(f"structure_{chapter['index']}", make_structure_stage(chapter)))
+        if generate_audio:
+            stages.append(PipelineStage(f"audio_{chapter['index']}", make_audio_stage(chapter),
+                                        depends_on=[f"structure_{chapter['index']}", "cast"]))
+
+    # 챕터별 합성 전체를 bulk 작업 하나로 입장 (챕터 수만큼 사용자 작업 수를 차지하지 않도록)
+    with synthesis_scheduler.admit(0, PRIORITY_BULK):
+        _, timings = run_stage_graph(stages, max_workers=max_workers)
+    success = all(timings[stage.name]["status"] == "completed" for stage in stages)
+    return {"success": success, "file_id": file_id, "chapters": [c["index"] for c in targets], "stages": timings}
+
+
+def start_chapter_pipeline(file_id, chapter_indices=None, generate_audio=True):
+    """
+    챕터 파이프라인을 백그라운드 스레드에서 시작합니다. 진행 상황은 get_chapters()로 확인합니다.
+
+    Returns:
+        bool: 새로 시작했으면 True, 이미 (어느 워커에서든) 실행 중이면 False
+    """
+    # 같은 소설을 동시에 두 번 처리하지 않도록 요청 스레드에서 작업을 먼저 등록
+    try:
+        handle = job_store.claim(file_id, "chapters")
+    except JobAlreadyRunningError:
+        return False
+
+    def _run():
+        try:
+            result = job_store.run(handle, run_chapter_pipeline, file_id, chapter_indices, generate_audio)
+            logger.info(f"챕터 파이프라인 종료: {file_id} (성공: {result.get('success')})")
+        except Exception as e:
+            logger.error(f"챕터 파이프라인 오류: {file_id}: {e}")
+
+    # 요청한 사용자 / 우선순위(합성 스케줄러 컨텍스트)를 백그라운드 스레드로 넘김
+    threading.Thread(target=bind_trace(_run), name=f"chapters-{file_id[:8]}", daemon=True).start()
+    return True
+
+
+def is_chapter_pipeline_running(file_id):
+    return job_store.active_job(file_id, "chapters") is not None
@@ -1,10 +1,11 @@
-import requests
-import time
 import json
 import os
+import asyncio
 from datetime import datetime
 import logging
+import time
 from pathlib import Path
+from concurrent.futures import as_completed
 from dotenv import load_dotenv
 
 # 환경 변수 로드
@@ -12,15 +13,30 @@ load_dotenv()
 
 # 경로 설정
 from services.text_storage_service import BASE_STORAGE_PATH
+from services.voice_registry import CachedVoiceRegistry
+from services.audio_blob_store import audio_blob_store
+from services.segment_pack import list_segment_files, compact_folder, AUDIO_PACK_SEGMENTS
+from services.metrics import (
+    ELEVENLABS_SYNTHESIS_SECONDS, ELEVENLABS_SLOT_WAIT_SECONDS, ELEVENLABS_AUDIO_BYTES, ELEVENLABS_REQUESTS_TOTAL,
+    ELEVENLABS_REQUESTS_IN_PROGRESS, EXTERNAL_API_THROTTLED_TOTAL, JOBS_IN_PROGRESS, SEGMENTS_TOTAL, SEGMENTS_IN_PROGRESS
+)
+from services.tracing import span, traced_job
+from services.job_store import tracked_job, report_total, report_progress
+from services.file_lock import InterProcessLock
+from services.rate_governor import WEB_CONCURRENCY
+from services.async_runtime import async_runtime, HTTP_ERRORS
+from services.synthesis_scheduler import FairScheduler, AdmissionRejectedError
+from services.work_queue import WORK_QUEUE_ENABLED, ITEM_DONE, NonRetryableError, register_handler, run_batch
 
 # 오디오 파일 저장 경로
 AUDIO_OUTPUT_FOLDER = os.path.join(BASE_STORAGE_PATH, 'audio_output')
-if not os.path.exists(AUDIO_OUTPUT_FOLDER):
-    os.makedirs(AUDIO_OUTPUT_FOLDER, exist_ok=True)
 
 # API 키 로드
 ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
 
+# API 기본 주소 (벤치마크용 로컬 대역 서버 등으로 바꿀 수 있음)
+ELEVENLABS_API_BASE = os.getenv("ELEVENLABS_API_BASE", "https://api.elevenlabs.io").rstrip('/')
+
 # API 헤더
 HEADERS = {
     'xi-api-key': ELEVENLABS_API_KEY,
@@ -30,6 +46,18 @@ HEADERS = {
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
+# 동시 음성 합성 요청 수 (프로세스 전체 기준 - 챕터를 병렬 처리해도 이 수를 넘지 않음. 워커가 여러 개면 워커당 몫으로 나눔)
+# 모든 합성 요청은 공유 이벤트 루프의 가중 공정 스케줄러(사용자 / 우선순위 등급별)를 거쳐 슬롯을 받습니다.
+ELEVENLABS_MAX_CONCURRENCY = max(1, int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", 3)) // WEB_CONCURRENCY)
+synthesis_scheduler = FairScheduler(ELEVENLABS_MAX_CONCURRENCY)
+
+# audiobook_info.json(매니페스트) 읽기-수정-쓰기 보호용 잠금 (워커 프로세스 간 공유)
+_info_lock = InterProcessLock(os.path.join(AUDIO_OUTPUT_FOLDER, '.audiobook_info.lock'))
+
+# 음성 목록 캐시 설정
+VOICES_CACHE_TTL = int(os.getenv("ELEVENLABS_VOICES_TTL", 600))  # 초
+VOICES_SNAPSHOT_FILE = os.path.join(BASE_STORAGE_PATH, 'cache', 'elevenlabs_voices.json')
+
 # 감정 설정 프리셋 (음성 설정)
 EMOTION_PRESETS = {
     "화남": {
@@ -97,23 +125,80 @@ def check_api_key():
         return False
     return True
 
+async def _afetch_voices_from_api(etag=None):
+    """
+    ElevenLabs 음성 목록을 네트워크에서 가져옵니다.
+
+    Args:
+        etag (str, optional): 이전 응답의 ETag. 주어지면 조건부 요청(If-None-Match)을 보냅니다.
+
+    Returns:
+        tuple: (상태 코드, 음성 목록 또는 None, ETag 또는 None)
+    """
+    if not check_api_key():
+        return 500, None, None
+    headers = dict(HEADERS)
+    if etag:
+        headers['If-None-Match'] = etag
+    response = await async_runtime.request("GET", f'{ELEVENLABS_API_BASE}/v1/voices', headers=headers)
+    if response.status_code == 304:
+        return 304, None, etag
+    response.raise_for_status()
+    return 200, response.json().get('voices', []), response.headers.get('ETag')
+
+def _fetch_voices_from_api(etag=None):
+    """_afetch_voices_from_api의 동기 래퍼 (voice_registry의 갱신 함수)"""
+    return async_runtime.run(_afetch_voices_from_api(etag))
+
+# 프로세스 전역 음성 목록 캐시 (TTL + stale-while-revalidate + 디스크 스냅샷)
+voice_registry = CachedVoiceRegistry(_fetch_voices_from_api, VOICES_SNAPSHOT_FILE, ttl_seconds=VOICES_CACHE_TTL,
+                                     afetch_func=_afetch_voices_from_api)
+
+async def aget_available_voices():
+    """get_available_voices의 async 버전. 캐시가 비어 있으면 공유 루프에서 음성 목록을 직접 가져옵니다. (스레드 풀을 쓰지 않음)"""
+    if not check_api_key():
+        return {"error": "API key is not configured"}, 500
+    try:
+        return _voices_response(*await voice_registry.aget_voices())
+    except Exception as e:
+        logger.error(f"Error getting voices from ElevenLabs API: {e}")
+        return {"error": f"Failed to fetch voices: {str(e)}"}, 500
+
 def get_available_voices():
-    """ElevenLabs에서 사용 가능한 모든 음성 목록을 가져옵니다."""
+    """ElevenLabs에서 사용 가능한 모든 음성 목록을 가져옵니다. (캐시된 목록 우선)"""
     if not check_api_key():
         return {"error": "API key is not configured"}, 500
     
     try:
-        response = requests.get('https://api.elevenlabs.io/v1/voices', headers=HEADERS)
-        response.raise_for_status()
-        voices_data = response.json()
-        
-        # 모든 음성 정보 반환 (필터링 없이)
-        return {"success": True, "voices": voices_data.get('voices', [])}, 200
-        
-    except requests.exceptions.RequestException as e:
+        return _voices_response(*voice_registry.get_voices())
+    except Exception as e:
         logger.error(f"Error getting voices from ElevenLabs API: {e}")
         return {"error": f"Failed to fetch voices: {str(e)}"}, 500
 
+def _voices_response(voices, cache_info):
+    if voices is None:
+        return {"error": "Failed to fetch voices from ElevenLabs API"}, 500
+    # 모든 음성 정보 반환 (필터링 없이)
+    return {"success": True, "voices": voices, "cache": cache_info}, 200
+
+def validate_character_voice_map(character_voice_map):
+    """
+    생성 작업 시작 전에 character_voice_map의 모든 voice_id를 음성 목록과 대조합니다.
+
+    Args:
+        character_voice_map (dict): 등장인물 이름 → voice_id
+
+    Returns:
+        dict: {"checked": 검증 여부, "valid": 전체 유효 여부, "invalid": {등장인물: voice_id}}
+    """
+    if not check_api_key() or not character_voice_map:
+        return {"checked": False, "valid": True, "invalid": {}}
+    try:
+        return voice_registry.validate_voice_ids(character_voice_map)
+    except Exception as e:
+        logger.error(f"Error validating voice IDs: {e}")
+        return {"checked": False, "valid": True, "invalid": {}}
+
 def get_emotion_settings(emotion_type="중립", tone="일반", expression_level=0.5):
     """감정 유형, 톤, 표현 수준에 따른 음성 설정을 반환합니다."""
     # 기본 감정 설정 가져오기
@@ -139,7 +224,16 @@ def get_emotion_settings(emotion_type="중립", tone="일반", expression_level=
     return settings
 
 def generate_speech(voice_id, text, emotion_settings=None):
-    """주어진 음성 ID와 텍스트, 감정 설정으로 음성을 생성합니다."""
+    """주어진 음성 ID와 텍스트, 감정 설정으로 음성을 생성합니다. (agenerate_speech의 동기 래퍼)"""
+    return async_runtime.run(agenerate_speech(voice_id, text, emotion_settings))
+
+async def agenerate_speech(voice_id, text, emotion_settings=None):
+    """
+    generate_speech의 async 버전. 공유 이벤트 루프에서 실행되며, 동시 합성 요청 수는 ELEVENLABS_MAX_CONCURRENCY로 제한됩니다.
+
+    Returns:
+        tuple: ({"success": True, "audio_data": bytes} 또는 {"error": ...}, 상태 코드)
+    """
     if not check_api_key():
         return {"error": "API key is not configured"}, 500
     
@@ -154,7 +248,7 @@ def generate_speech(voice_id, text, emotion_settings=None):
         emotion_settings = EMOTION_PRESETS["중립"]
     
     try:
-        url = f'https://api.elevenlabs.io/v1/text-to-speech/{voice_id}'
+        url = f'{ELEVENLABS_API_BASE}/v1/text-to-speech/{voice_id}'
         data = {
             'text': text,
             'model_id': 'eleven_multilingual_v2',
@@ -167,15 +261,31 @@ def generate_speech(voice_id, text, emotion_settings=None):
             }
         }
         
-        response = requests.post(url, headers=HEADERS, json=data)
+        queued_at = time.monotonic()
+        with span("elevenlabs.slot_wait", "wait") as wait_span:
+            priority = await synthesis_scheduler.acquire(cost=len(text))
+            wait_span.set(priority=priority)
+        try:
+            started = time.monotonic()
+            ELEVENLABS_SLOT_WAIT_SECONDS.observe(started - queued_at)
+            with ELEVENLABS_REQUESTS_IN_PROGRESS.track_inprogress(), span("elevenlabs.tts", "elevenlabs", chars=len(text)) as request_span:
+                response = await async_runtime.request("POST", url, headers=HEADERS, json=data)
+                request_span.set(status=response.status_code, bytes=len(response.content))
+        finally:
+            synthesis_scheduler.release()
+        ELEVENLABS_SYNTHESIS_SECONDS.observe(time.monotonic() - started)
+        ELEVENLABS_REQUESTS_TOTAL.inc(status=response.status_code)
+        if response.status_code == 429:
+            EXTERNAL_API_THROTTLED_TOTAL.inc(api="elevenlabs")
         
         if not response.ok:
             logger.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
             return {"error": f"ElevenLabs API error: {response.status_code} - {response.text}"}, response.status_code
         
+        ELEVENLABS_AUDIO_BYTES.observe(len(response.content))
         return {"success": True, "audio_data": response.content}, 200
         
-    except requests.exceptions.RequestException as e:
+    except HTTP_ERRORS as e:
         logger.error(f"Error requesting speech synthesis: {e}")
         return {"error": f"Failed to generate speech: {str(e)}"}, 500
 
@@ -189,11 +299,13 @@ def save_audio_file(audio_data, file_id, segment_order):
         # 파일명 생성 (3자리 숫자 형식으로 순서 표시)
         output_file = os.path.join(output_dir, f"{int(segment_order):03d}.mp3")
         
-        with open(output_file, 'wb') as f:
-            f.write(audio_data)
+        # 내용 해시 저장소에 한 번만 저장하고 세그먼트 경로는 블롭에 원자적으로 연결
+        # (재생 중인 플레이어가 쓰는 도중의 파일을 받지 않으며, 같은 오디오는 책/재생성 간에 공유됨)
+        with span("disk.write_segment", "io", bytes=len(audio_data)):
+            digest = audio_blob_store.put_bytes(audio_data, output_file)
         
         logger.info(f"Audio file saved: {output_file}")
-        return {"success": True, "file_path": output_file}, 200
+        return {"success": True, "file_path": output_file, "sha256": digest}, 200
         
     except Exception as e:
         logger.error(f"Error saving audio file: {e}")
@@ -210,11 +322,15 @@ def get_audio_file_path(file_id, segment_order):
         return {"error": "Audio file not found"}, 404
 
 def generate_audiobook_segment(file_id, segment_data):
+    """단일 오디오북 세그먼트(문장/대사)를 생성합니다. (agenerate_audiobook_segment의 동기 래퍼)"""
+    return async_runtime.run(agenerate_audiobook_segment(file_id, segment_data))
+
+async def agenerate_audiobook_segment(file_id, segment_data):
     """
-    단일 오디오북 세그먼트(문장/대사)를 생성합니다.
+    generate_audiobook_segment의 async 버전. 합성 요청은 공유 이벤트 루프에서 기다리고, 파일 저장만 스레드 풀에서 실행합니다.
     
     Args:
-        file_id (str): 원본 소설 파일 ID
+        file_id (str): 원본 소설 파일 ID (audio_output 아래의 출력 폴더 키. 챕터는 "<file_id>/chapters/<NNN>")
         segment_data (dict): 세그먼트 데이터 (order, speaker, text, emotion 등 포함)
     
     Returns:
@@ -247,13 +363,13 @@ def generate_audiobook_segment(file_id, segment_data):
         emotion_settings = get_emotion_settings(emotion, tone, expression_level)
         
         # 음성 생성
-        speech_result, status_code = generate_speech(voice_id, text, emotion_settings)
+        speech_result, status_code = await agenerate_speech(voice_id, text, emotion_settings)
         
         if status_code != 200:
             return speech_result, status_code
         
         # 오디오 파일 저장
-        save_result, save_status = save_audio_file(speech_result["audio_data"], file_id, order)
+        save_result, save_status = await async_runtime.run_blocking(save_audio_file, speech_result["audio_data"], file_id, order)
         
         if save_status != 200:
             return save_result, save_status
@@ -262,6 +378,7 @@ def generate_audiobook_segment(file_id, segment_data):
             "success": True, 
             "message": f"Audio segment {order} generated successfully", 
             "file_path": save_result["file_path"],
+            "sha256": save_result.get("sha256"),
             "segment_order": order,
             "speaker": speaker
         }, 200
@@ -270,6 +387,209 @@ def generate_audiobook_segment(file_id, segment_data):
         logger.error(f"Error generating audiobook segment: {e}")
         return {"error": f"Failed to generate audiobook segment: {str(e)}"}, 500
 
+def synthesize_segments(file_id, story_items, character_voice_map, max_workers=ELEVENLABS_MAX_CONCURRENCY, write_info=True):
+    """
+    세그먼트 목록을 동시에 합성하여 출력 폴더에 저장합니다.
+    실제 API 동시 요청 수는 프로세스 전역 제한(ELEVENLABS_MAX_CONCURRENCY)을 따릅니다.
+
+    Args:
+        file_id (str): 출력 폴더 키 (audio_output 기준 상대 경로)
+        story_items (list): 세그먼트 데이터 리스트 (order, speaker, text, emotion, tone)
+        character_voice_map (dict): 화자 이름 → voice_id
+        max_workers (int, optional): 동시에 처리할 세그먼트 수
+        write_info (bool, optional): 출력 폴더에 audiobook_info.json(총 세그먼트 수)을 기록할지 여부
+
+    Returns:
+        tuple: (성공한 세그먼트 결과 리스트, 실패한 세그먼트 정보 리스트) - 각각 order 오름차순
+
+    Raises:
+        AdmissionRejectedError: 합성 대기량이 상한을 넘어 작업을 받지 않는 경우 (아무것도 기록하지 않음)
+    """
+    # 사용자 / 우선순위 등급별 입장 제어. 블록 안의 합성 요청은 작업의 등급으로 슬롯 순서를 받음
+    with synthesis_scheduler.admit(len(story_items)) as ticket:
+        return _synthesize_admitted(file_id, story_items, character_voice_map, max_workers, write_info, ticket)
+
+def _synthesize_admitted(file_id, story_items, character_voice_map, max_workers, write_info, ticket):
+    output_dir = os.path.join(AUDIO_OUTPUT_FOLDER, file_id)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # 총 세그먼트 수 정보를 파일로 저장 (세그먼트 버전 매니페스트 초기화)
+    if write_info:
+        with _info_lock:
+            _write_audiobook_info(file_id, {
+                "total_segments": len(story_items),
+                "start_time": datetime.now().isoformat(),
+                "segments": {}
+            })
+    
+    generation_results = []
+    failed_segments = []
+    jobs = []
+    for item in story_items:
+        order = item.get("order")
+        speaker = item.get("speaker")
+        
+        # voice_id 할당 (세그먼트에 직접 지정된 voice_id가 우선)
+        voice_id = item.get("voice_id") or character_voice_map.get(speaker)
+        if not voice_id:
+            logger.warning(f"No voice ID found for speaker '{speaker}'. This segment will be skipped.")
+            failed_segments.append({"order": order, "speaker": speaker, "reason": "No voice ID assigned"})
+            SEGMENTS_TOTAL.inc(outcome="skipped")
+            continue
+        
+        jobs.append({
+            "order": order,
+            "speaker": speaker,
+            "text": item.get("text"),
+            "emotion": item.get("emotion", "중립"),
+            "tone": item.get("tone", "일반"),
+            "expression_level": item.get("expression_level", 0.5),
+            "voice_id": voice_id
+        })
+    
+    # 동시에 진행하는 세그먼트 수 제한 (실제 API 요청은 합성 스케줄러 슬롯을 받아야 시작됨)
+    segment_slots = asyncio.Semaphore(max(1, max_workers))
+
+    async def _generate(job):
+        async with segment_slots:
+            with SEGMENTS_IN_PROGRESS.track_inprogress(), span(f"segment {job['order']}", "segment", speaker=job["speaker"]) as segment_span:
+                result, status_code = await agenerate_audiobook_segment(file_id, job)
+                segment_span.set(status=status_code)
+                return result, status_code
+    
+    def _record(job, result, status_code):
+        SEGMENTS_TOTAL.inc(outcome="success" if status_code == 200 else "failed")
+        ticket.done()
+        if status_code == 200:
+            generation_results.append({
+                "order": job["order"],
+                "speaker": job["speaker"],
+                "status": "success",
+                "file_path": result.get("file_path"),
+                "sha256": result.get("sha256")
+            })
+        else:
+            failed_segments.append({
+                "order": job["order"],
+                "speaker": job["speaker"],
+                "status": "failed",
+                "reason": result.get("error", "Unknown error")
+            })
+    
+    report_total(len(jobs))
+    if WORK_QUEUE_ENABLED:
+        # 세그먼트를 공유 큐에 게시하고 (여러 노드의) 워커가 나눠서 합성. 오디오는 공유 저장소에 기록됨
+        with span("queue.synthesize", "wait", segments=len(jobs)):
+            outcomes = run_batch("synthesize_segment", [{"output_key": file_id, "segment": job} for job in jobs],
+                                 concurrency=max(1, max_workers), on_item_done=report_progress)
+        for job, outcome in zip(jobs, outcomes):
+            if outcome["status"] == ITEM_DONE:
+                result = dict(outcome["result"], file_path=os.path.join(output_dir, f"{int(job['order']):03d}.mp3"))
+                _record(job, result, 200)
+            else:
+                _record(job, {"error": outcome["error"]}, 500)
+    else:
+        # 세그먼트마다 스레드를 쓰지 않고 공유 이벤트 루프의 코루틴으로 합성.
+        # 진행률 기록(작업 저장소 쓰기)과 결과 정리는 루프를 막지 않도록 이 스레드에서 완료 순서대로 처리
+        futures = {async_runtime.submit(_generate(job)): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result, status_code = future.result()
+            except Exception as e:
+                result, status_code = {"error": str(e)}, 500
+            report_progress()
+            _record(job, result, status_code)
+    
+    def _order_key(entry):
+        try:
+            return int(entry.get("order"))
+        except (TypeError, ValueError):
+            return 0
+    
+    generation_results.sort(key=_order_key)
+    failed_segments.sort(key=_order_key)
+    
+    # 생성된 세그먼트를 매니페스트에 기록
+    if generation_results:
+        voice_by_order = {job["order"]: job["voice_id"] for job in jobs}
+        with _info_lock, span("manifest.write", "io", segments=len(generation_results)):
+            info = _read_audiobook_info(file_id)
+            segments = info.setdefault("segments", {})
+            for entry in generation_results:
+                _bump_segment_version(segments, entry["order"], voice_by_order.get(entry["order"]), entry.get("sha256"))
+            _write_audiobook_info(file_id, info)
+    return generation_results, failed_segments
+
+@register_handler("synthesize_segment")
+def _synthesize_queued_segment(payload):
+    """
+    큐 워커에서 세그먼트 하나를 합성해 공유 저장소에 저장합니다.
+    429 / 5xx / 연결 오류는 예외로 알려 큐가 (다른 워커에서라도) 다시 시도하게 하고, 요청 자체가 잘못된 경우(4xx)는 다시 시도하지 않습니다.
+    """
+    result, status_code = generate_audiobook_segment(payload["output_key"], payload["segment"])
+    if status_code == 200:
+        return {"sha256": result.get("sha256")}
+    if status_code == 429 or status_code >= 500:
+        raise RuntimeError(result.get("error", f"HTTP {status_code}"))
+    raise NonRetryableError(result.get("error", f"HTTP {status_code}"))
+
+def _read_audiobook_info(file_id):
+    info_file = os.path.join(AUDIO_OUTPUT_FOLDER, file_id, "audiobook_info.json")
+    if not os.path.exists(info_file):
+        return {}
+    try:
+        with open(info_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error reading audiobook info file: {e}")
+        return {}
+
+def _write_audiobook_info(file_id, info):
+    output_dir = os.path.join(AUDIO_OUTPUT_FOLDER, file_id)
+    os.makedirs(output_dir, exist_ok=True)
+    info_file = os.path.join(output_dir, "audiobook_info.json")
+    tmp_file = info_file + ".tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False)
+    os.replace(tmp_file, info_file)
+
+def _bump_segment_version(segments, order, voice_id, sha256=None):
+    key = str(int(order))
+    previous = segments.get(key, {})
+    segments[key] = {
+        "version": previous.get("version", 0) + 1,
+        "voice_id": voice_id,
+        "sha256": sha256,
+        "updated_at": datetime.now().isoformat()
+    }
+    return segments[key]
+
+@JOBS_IN_PROGRESS.track_inprogress(kind="segment")
+def regenerate_segment(file_id, segment_data):
+    """
+    세그먼트 하나만 다시 합성하여 기존 파일을 교체하고, 매니페스트의 해당 세그먼트 버전을 올립니다.
+
+    Args:
+        file_id (str): 출력 폴더 키 (audio_output 기준 상대 경로)
+        segment_data (dict): 세그먼트 데이터 (order, speaker, text, emotion, tone, voice_id 등)
+
+    Returns:
+        tuple: (결과 dict, HTTP 상태 코드). 성공 시 결과에 version 포함
+    """
+    result, status_code = generate_audiobook_segment(file_id, segment_data)
+    if status_code != 200:
+        return result, status_code
+    with _info_lock:
+        info = _read_audiobook_info(file_id)
+        entry = _bump_segment_version(info.setdefault("segments", {}), segment_data["order"], segment_data.get("voice_id"), result.get("sha256"))
+        _write_audiobook_info(file_id, info)
+    result["version"] = entry["version"]
+    return result, 200
+
+@tracked_job("generate")
+@JOBS_IN_PROGRESS.track_inprogress(kind="generate")
+@traced_job("generate")
 def generate_complete_audiobook(file_id, story_data):
     """
     소설 전체 오디오북을 생성합니다.
@@ -292,75 +612,14 @@ def generate_complete_audiobook(file_id, story_data):
         if not story_items:
             return {"error": "No story items found in the provided data."}, 400
         
-        # 생성 결과 저장할 리스트
-        generation_results = []
-        failed_segments = []
-        
-        # 진행 상태 초기화
+        # 세그먼트 동시 합성
+        generation_results, failed_segments = synthesize_segments(file_id, story_items, character_voice_map)
         total_segments = len(story_items)
-        processed_segments = 0
-        
-        # 총 세그먼트 수 정보를 저장할 디렉토리 생성
-        output_dir = os.path.join(AUDIO_OUTPUT_FOLDER, file_id)
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # 총 세그먼트 수 정보를 파일로 저장
-        info_file = os.path.join(output_dir, "audiobook_info.json")
-        with open(info_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "total_segments": total_segments,
-                "start_time": datetime.now().isoformat()
-            }, f)
         
-        # 각 세그먼트 처리
-        for item in story_items:
-            order = item.get("order")
-            speaker = item.get("speaker")
-            text = item.get("text")
-            emotion = item.get("emotion", "중립")
-            tone = item.get("tone", "일반")
-            
-            # voice_id 할당
-            voice_id = character_voice_map.get(speaker)
-            if not voice_id:
-                logger.warning(f"No voice ID found for speaker '{speaker}'. This segment will be skipped.")
-                failed_segments.append({"order": order, "speaker": speaker, "reason": "No voice ID assigned"})
-                processed_segments += 1
-                continue
-            
-            # 세그먼트 데이터 구성
-            segment_data = {
-                "order": order,
-                "speaker": speaker,
-                "text": text,
-                "emotion": emotion,
-                "tone": tone,
-                "voice_id": voice_id
-            }
-            
-            # 세그먼트 생성
-            result, status_code = generate_audiobook_segment(file_id, segment_data)
-            
-            if status_code == 200:
-                generation_results.append({
-                    "order": order,
-                    "speaker": speaker,
-                    "status": "success",
-                    "file_path": result.get("file_path")
-                })
-            else:
-                failed_segments.append({
-                    "order": order,
-                    "speaker": speaker,
-                    "status": "failed",
-                    "reason": result.get("error", "Unknown error")
-                })
-            
-            processed_segments += 1
-            
-            # API 호출 간 딜레이 (0.3초)
-            if processed_segments < total_segments:
-                time.sleep(0.3)
+        # 선택적으로 세그먼트를 하나의 팩 파일로 압축
+        if AUDIO_PACK_SEGMENTS and generation_results:
+            with span("pack.compact", "io"):
+                compact_folder(os.path.join(AUDIO_OUTPUT_FOLDER, file_id))
         
         # 처리 결과 반환
         success_count = len(generation_results)
@@ -377,6 +636,9 @@ def generate_complete_audiobook(file_id, story_data):
             "failed_details": failed_segments
         }, 200
         
+    except AdmissionRejectedError:
+        # 라우트에서 429 + Retry-After로 응답
+        raise
     except Exception as e:
         logger.error(f"Error generating complete audiobook: {e}")
         return {"error": f"Failed to generate complete audiobook: {str(e)}"}, 500
@@ -408,17 +670,17 @@ def check_generation_status(file_id):
         if not os.path.exists(output_dir):
             return response, 200
 
-        audio_files = [f for f in os.listdir(output_dir) if f.endswith('.mp3')]
+        # 개별 파일 + 팩에 들어 있는 세그먼트
+        audio_files = list_segment_files(output_dir)
         generated_count = len(audio_files)
 
-        info_file = os.path.join(output_dir, "audiobook_info.json")
-        if os.path.exists(info_file):
-            try:
-                with open(info_file, 'r', encoding='utf-8') as f:
-                    info_data = json.load(f)
-                    total_segments = info_data.get("total_segments", 0)
-            except Exception as e:
-                logger.error(f"Error reading audiobook info file: {e}")
+        info_data = _read_audiobook_info(file_id)
+        total_segments = info_data.get("total_segments", 0)
+        # 파일명 → 세그먼트 버전 (다시 생성된 세그먼트를 플레이어가 새로 받도록)
+        segment_versions = {
+            f"{int(order):03d}.mp3": entry.get("version", 1)
+            for order, entry in info_data.get("segments", {}).items()
+        }
 
         # 파일명(정수) 오름차순 정렬
         file_numbers = sorted([int(f.split('.')[0]) for f in audio_files if f.split('.')[0].isdigit()])
@@ -449,7 +711,8 @@ def check_generation_status(file_id):
             "message": message,
             "total_segments": total_segments,
             "generated_segments": generated_count,
-            "audio_files": sorted(audio_files)
+            "audio_files": sorted(audio_files),
+            "segment_versions": segment_versions
         }, 200
 
     except Exception as e:
@@ -0,0 +1,94 @@
+import os
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+
+class InterProcessLock:
+    """
+    여러 워커 프로세스가 같은 파일(metadata.json, audiobook_info.json 등)을 읽고-수정-쓰는 구간을 보호하는 잠금.
+
+    잠금 파일에 대한 OS 잠금(POSIX flock / Windows msvcrt.locking)과 프로세스 안의 RLock을 함께 사용합니다.
+    같은 스레드에서 다시 획득할 수 있으며(재진입), OS 잠금은 가장 바깥 획득/해제에서만 걸고 풉니다.
+    프로세스가 죽으면 OS가 잠금을 풀어 주므로 오래된 잠금 파일을 정리할 필요가 없습니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+        self._pid = None
+
+    def _open(self):
+        # fork 이후 자식 프로세스는 부모의 파일 디스크립터를 공유하지 않도록 새로 엶
+        if self._fd is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _lock_file(self, blocking):
+        fd = self._open()
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                return True
+            except BlockingIOError:
+                return False
+        # msvcrt.locking(LK_LOCK)은 10번 재시도 후 실패하므로 성공할 때까지 반복
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                threading.Event().wait(0.05)
+
+    def _unlock_file(self):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(self._fd, 0, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+
+    def acquire(self, blocking=True):
+        if not self._thread_lock.acquire(blocking):
+            return False
+        if self._depth == 0:
+            try:
+                locked = self._lock_file(blocking)
+            except Exception:
+                self._thread_lock.release()
+                raise
+            if not locked:
+                self._thread_lock.release()
+                return False
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        try:
+            if self._depth == 0:
+                self._unlock_file()
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
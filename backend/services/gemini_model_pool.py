@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import threading
+
+from services.async_runtime import async_runtime
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# google.generativeai는 import에만 1초 가까이 걸리므로 첫 모델 클라이언트를 만들 때 불러옴
+_genai = None
+_genai_lock = threading.Lock()
+_genai_settings = {"api_key": None, "api_endpoint": None}
+
+
+def load_genai():
+    """google.generativeai 모듈을 (처음 한 번만) import하고 API 키를 설정한 뒤 반환합니다."""
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                api_key, api_endpoint = _genai_settings["api_key"], _genai_settings["api_endpoint"]
+                if api_key:
+                    if api_endpoint:
+                        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": api_endpoint})
+                    else:
+                        genai.configure(api_key=api_key)
+                _genai = genai
+    return _genai
+
+
+class PooledModelClient:
+    """풀에 보관되는 GenerativeModel 인스턴스와 호출 통계."""
+
+    def __init__(self, key, model_name, system_instruction, temperature):
+        self.key = key
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.temperature = temperature
+        genai = load_genai()
+        self.model = genai.GenerativeModel(
+            model_name=model_name,
+            system_instruction=system_instruction,
+            generation_config=genai.types.GenerationConfig(temperature=temperature)
+        )
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "total_latency_seconds": 0.0,
+            "min_latency_seconds": None,
+            "max_latency_seconds": 0.0,
+        }
+
+    async def generate_content_async(self, contents):
+        """
+        공유 이벤트 루프에서 generate_content를 호출합니다.
+        gRPC 전송은 SDK의 async 클라이언트(grpc.aio)를 쓰고, REST 전송(api_endpoint 지정)은 async를 지원하지 않아
+        동기 호출을 async_runtime의 스레드 풀에서 실행합니다.
+        """
+        if _genai_settings["api_endpoint"]:
+            return await async_runtime.run_blocking(self.model.generate_content, contents=contents)
+        return await self.model.generate_content_async(contents=contents)
+
+    def record_call(self, latency_seconds, failed=False):
+        """호출 1건의 모델 응답 시간을 기록합니다. 실패한 호출은 latency_seconds를 None으로 전달합니다."""
+        with self._lock:
+            if failed:
+                self._stats["failures"] += 1
+            if latency_seconds is None:
+                return
+            self._stats["calls"] += 1
+            self._stats["total_latency_seconds"] += latency_seconds
+            if self._stats["min_latency_seconds"] is None or latency_seconds < self._stats["min_latency_seconds"]:
+                self._stats["min_latency_seconds"] = latency_seconds
+            self._stats["max_latency_seconds"] = max(self._stats["max_latency_seconds"], latency_seconds)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["avg_latency_seconds"] = stats["total_latency_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        stats.update({
+            "model_name": self.model_name,
+            "temperature": self.temperature,
+        })
+        return stats
+
+
+class GeminiModelPool:
+    """
+    (모델명, 시스템 지시문, 생성 설정)을 키로 GenerativeModel 인스턴스를 재사용하는 스레드 안전한 풀.
+
+    호출마다 모델을 새로 만드는 대신 같은 설정의 인스턴스를 공유하여 초기화 비용을 줄이고
+    내부 클라이언트 연결을 재사용합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+
+    def configure(self, api_key, api_endpoint=None):
+        """
+        모델 클라이언트에 사용할 API 키 / 엔드포인트를 지정합니다. (실제 genai.configure는 첫 클라이언트 생성 시)
+        api_endpoint를 지정하면 REST 전송을 사용합니다. (예: 벤치마크용 로컬 대역 서버)
+        """
+        _genai_settings.update(api_key=api_key, api_endpoint=api_endpoint)
+
+    @staticmethod
+    def make_key(model_name, system_instruction, temperature):
+        instruction_hash = hashlib.sha1((system_instruction or "").encode("utf-8")).hexdigest()[:12]
+        return f"{model_name}:{instruction_hash}:t={temperature}"
+
+    def cached(self, model_name, system_instruction, temperature=0.1):
+        """이미 만들어진 풀 클라이언트를 반환합니다. 없으면 None (새로 만들지 않음)"""
+        return self._clients.get(self.make_key(model_name, system_instruction, temperature))
+
+    def get(self, model_name, system_instruction, temperature=0.1):
+        """
+        설정에 해당하는 풀 클라이언트를 반환합니다. 없으면 생성하여 등록합니다.
+
+        Args:
+            model_name (str): Gemini 모델 이름
+            system_instruction (str): 시스템 지시문
+            temperature (float, optional): 생성 온도. Defaults to 0.1.
+
+        Returns:
+            PooledModelClient: 재사용 가능한 모델 클라이언트
+        """
+        key = self.make_key(model_name, system_instruction, temperature)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            # 다른 스레드가 먼저 생성했을 수 있으므로 다시 확인
+            client = self._clients.get(key)
+            if client is None:
+                client = PooledModelClient(key, model_name, system_instruction, temperature)
+                self._clients[key] = client
+                logger.info(f"Gemini 모델 클라이언트 생성: {key}")
+            return client
+
+    def warm_up(self, configs):
+        """
+        시작 시점에 자주 쓰는 설정의 클라이언트를 미리 생성합니다.
+
+        Args:
+            configs (list): (model_name, system_instruction, temperature) 튜플의 리스트
+        """
+        for model_name, system_instruction, temperature in configs:
+            try:
+                self.get(model_name, system_instruction, temperature)
+            except Exception as e:
+                logger.warning(f"Gemini 모델 클라이언트 예열 실패 ({model_name}): {e}")
+
+    def get_stats(self):
+        """클라이언트별 지연 통계를 반환합니다."""
+        with self._lock:
+            clients = list(self._clients.values())
+        return {client.key: client.get_stats() for client in clients}
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+gemini_model_pool = GeminiModelPool()
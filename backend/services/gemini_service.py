@@ -1,36 +1,35 @@
 import os
 import json
 import logging
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfig  # Updated import based on common usage
 from datetime import datetime
 from pathlib import Path
 
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.rate_governor import gemini_rate_governor, estimate_tokens
+from services.gemini_model_pool import gemini_model_pool
+from services.async_runtime import async_runtime
+from services.metrics import GEMINI_CALL_SECONDS, GEMINI_QUEUE_WAIT_SECONDS, GEMINI_CALLS_TOTAL, GEMINI_CALLS_IN_PROGRESS
+from services.voice_catalog_index import voice_catalog_index, MATCH_CANDIDATES_TOP_K
+from services.voice_actor_catalog import voice_actor_catalog
+
 # Gemini API 키를 환경 변수에서 로드
 API_KEY = os.environ.get("GOOGLE_API_KEY")
 
-# API 키 설정 (애플리케이션 시작 시 한 번 실행)
-if API_KEY:
-    genai.configure(api_key=API_KEY)
-
-# 기본 경로 및 파일 경로 설정
-BASE_PATH = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-CHARACTER_ANALYSIS_PATH = BASE_PATH / 'app_data' / 'character_analysis'
-NOVELS_PROCESSED_PATH = BASE_PATH / 'app_data' / 'novels_processed'
-NOVELS_MATCHED_PATH = BASE_PATH / 'app_data' / 'novels_matched'
+# API 엔드포인트 변경 (예: 벤치마크용 로컬 대역 서버 "http://127.0.0.1:8081"). 지정하면 REST 전송을 사용합니다.
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT")
 
-# 폴더가 없는 경우 생성
-if not os.path.exists(CHARACTER_ANALYSIS_PATH):
-    os.makedirs(CHARACTER_ANALYSIS_PATH)
-    logging.info(f"캐릭터 분석 폴더 생성: {CHARACTER_ANALYSIS_PATH}")
+# API 키 설정 (google.generativeai는 첫 모델 클라이언트를 만들 때 import / configure)
+gemini_model_pool.configure(api_key=API_KEY, api_endpoint=GEMINI_API_ENDPOINT)
 
-if not os.path.exists(NOVELS_PROCESSED_PATH):
-    os.makedirs(NOVELS_PROCESSED_PATH)
-    logging.info(f"소설 처리 폴더 생성: {NOVELS_PROCESSED_PATH}")
+# 입력 토큰 수 계산 시 count_tokens API 사용 여부 (기본값: 오프라인 추정)
+USE_COUNT_TOKENS = os.environ.get("GEMINI_USE_COUNT_TOKENS", "false").lower() == "true"
 
-if not os.path.exists(NOVELS_MATCHED_PATH):
-    os.makedirs(NOVELS_MATCHED_PATH)
-    logging.info(f"매칭된 소설 폴더 생성: {NOVELS_MATCHED_PATH}")
+# 기본 경로 및 파일 경로 설정
+BASE_PATH = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_DATA_PATH = Path(BASE_STORAGE_PATH)
+CHARACTER_ANALYSIS_PATH = APP_DATA_PATH / 'character_analysis'
+NOVELS_PROCESSED_PATH = APP_DATA_PATH / 'novels_processed'
+NOVELS_MATCHED_PATH = APP_DATA_PATH / 'novels_matched'
 
 # --- 소설 등장인물 분석 지시사항 ---
 SYSTEM_PROMPT_CHARACTER_EXTRACTION = """# 소설 등장인물 분석 지시사항
@@ -92,7 +91,67 @@ CRITICAL: 분석 결과를 반드시 JSON 형식으로만 출력하세요. 추
 ```
 CRITICAL: 분석 결과를 반드시 JSON 형식으로만 출력하세요. 추가적인 설명이나 마크다운 코드 블록 등은 사용하지 마세요. ONLY VALID JSON IS ALLOWED."""
 
+def _count_input_tokens(client, contents):
+    """요청 입력 토큰 수를 계산합니다. count_tokens 실패 시 오프라인 추정치를 사용합니다."""
+    if USE_COUNT_TOKENS:
+        try:
+            return client.model.count_tokens(contents).total_tokens
+        except Exception as e:
+            logging.warning(f"count_tokens 호출 실패, 오프라인 추정치 사용: {e}")
+    return estimate_tokens(client.system_instruction) + sum(estimate_tokens(c) for c in contents)
+
+async def _aget_client(model_name, system_instruction, temperature):
+    """풀 클라이언트를 가져옵니다. 처음 만들 때는 google.generativeai import가 루프를 막지 않도록 스레드 풀에서 생성"""
+    client = gemini_model_pool.cached(model_name, system_instruction, temperature)
+    if client is None:
+        client = await async_runtime.run_blocking(gemini_model_pool.get, model_name, system_instruction, temperature)
+    return client
+
+async def _agenerate_with_quota(client, contents, label, expected_output_tokens):
+    """
+    RPM/TPM 할당량 제어기를 거쳐 풀 클라이언트의 generate_content를 호출합니다.
+    공유 이벤트 루프에서 실행되며 할당량 대기와 백오프 중에도 루프를 막지 않습니다.
+
+    Args:
+        client (PooledModelClient): gemini_model_pool에서 가져온 모델 클라이언트
+        contents (list): generate_content에 전달할 내용
+        label (str): 로그/통계에 사용할 호출 이름
+        expected_output_tokens (int): 예상 출력 토큰 수
+
+    Returns:
+        GenerateContentResponse: Gemini 응답
+    """
+    if USE_COUNT_TOKENS:
+        input_tokens = await async_runtime.run_blocking(_count_input_tokens, client, contents)
+    else:
+        input_tokens = _count_input_tokens(client, contents)
+    try:
+        with GEMINI_CALLS_IN_PROGRESS.track_inprogress():
+            response, call_stats = await gemini_rate_governor.acall(
+                lambda: client.generate_content_async(contents),
+                input_tokens=input_tokens,
+                expected_output_tokens=expected_output_tokens,
+                label=label
+            )
+    except Exception:
+        client.record_call(None, failed=True)
+        GEMINI_CALLS_TOTAL.inc(function=label, model=client.model_name, outcome="error")
+        raise
+    client.record_call(call_stats["model_latency_seconds"])
+    GEMINI_CALLS_TOTAL.inc(function=label, model=client.model_name, outcome="success")
+    GEMINI_CALL_SECONDS.observe(call_stats["model_latency_seconds"], function=label, model=client.model_name)
+    GEMINI_QUEUE_WAIT_SECONDS.observe(call_stats["queue_wait_seconds"], function=label)
+    logging.info(
+        f"{label}: 입력 토큰 약 {input_tokens}, 대기 {call_stats['queue_wait_seconds']:.2f}초, "
+        f"모델 지연 {call_stats['model_latency_seconds']:.2f}초"
+    )
+    return response
+
 def extract_characters_from_text(novel_text: str, model_name: str = "gemini-2.0-flash") -> list:
+    """aextract_characters_from_text의 동기 래퍼"""
+    return async_runtime.run(aextract_characters_from_text(novel_text, model_name))
+
+async def aextract_characters_from_text(novel_text: str, model_name: str = "gemini-2.0-flash") -> list:
     """
     소설 텍스트에서 Gemini API와 지정된 시스템 프롬프트를 사용하여 등장인물 정보를 추출합니다.
 
@@ -113,13 +172,12 @@ def extract_characters_from_text(novel_text: str, model_name: str = "gemini-2.0-
     try:
         # 시스템 프롬프트와 함께 모델 초기화
         # 구조화된 JSON 출력을 위해 temperature를 낮게 설정하는 것을 고려 (예: 0.1)
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            system_instruction=SYSTEM_PROMPT_CHARACTER_EXTRACTION,
-            generation_config=GenerationConfig(temperature=0.1)
-        )
+        # 같은 설정의 모델 인스턴스는 풀에서 재사용
+        client = await _aget_client(model_name, SYSTEM_PROMPT_CHARACTER_EXTRACTION, temperature=0.1)
         
-        response = model.generate_content(contents=[novel_text]) # 소설 텍스트를 contents로 전달
+        # 소설 텍스트를 contents로 전달 (할당량 제어 적용, 등장인물 목록은 출력이 짧음)
+        response = await _agenerate_with_quota(client, [novel_text],
+                                        "extract_characters", expected_output_tokens=2048)
         
         raw_json_output = response.text.strip()
         
@@ -293,6 +351,10 @@ CRITICAL: 분석 결과를 반드시 JSON 형식으로만 출력하세요. 추
 """
 
 def analyze_novel_structure(novel_text_content: str, model_name: str = "gemini-2.0-flash"):
+    """aanalyze_novel_structure의 동기 래퍼"""
+    return async_runtime.run(aanalyze_novel_structure(novel_text_content, model_name))
+
+async def aanalyze_novel_structure(novel_text_content: str, model_name: str = "gemini-2.0-flash"):
     """
     소설 텍스트를 분석하여 문장 유형, 화자, 감정, 어조 등을 포함하는 구조화된 데이터를 반환합니다.
     Args:
@@ -315,14 +377,12 @@ def analyze_novel_structure(novel_text_content: str, model_name: str = "gemini-2
         # 참고: system_instruction 인자는 genai.GenerativeModel 생성 시점에 전달하는 것이 일반적입니다.
         # generate_content 호출 시에는 contents만 전달합니다.
         # temperature와 같은 생성 설정은 GenerationConfig 객체를 통해 모델 생성자 또는 generate_content에 전달할 수 있습니다.
-        model = genai.GenerativeModel(
-            model_name=model_name, # "gemini-pro" 대신 인자로 받은 model_name 사용
-            system_instruction=STRUCTURE_ANALYSIS_SYSTEM_INSTRUCTION,
-            generation_config=GenerationConfig(temperature=0.1) # temperature 0.1로 하드코딩
-        )
+        client = await _aget_client(model_name, STRUCTURE_ANALYSIS_SYSTEM_INSTRUCTION, temperature=0.1) # temperature 0.1로 하드코딩
         
         # logging.debug(f"소설 구조 분석 요청: 모델={model_name}, 첫 100자={novel_text_content[:100]}")
-        response = model.generate_content(contents=[novel_text_content]) # contents는 리스트 형태로 전달
+        # contents는 리스트 형태로 전달 (구조 분석 결과는 입력 텍스트보다 길어지므로 출력 토큰을 크게 추정)
+        response = await _agenerate_with_quota(client, [novel_text_content],
+                                        "analyze_structure", expected_output_tokens=estimate_tokens(novel_text_content) * 3)
         
         # logging.debug(f"Gemini API 응답 수신 (구조 분석): {response.text[:200]}...")
         raw_json_output = response.text.strip()
@@ -418,18 +478,17 @@ def save_matching_result(character_voice_map, voice_actors, file_id):
         filename = f"{file_id}_matching.json"
         file_path = NOVELS_MATCHED_PATH / filename
         
-        # 성우 ID를 키로 가진 사전 생성 (빠른 참조용)
-        voice_actor_dict = {actor['id']: actor for actor in voice_actors}
-        
         # 저장할 데이터 준비 - 각 등장인물별 매칭된 성우 ID와 해당 성우의 feature 포함
+        # (성우 정보는 카탈로그의 ID 인덱스에서 조회하고, 없으면 전달된 목록에서 찾음)
         enhanced_mapping = {}
         for character_name, actor_id in character_voice_map.items():
-            if actor_id in voice_actor_dict:
+            actor = voice_actor_catalog.get(actor_id) or next((a for a in voice_actors if a.get('id') == actor_id), None)
+            if actor:
                 # 성우 ID와 함께 feature 정보 저장
                 enhanced_mapping[character_name] = {
                     "actor_id": actor_id,
-                    "actor_name": voice_actor_dict[actor_id].get('name', ''),
-                    "feature": voice_actor_dict[actor_id].get('feature', '')
+                    "actor_name": actor.get('name', ''),
+                    "feature": actor.get('feature', '')
                 }
             else:
                 # 매칭된 성우를 찾을 수 없는 경우 ID만 저장
@@ -450,7 +509,11 @@ def save_matching_result(character_voice_map, voice_actors, file_id):
         logging.error(f"매칭 결과 저장 중 오류 발생: {e}")
         return None
 
-def match_characters_with_voice_actors(characters, voice_actors, file_id=None, model_name: str = "gemini-2.0-flash", temperature: float = 0.1) -> dict:
+def match_characters_with_voice_actors(characters, voice_actors, file_id=None, model_name: str = "gemini-2.0-flash", temperature: float = 0.1, assigned_voice_map=None) -> dict:
+    """amatch_characters_with_voice_actors의 동기 래퍼"""
+    return async_runtime.run(amatch_characters_with_voice_actors(characters, voice_actors, file_id, model_name, temperature, assigned_voice_map))
+
+async def amatch_characters_with_voice_actors(characters, voice_actors, file_id=None, model_name: str = "gemini-2.0-flash", temperature: float = 0.1, assigned_voice_map=None) -> dict:
     """
     등장인물과 성우를 매칭하여 최적의 조합을 찾아 반환합니다.
     
@@ -460,6 +523,7 @@ def match_characters_with_voice_actors(characters, voice_actors, file_id=None, m
         file_id (str, optional): 소설 파일 ID. 저장 시 파일명으로 사용됩니다.
         model_name (str, optional): 사용할 모델의 이름입니다. Defaults to "gemini-2.0-flash".
         temperature (float, optional): 생성 시 샘플링 온도로, 0과 1 사이의 값입니다. Defaults to 0.1.
+        assigned_voice_map (dict, optional): 이미 배정이 끝난 등장인물-성우 매핑. 프롬프트에 포함하여 중복 배정을 피하도록 합니다.
         
     Returns:
         dict: 등장인물 이름을 키로, 성우 ID를 값으로 하는 매핑 딕셔너리
@@ -473,35 +537,53 @@ def match_characters_with_voice_actors(characters, voice_actors, file_id=None, m
         raise ValueError("GOOGLE_API_KEY is not configured.")
         
     try:
-        # 프롬프트 생성을 위한 데이터 준비
-        characters_json = json.dumps(characters, ensure_ascii=False, indent=2)
-        voice_actors_json = json.dumps(voice_actors, ensure_ascii=False, indent=2)
+        # 성우 인덱스로 등장인물별 상위 후보만 추려 프롬프트 크기를 줄임.
+        # 카탈로그 버전(또는 넘겨받은 성우 구성)이 바뀐 경우에만 이벤트 루프 밖에서 인덱스를 동기화
+        catalog_version = (voice_actor_catalog.version, tuple(actor.get("id") for actor in voice_actors))
+        if not voice_catalog_index.is_synced(catalog_version):
+            await async_runtime.run_blocking(voice_catalog_index.sync, voice_actors, catalog_version)
+        candidate_ids, candidate_actors = voice_catalog_index.candidates_for(characters, k=MATCH_CANDIDATES_TOP_K)
+
+        # 프롬프트 생성을 위한 데이터 준비 (공백 없는 압축 JSON)
+        compact_separators = (',', ':')
+        characters_json = json.dumps(characters, ensure_ascii=False, separators=compact_separators)
+        voice_actors_json = json.dumps(
+            [{key: actor.get(key) for key in ("id", "name", "gender", "age_group", "feature") if actor.get(key)} for actor in candidate_actors],
+            ensure_ascii=False, separators=compact_separators
+        )
+        candidate_ids_json = json.dumps(candidate_ids, ensure_ascii=False, separators=compact_separators)
         
         # Gemini API 프롬프트
         prompt = f"""
-        주어진 소설 등장인물과 성우 목록을 분석하여, 각 등장인물에게 가장 적합한 성우를 매칭해주세요.
+        주어진 소설 등장인물과 성우 후보 목록을 분석하여, 각 등장인물에게 가장 적합한 성우를 매칭해주세요.
 
-        성우 목록:
+        성우 후보 목록:
         {voice_actors_json}
         
         등장인물 목록:
         {characters_json}
 
+        등장인물별 우선 후보 (성우 ID):
+        {candidate_ids_json}
+
         각 등장인물의 성격과 특성을 분석하고, 성우의 목소리 특성(feature)과 가장 잘 어울리는 조합을 찾아주세요.
+        가능하면 해당 등장인물의 우선 후보 중에서 선택해주세요.
         Narrator(내레이터) 역할에도 적절한 성우를 배정해주세요.
         
         결과는 등장인물 이름을 키로, 성우의 ID 값을 값으로 하는 JSON 객체 형태로 반환해주세요.
         """
+        if assigned_voice_map:
+            prompt += f"""
+        다음 등장인물은 이미 성우가 배정되었습니다. 가능하면 같은 성우를 중복 배정하지 마세요:
+        {json.dumps(assigned_voice_map, ensure_ascii=False)}
+        """
         
-        # 시스템 지시문과 함께 모델 초기화
-        model = genai.GenerativeModel(
-            model_name=model_name,
-            system_instruction=CHARACTER_VOICE_MATCHING_SYSTEM_INSTRUCTION,
-            generation_config=GenerationConfig(temperature=temperature)
-        )
+        # 시스템 지시문이 설정된 모델 클라이언트 (풀에서 재사용)
+        client = await _aget_client(model_name, CHARACTER_VOICE_MATCHING_SYSTEM_INSTRUCTION, temperature=temperature)
         
-        logging.info(f"등장인물-성우 매칭 요청: 등장인물 {len(characters)}명, 성우 {len(voice_actors)}명, 모델={model_name}")
-        response = model.generate_content(contents=[prompt])
+        logging.info(f"등장인물-성우 매칭 요청: 등장인물 {len(characters)}명, 성우 후보 {len(candidate_actors)}/{len(voice_actors)}명, 모델={model_name}")
+        response = await _agenerate_with_quota(client, [prompt],
+                                        "match_voices", expected_output_tokens=50 * (len(characters) + 1))
         
         # JSON 형식의 응답 파싱
         raw_json_output = response.text.strip()
@@ -518,7 +600,7 @@ def match_characters_with_voice_actors(characters, voice_actors, file_id=None, m
             
             # 매칭 결과를 JSON 파일로 저장 (file_id가 제공된 경우에만)
             if file_id:
-                save_path = save_matching_result(character_voice_map, voice_actors, file_id)
+                save_path = await async_runtime.run_blocking(save_matching_result, character_voice_map, voice_actors, file_id)
                 if save_path:
                     logging.info(f"매칭 결과가 저장되었습니다: {save_path}")
             
@@ -539,3 +621,14 @@ def match_characters_with_voice_actors(characters, voice_actors, file_id=None, m
         if 'response' in locals() and hasattr(response, 'text'):
             logging.error(f"오류 발생 시 원본 응답 텍스트: {response.text}")
         raise
+
+def warm_up_model_clients(model_name: str = "gemini-2.0-flash"):
+    """애플리케이션 시작 시 기본 설정의 모델 클라이언트를 미리 생성합니다."""
+    if not API_KEY:
+        logging.info("GOOGLE_API_KEY가 없어 Gemini 모델 클라이언트 예열을 건너뜁니다.")
+        return
+    gemini_model_pool.warm_up([
+        (model_name, SYSTEM_PROMPT_CHARACTER_EXTRACTION, 0.1),
+        (model_name, STRUCTURE_ANALYSIS_SYSTEM_INSTRUCTION, 0.1),
+        (model_name, CHARACTER_VOICE_MATCHING_SYSTEM_INSTRUCTION, 0.1),
+    ])
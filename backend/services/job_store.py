@@ -0,0 +1,331 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+import functools
+import contextvars
+from datetime import datetime
+
+from services.text_storage_service import BASE_STORAGE_PATH
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 여러 워커 프로세스가 함께 쓰는 작업/진행 상태 저장소 (같은 서버의 로컬 SQLite 파일)
+JOB_STORE_FILE = os.environ.get("JOB_STORE_FILE") or os.path.join(BASE_STORAGE_PATH, 'jobs.sqlite3')
+# 실행 중인 작업의 생존 신호 주기 / 이 시간 동안 신호가 없으면 중단된 작업으로 간주 (초)
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", 15))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", 120))
+# 진행률을 저장소에 기록하는 최소 간격 (초). 세그먼트마다 쓰지 않도록 모아서 기록
+JOB_PROGRESS_FLUSH_SECONDS = float(os.environ.get("JOB_PROGRESS_FLUSH_SECONDS", 1.0))
+# 보관하는 끝난 작업 수
+JOB_HISTORY = int(os.environ.get("JOB_HISTORY", 1000))
+# 공유 SQLite 파일(작업 상태 / 작업 큐)의 저널 방식. WAL은 같은 호스트의 공유 메모리(-shm)에 의존하므로
+# 여러 노드가 네트워크 파일 시스템으로 같은 파일을 열면 안전하지 않음. 기본값 DELETE(롤백 저널)는 파일 잠금만 사용.
+# 모든 프로세스가 한 호스트에 있으면 SQLITE_JOURNAL_MODE=WAL로 동시 읽기 성능을 높일 수 있음
+SQLITE_JOURNAL_MODE = "WAL" if os.environ.get("SQLITE_JOURNAL_MODE", "DELETE").upper() == "WAL" else "DELETE"
+
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_ABANDONED = "abandoned"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    progress_done INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_file_kind_status ON jobs (file_id, kind, status);
+"""
+
+_current_job = contextvars.ContextVar("current_job", default=None)
+
+
+class JobAlreadyRunningError(Exception):
+    """같은 소설에 같은 종류의 작업이 (다른 워커에서라도) 이미 실행 중인 경우"""
+
+    def __init__(self, job):
+        self.job = job
+        super().__init__(f"'{job['file_id']}'의 {job['kind']} 작업이 이미 실행 중입니다. (작업 {job['job_id']}, 워커 {job['worker']})")
+
+
+def _worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def job_result_status(result):
+    """작업 함수의 반환값(dict 또는 (dict, 상태 코드))으로 성공 여부를 판단합니다."""
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[1], int):
+        return JOB_FAILED if result[1] >= 400 else JOB_COMPLETED
+    if isinstance(result, dict) and result.get("success") is False:
+        return JOB_FAILED
+    return JOB_COMPLETED
+
+
+class JobHandle:
+    """현재 프로세스에서 실행 중인 작업 하나. 진행률은 메모리에 모았다가 일정 간격으로 저장소에 기록합니다."""
+
+    def __init__(self, store, job_id, file_id, kind):
+        self.store = store
+        self.job_id = job_id
+        self.file_id = file_id
+        self.kind = kind
+        self._done = 0
+        self._total = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+
+    def add_total(self, count):
+        with self._lock:
+            self._total += count
+        self._maybe_flush()
+
+    def advance(self, count=1):
+        with self._lock:
+            self._done += count
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= JOB_PROGRESS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        """진행률과 생존 신호를 저장소에 기록합니다."""
+        with self._lock:
+            done, total = self._done, self._total
+            self._last_flush = time.monotonic()
+        self.store._write_progress(self.job_id, done, total)
+
+
+def configure_sqlite(conn):
+    """공유 SQLite 연결의 저널 방식을 설정합니다. (롤백 저널은 커밋마다 동기화해야 안전하므로 synchronous=FULL)"""
+    conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    conn.execute("PRAGMA synchronous=NORMAL" if SQLITE_JOURNAL_MODE == "WAL" else "PRAGMA synchronous=FULL")
+
+
+class JobStore:
+    """
+    여러 워커 프로세스가 공유하는 작업 상태 저장소.
+
+    - claim(): 같은 소설 / 같은 종류의 작업이 어느 워커에서든 실행 중이면 거부 (SQLite 쓰기 트랜잭션으로 원자적 확인)
+    - 실행 중인 작업은 주기적으로 생존 신호를 남기며, 신호가 끊긴 작업(워커 프로세스 종료 등)은 다음 claim 때 abandoned로 정리
+    - 진행률(처리한 세그먼트 수 / 전체)을 기록하여 어느 워커에서든 조회 가능
+    """
+
+    def __init__(self, path=JOB_STORE_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._handles = {}
+        self._handles_lock = threading.Lock()
+        self._heartbeat_thread = None
+        self._heartbeat_pid = None
+
+    # --- 연결 ---
+
+    def _connection(self):
+        # sqlite3 연결은 스레드 / 프로세스(fork) 간에 공유하지 않음
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            configure_sqlite(conn)
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # --- 생존 확인 ---
+
+    @staticmethod
+    def _is_alive(row, now):
+        if now - row["heartbeat"] > JOB_STALE_SECONDS:
+            return False
+        host, _, pid = row["worker"].rpartition(":")
+        if host == socket.gethostname() and os.name == "posix":
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except (PermissionError, ValueError):
+                pass
+        return True
+
+    def _start_heartbeat(self):
+        if self._heartbeat_thread and self._heartbeat_thread.is_alive() and self._heartbeat_pid == os.getpid():
+            return
+        self._heartbeat_pid = os.getpid()
+
+        def _loop():
+            while True:
+                time.sleep(JOB_HEARTBEAT_SECONDS)
+                with self._handles_lock:
+                    handles = list(self._handles.values())
+                for handle in handles:
+                    try:
+                        handle.flush()
+                    except sqlite3.Error as e:
+                        logger.warning(f"작업 생존 신호 기록 실패 ({handle.job_id}): {e}")
+
+        self._heartbeat_thread = threading.Thread(target=_loop, name="job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    # --- 작업 수명 ---
+
+    def claim(self, file_id, kind):
+        """
+        작업을 등록합니다.
+
+        Returns:
+            JobHandle: 등록된 작업
+
+        Raises:
+            JobAlreadyRunningError: 같은 소설 / 종류의 작업이 실행 중인 경우
+        """
+        conn = self._connection()
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("SELECT * FROM jobs WHERE file_id = ? AND kind = ? AND status = ?",
+                                (file_id, kind, JOB_RUNNING)).fetchall()
+            for row in rows:
+                if self._is_alive(row, now):
+                    raise JobAlreadyRunningError(self._row_to_dict(row))
+                conn.execute("UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE job_id = ?",
+                             (JOB_ABANDONED, datetime.now().isoformat(), "워커 응답 없음", row["job_id"]))
+                logger.warning(f"중단된 작업 정리: {row['job_id']} ({file_id} {kind}, 워커 {row['worker']})")
+            conn.execute(
+                "INSERT INTO jobs (job_id, file_id, kind, status, worker, started_at, heartbeat) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, file_id, kind, JOB_RUNNING, _worker_name(), datetime.now().isoformat(), now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        handle = JobHandle(self, job_id, file_id, kind)
+        with self._handles_lock:
+            self._handles[job_id] = handle
+        self._start_heartbeat()
+        return handle
+
+    def finish(self, handle, status, error=None):
+        with self._handles_lock:
+            self._handles.pop(handle.job_id, None)
+        handle.flush()
+        conn = self._connection()
+        conn.execute("UPDATE jobs SET status = ?, error = ?, finished_at = ?, heartbeat = ? WHERE job_id = ?",
+                     (status, error, datetime.now().isoformat(), time.time(), handle.job_id))
+        # 오래된 기록 정리
+        conn.execute("DELETE FROM jobs WHERE status != ? AND job_id NOT IN "
+                     "(SELECT job_id FROM jobs ORDER BY started_at DESC LIMIT ?)", (JOB_RUNNING, JOB_HISTORY))
+
+    def run(self, handle, func, *args, **kwargs):
+        """claim()으로 등록한 작업을 현재 스레드에서 실행하고, 끝나면 결과 상태를 기록합니다."""
+        token = _current_job.set(handle)
+        status, error = JOB_FAILED, None
+        try:
+            result = func(*args, **kwargs)
+            status = job_result_status(result)
+            return result
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            _current_job.reset(token)
+            try:
+                self.finish(handle, status, error)
+            except sqlite3.Error as e:
+                logger.error(f"작업 종료 기록 실패 ({handle.job_id}): {e}")
+
+    def _write_progress(self, job_id, done, total):
+        self._connection().execute("UPDATE jobs SET progress_done = ?, progress_total = ?, heartbeat = ? WHERE job_id = ?",
+                                   (done, total, time.time(), job_id))
+
+    # --- 조회 ---
+
+    @staticmethod
+    def _row_to_dict(row):
+        job = dict(row)
+        job["heartbeat_at"] = datetime.fromtimestamp(job.pop("heartbeat")).isoformat()
+        return job
+
+    def active_job(self, file_id, kind=None):
+        """실행 중인(생존 신호가 살아 있는) 작업 정보. 없으면 None"""
+        query, params = "SELECT * FROM jobs WHERE file_id = ? AND status = ?", [file_id, JOB_RUNNING]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        now = time.time()
+        for row in self._connection().execute(query + " ORDER BY started_at DESC", params).fetchall():
+            if self._is_alive(row, now):
+                return self._row_to_dict(row)
+        return None
+
+    def list_jobs(self, file_id=None, limit=50):
+        """최근 작업 목록 (최신순)"""
+        query, params = "SELECT * FROM jobs", []
+        if file_id:
+            query += " WHERE file_id = ?"
+            params.append(file_id)
+        rows = self._connection().execute(query + " ORDER BY started_at DESC LIMIT ?", params + [limit]).fetchall()
+        now = time.time()
+        jobs = []
+        for row in rows:
+            job = self._row_to_dict(row)
+            if job["status"] == JOB_RUNNING and not self._is_alive(row, now):
+                job["status"] = JOB_ABANDONED
+            jobs.append(job)
+        return jobs
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+job_store = JobStore()
+
+
+def current_job():
+    return _current_job.get()
+
+
+def report_total(count):
+    """현재 작업의 전체 처리량(세그먼트 수)을 늘립니다. 작업 밖에서 호출되면 무시합니다."""
+    handle = _current_job.get()
+    if handle is not None:
+        handle.add_total(count)
+
+
+def report_progress(count=1):
+    """현재 작업의 처리량을 늘립니다. 작업 밖에서 호출되면 무시합니다."""
+    handle = _current_job.get()
+    if handle is not None:
+        handle.advance(count)
+
+
+def tracked_job(kind):
+    """
+    작업 함수 데코레이터. 첫 번째 인자(file_id)로 작업을 등록하고 끝나면 결과 상태를 기록합니다.
+    같은 작업이 이미 실행 중이면 JobAlreadyRunningError를 발생시킵니다.
+    이미 다른 작업 안에서 호출되면(분석 파이프라인 안의 오디오 생성 등) 바깥 작업의 일부로 실행합니다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(file_id, *args, **kwargs):
+            if _current_job.get() is not None:
+                return func(file_id, *args, **kwargs)
+            handle = job_store.claim(file_id, kind)
+            return job_store.run(handle, func, file_id, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+
+from services.file_lock import InterProcessLock
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.voice_matching_engine import NARRATOR_NAME
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 캐시 파일 경로
+MATCHING_CACHE_FILE = os.path.join(BASE_STORAGE_PATH, 'cache', 'matching_cache.json')
+
+# 보관할 최대 항목 수 (초과 시 오래 사용되지 않은 항목부터 삭제)
+MATCHING_CACHE_MAX_ENTRIES = int(os.environ.get("MATCHING_CACHE_MAX_ENTRIES", 5000))
+
+
+def _normalize(text):
+    """대소문자, 공백, 유니코드 정규화 차이를 없앤 비교용 문자열을 만듭니다."""
+    text = unicodedata.normalize("NFC", str(text or ""))
+    return " ".join(text.lower().split())
+
+
+def character_fingerprint(character, catalog_version):
+    """
+    등장인물 프로필(설명 + 말투)과 성우 카탈로그 버전으로 지문을 만듭니다.
+    설명과 말투가 모두 비어 있는 인물(Narrator 등)은 이름으로 구분합니다.
+    """
+    description = _normalize(character.get("description"))
+    speech_pattern = _normalize(character.get("speech_pattern"))
+    if not description and not speech_pattern:
+        identity = f"name:{_normalize(character.get('name'))}"
+    else:
+        identity = f"profile:{description}\x1f{speech_pattern}"
+    return hashlib.sha256(f"{catalog_version}\x1e{identity}".encode("utf-8")).hexdigest()
+
+
+class MatchingCache:
+    """
+    등장인물 지문 → 배정된 성우 ID 캐시.
+
+    같은 소설을 다시 업로드하거나 같은 등장인물이 나오는 후속작을 매칭할 때,
+    이미 매칭한 인물은 재사용하고 새로 등장했거나 설명이 바뀐 인물만 매칭하도록 합니다.
+    카탈로그 버전이 지문에 포함되므로 성우 목록이 바뀌면 기존 항목은 자연히 사용되지 않습니다.
+    """
+
+    def __init__(self, cache_file=MATCHING_CACHE_FILE, max_entries=MATCHING_CACHE_MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # 여러 워커 프로세스가 같은 캐시 파일을 읽고-합치고-쓰는 구간을 보호
+        self._file_lock = InterProcessLock(cache_file + ".lock")
+        self._entries = None
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _load(self):
+        """캐시 파일을 읽습니다. (lock 보유 상태에서 호출)"""
+        if self._entries is not None:
+            return
+        self._entries = self._read_file()
+
+    def _read_file(self):
+        if not os.path.exists(self.cache_file):
+            return {}
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"매칭 캐시 로드 실패, 빈 캐시로 시작합니다: {e}")
+            return {}
+
+    def _save(self):
+        """
+        캐시 파일을 저장합니다. (lock 보유 상태에서 호출)
+        다른 프로세스가 그사이 저장한 항목을 잃지 않도록, 파일 잠금을 잡고 디스크의 최신 내용을 다시 읽어
+        이 프로세스의 항목과 합친 뒤(같은 지문은 최근에 사용된 쪽 우선) 씁니다.
+        """
+        try:
+            with self._file_lock:
+                merged = self._read_file()
+                for fingerprint, entry in self._entries.items():
+                    current = merged.get(fingerprint)
+                    if current is None or entry.get("used_at", 0) >= current.get("used_at", 0):
+                        merged[fingerprint] = entry
+                if len(merged) > self.max_entries:
+                    ordered = sorted(merged.items(), key=lambda item: item[1].get("used_at", 0), reverse=True)
+                    merged = dict(ordered[:self.max_entries])
+                self._entries = merged
+
+                os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+                tmp_file = f"{self.cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f, ensure_ascii=False)
+                os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.warning(f"매칭 캐시 저장 실패: {e}")
+
+    def lookup(self, characters, catalog_version, include_narrator=True):
+        """
+        캐시에서 등장인물별 성우 배정을 찾습니다.
+
+        Args:
+            characters (list): 등장인물 정보 리스트
+            catalog_version (str): 성우 카탈로그 버전
+            include_narrator (bool, optional): Narrator도 조회할지 여부
+
+        Returns:
+            tuple: ({등장인물 이름: 성우 ID} 캐시 적중분, [캐시에 없는 등장인물 리스트])
+        """
+        targets = list(characters)
+        if include_narrator and not any(c.get("name") == NARRATOR_NAME for c in targets):
+            targets.append({"name": NARRATOR_NAME})
+
+        hits, misses, seen = {}, [], set()
+        now = time.time()
+        with self._lock:
+            self._load()
+            for character in targets:
+                fingerprint = character_fingerprint(character, catalog_version)
+                entry = self._entries.get(fingerprint)
+                # 같은 프로필의 인물이 한 작품에 둘 이상이면 두 번째부터는 새로 매칭 (목소리 중복 방지)
+                if entry and fingerprint not in seen and character.get("name") not in hits:
+                    hits[character.get("name")] = entry["voice_id"]
+                    entry["used_at"] = now
+                    seen.add(fingerprint)
+                else:
+                    misses.append(character)
+        self.stats["hits"] += len(hits)
+        self.stats["misses"] += len(misses)
+        return hits, misses
+
+    def store(self, characters, character_voice_map, catalog_version, include_narrator=True):
+        """
+        매칭 결과를 캐시에 저장합니다.
+
+        Args:
+            characters (list): 등장인물 정보 리스트
+            character_voice_map (dict): 등장인물 이름 → 성우 ID
+            catalog_version (str): 성우 카탈로그 버전
+        """
+        targets = list(characters)
+        if include_narrator and not any(c.get("name") == NARRATOR_NAME for c in targets):
+            targets.append({"name": NARRATOR_NAME})
+
+        now = time.time()
+        with self._lock:
+            self._load()
+            for character in targets:
+                voice_id = character_voice_map.get(character.get("name"))
+                if not voice_id:
+                    continue
+                self._entries[character_fingerprint(character, catalog_version)] = {
+                    "voice_id": voice_id,
+                    "name": character.get("name"),
+                    "used_at": now,
+                }
+            self._save()
+
+    def get_stats(self):
+        with self._lock:
+            self._load()
+            return {"entries": len(self._entries), **self.stats}
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+matching_cache = MatchingCache()
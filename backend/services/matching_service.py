@@ -3,8 +3,13 @@ import json
 import logging
 from pathlib import Path
 
-from services.text_storage_service import get_metadata
+from services.text_storage_service import get_metadata, update_metadata_entry, BASE_STORAGE_PATH
 from services.gemini_service import match_characters_with_voice_actors
+from services.voice_matching_engine import VoiceMatchingEngine, NARRATOR_NAME
+from services.voice_actor_catalog import voice_actor_catalog
+from services.matching_cache import matching_cache
+from services.tracing import span, traced_job
+from services.job_store import tracked_job
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -12,38 +17,29 @@ logger = logging.getLogger(__name__)
 
 # 기본 경로 설정
 BASE_PATH = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-CHARACTER_ANALYSIS_PATH = BASE_PATH / 'app_data' / 'character_analysis'
-NOVELS_PROCESSED_PATH = BASE_PATH / 'app_data' / 'novels_processed'
-NOVELS_MATCHED_PATH = BASE_PATH / 'app_data' / 'novels_matched'
-ACTOR_LIST_PATH = BASE_PATH / 'app_data' / 'actor_list.json'
-
-# novels_matched 폴더가 없는 경우 생성
-if not os.path.exists(NOVELS_MATCHED_PATH):
-    os.makedirs(NOVELS_MATCHED_PATH)
-    logger.info(f"novels_matched 폴더 생성: {NOVELS_MATCHED_PATH}")
+APP_DATA_PATH = Path(BASE_STORAGE_PATH)
+CHARACTER_ANALYSIS_PATH = APP_DATA_PATH / 'character_analysis'
+NOVELS_PROCESSED_PATH = APP_DATA_PATH / 'novels_processed'
+NOVELS_MATCHED_PATH = APP_DATA_PATH / 'novels_matched'
+ACTOR_LIST_PATH = APP_DATA_PATH / 'actor_list.json'
 
 # --- voice_actor_service에서 통합된 함수들 ---
 
-def load_voice_actors():
+def load_voice_actors(gender=None, age_group=None, feature=None):
     """
-    성우 목록을 JSON 파일에서 로드하여 반환합니다.
+    성우 목록을 반환합니다. 프로세스 전역 카탈로그(메모리)에서 조회하며,
+    actor_list.json이 변경된 경우에만 파일을 다시 읽습니다.
+    
+    Args:
+        gender (str, optional): 성별 필터
+        age_group (str, optional): 나이대 필터
+        feature (str | list, optional): 특성 태그 필터
     
     Returns:
         list: 성우 정보 객체의 리스트 (없으면 빈 리스트)
     """
     try:
-        if not os.path.exists(ACTOR_LIST_PATH):
-            logger.error(f"성우 목록 파일이 존재하지 않습니다: {ACTOR_LIST_PATH}")
-            return []
-            
-        with open(ACTOR_LIST_PATH, 'r', encoding='utf-8') as f:
-            voice_actors = json.load(f)
-            
-        logger.info(f"{len(voice_actors)}명의 성우 데이터를 로드했습니다.")
-        return voice_actors
-    except json.JSONDecodeError as e:
-        logger.error(f"성우 데이터 파싱 오류: {e}")
-        return []
+        return voice_actor_catalog.query(gender=gender, age_group=age_group, feature=feature)
     except Exception as e:
         logger.error(f"성우 데이터 로드 중 오류 발생: {e}")
         return []
@@ -112,44 +108,110 @@ def load_structure_analysis(file_id):
         return []
 
 
-def match_with_gemini(characters, voice_actors, file_id=None, model_name: str = "gemini-2.0-flash", temperature: float = 0.1):
+def match_with_local_engine(characters, voice_actors, model_name: str = "gemini-2.0-flash", temperature: float = 0.1,
+                           assigned_voice_map=None, include_narrator=True):
     """
-    Gemini API를 사용하여 등장인물과 성우를 매칭합니다.
-    
+    로컬 벡터 매칭 엔진으로 등장인물과 성우를 매칭하고, 1위-2위 점수 차이가 작은
+    애매한 등장인물만 Gemini API에 다시 판단을 맡깁니다.
+
     Args:
         characters (list): 등장인물 정보 리스트
         voice_actors (list): 성우 정보 리스트
-        file_id (str, optional): 소설 파일 ID
-        model_name (str, optional): 사용할 모델의 이름입니다. Defaults to "gemini-2.0-flash".
+        model_name (str, optional): 애매한 경우 사용할 모델의 이름입니다. Defaults to "gemini-2.0-flash".
         temperature (float, optional): 생성 시 샘플링 온도로, 0과 1 사이의 값입니다. Defaults to 0.1.
-        
+        assigned_voice_map (dict, optional): 이미 배정이 끝난 등장인물 → 성우 ID (중복 배정을 피하는 데 사용)
+        include_narrator (bool, optional): Narrator 배정 포함 여부
+
     Returns:
-        dict: 등장인물 이름과 성우 ID 매핑 딕셔너리
+        dict: 등장인물 이름과 성우 ID 매핑 딕셔너리 (assigned_voice_map의 항목은 포함하지 않음)
     """
-    character_voice_map = {}
-    
+    assigned_voice_map = assigned_voice_map or {}
+    engine = VoiceMatchingEngine(voice_actors)
+    local_result = engine.match(characters, include_narrator=include_narrator,
+                                assigned_ids=list(assigned_voice_map.values()))
+    character_voice_map = local_result["character_voice_map"]
+    ambiguous = local_result["ambiguous"]
+    logger.info(f"로컬 매칭 완료: {len(character_voice_map)} 매핑, 애매한 인물 {len(ambiguous)}명 {ambiguous}")
+
+    if not ambiguous:
+        return character_voice_map
+
+    # 애매한 인물만 Gemini로 재판단 (실패 시 로컬 결과 유지)
+    ambiguous_characters = [c for c in characters if c.get("name") in ambiguous]
+    settled_map = dict(assigned_voice_map)
+    settled_map.update({name: actor_id for name, actor_id in character_voice_map.items() if name not in ambiguous})
     try:
-        # gemini_service.py의 함수를 호출하여 매칭 수행
-        logger.info("Gemini API 호출: 등장인물-성우 매칭")
-        character_voice_map = match_characters_with_voice_actors(
-            characters, 
+        gemini_map = match_characters_with_voice_actors(
+            ambiguous_characters,
             voice_actors,
-            file_id,
+            None,
             model_name,
-            temperature
+            temperature,
+            assigned_voice_map=settled_map
         )
-        logger.info(f"등장인물-성우 매칭 성공: {len(character_voice_map)} 매핑")
-            
     except Exception as e:
-        logger.error(f"Gemini를 사용한 매칭 중 오류 발생: {str(e)}")
-        # 오류 발생 시 빈 매핑 반환
-    
+        logger.warning(f"애매한 인물에 대한 Gemini 매칭 실패, 로컬 매칭 결과를 사용합니다: {e}")
+        return character_voice_map
+
+    valid_ids = set(engine.actor_ids)
+    for name in ambiguous:
+        actor_id = gemini_map.get(name) if isinstance(gemini_map, dict) else None
+        if actor_id in valid_ids:
+            character_voice_map[name] = actor_id
+        elif name == NARRATOR_NAME and isinstance(gemini_map, dict) and gemini_map.get("narrator") in valid_ids:
+            character_voice_map[name] = gemini_map["narrator"]
+    logger.info(f"Gemini 보정 매칭 완료: {len(ambiguous)}명")
+    return character_voice_map
+
+
+def match_with_cache(characters, voice_actors, model_name: str = "gemini-2.0-flash", temperature: float = 0.1):
+    """
+    매칭 캐시를 먼저 확인하고, 캐시에 없는(새로 등장했거나 설명이 바뀐) 등장인물만 매칭한 뒤 결과를 합칩니다.
+
+    Args:
+        characters (list): 등장인물 정보 리스트
+        voice_actors (list): 성우 정보 리스트
+        model_name (str, optional): 애매한 경우 사용할 모델의 이름입니다. Defaults to "gemini-2.0-flash".
+        temperature (float, optional): 생성 시 샘플링 온도로, 0과 1 사이의 값입니다. Defaults to 0.1.
+
+    Returns:
+        dict: 등장인물 이름과 성우 ID 매핑 딕셔너리
+    """
+    catalog_version = voice_actor_catalog.version
+    valid_ids = {actor.get("id") for actor in voice_actors}
+    with span("matching.cache_lookup", "matching", characters=len(characters)):
+        cached_map, misses = matching_cache.lookup(characters, catalog_version)
+    # 필터링된 성우 목록으로 매칭하는 경우 등 목록에 없는 성우는 캐시 적중으로 보지 않음
+    for name in [name for name, actor_id in cached_map.items() if actor_id not in valid_ids]:
+        del cached_map[name]
+        misses.append(next((c for c in characters if c.get("name") == name), {"name": name}))
+    logger.info(f"매칭 캐시: 적중 {len(cached_map)}명, 새로 매칭 {len(misses)}명")
+
+    if not misses:
+        return cached_map
+
+    with span("matching.local_engine", "matching", characters=len(misses)):
+        new_map = match_with_local_engine(
+            [c for c in misses if c.get("name") != NARRATOR_NAME or c.get("description")],
+            voice_actors,
+            model_name,
+            temperature,
+            assigned_voice_map=cached_map,
+            include_narrator=NARRATOR_NAME not in cached_map,
+        )
+    if new_map:
+        matching_cache.store(misses, new_map, catalog_version, include_narrator=False)
+
+    character_voice_map = dict(cached_map)
+    character_voice_map.update(new_map)
     return character_voice_map
 
 
+@tracked_job("matching")
+@traced_job("matching")
 def match_characters_with_voices(file_id):
     """
-    등장인물과 성우를 매칭합니다. Gemini API를 사용해 매칭합니다.
+    등장인물과 성우를 매칭합니다. 로컬 매칭 엔진을 우선 사용하고, 애매한 경우에만 Gemini API를 사용합니다.
     
     Args:
         file_id (str): 소설 파일 ID
@@ -173,8 +235,8 @@ def match_characters_with_voices(file_id):
         if not structure_data:
             return {"success": False, "error": "소설 구조 분석 데이터를 불러오지 못했습니다."}
         
-        # 4. 캐릭터-성우 매칭 (Gemini API 사용)
-        character_voice_map = match_with_gemini(characters, voice_actors, file_id)
+        # 4. 캐릭터-성우 매칭 (매칭 캐시 → 로컬 엔진 → 애매한 경우 Gemini API)
+        character_voice_map = match_with_cache(characters, voice_actors)
         
         # 5. 결과 데이터 생성
         result_data = {
@@ -220,17 +282,12 @@ def save_matching_result(file_id, matching_data):
         with open(matching_file_path, 'w', encoding='utf-8') as f:
             json.dump(matching_data, f, ensure_ascii=False, indent=2)
         
-        # 메타데이터 업데이트
-        metadata = get_metadata()
-        if file_id in metadata:
-            metadata[file_id]["matching_file"] = matching_filename
-            metadata[file_id]["matching_timestamp"] = __import__("datetime").datetime.now().isoformat()
-            metadata[file_id]["matching_path"] = str(NOVELS_MATCHED_PATH)
-            
-            # 메타데이터 저장
-            metadata_path = BASE_PATH / 'app_data' / 'metadata.json'
-            with open(metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=4)
+        # 메타데이터 업데이트 (동시 실행되는 분석 단계와 충돌하지 않도록 잠금 사용)
+        update_metadata_entry(file_id, {
+            "matching_file": matching_filename,
+            "matching_timestamp": __import__("datetime").datetime.now().isoformat(),
+            "matching_path": str(NOVELS_MATCHED_PATH)
+        })
         
         logger.info(f"매칭 결과를 저장했습니다: {matching_file_path}")
         return {"success": True, "matching_file": matching_filename}
@@ -290,4 +347,63 @@ def load_matching_result(file_id):
         return {"success": False, "error": "매칭 결과 파일 형식이 잘못되었습니다."}
     except Exception as e:
         logger.error(f"매칭 결과 로드 중 오류 발생: {e}")
-        return {"success": False, "error": f"매칭 결과 로드 중 오류 발생: {str(e)}"} 
\ No newline at end of file
+        return {"success": False, "error": f"매칭 결과 로드 중 오류 발생: {str(e)}"} 
+
+
+# 세그먼트 편집에서 변경할 수 있는 필드
+EDITABLE_SEGMENT_FIELDS = ("text", "speaker", "emotion", "tone", "expression_level", "voice_id")
+
+
+def _rewrite_segment_in_file(file_path, order, edits, persist=True):
+    """
+    구조/매칭 JSON 파일에서 order가 일치하는 세그먼트를 찾아 수정합니다. persist가 False면 파일은 그대로 두고 수정 결과만 반환합니다.
+
+    Returns:
+        dict: 수정된 세그먼트, 파일이나 세그먼트가 없으면 None
+    """
+    if not os.path.exists(file_path):
+        return None
+    with open(file_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        segments = data
+    elif isinstance(data, dict):
+        segments = data.get("story_items", data.get("segments", []))
+    else:
+        return None
+
+    for segment in segments:
+        if isinstance(segment, dict) and str(segment.get("order")) == str(order):
+            segment.update(edits)
+            if not persist:
+                return dict(segment)
+            tmp_path = f"{file_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, file_path)
+            return dict(segment)
+    return None
+
+
+def update_story_segment(file_id, order, edits, structure_filename=None, persist=True):
+    """
+    세그먼트 하나의 텍스트/화자/감정/톤/음성을 수정하여 구조 분석 파일과 매칭 결과 파일에 반영합니다.
+
+    Args:
+        file_id (str): 소설 파일 ID
+        order (int): 세그먼트 순서
+        edits (dict): 수정할 필드 (EDITABLE_SEGMENT_FIELDS 중 일부)
+        structure_filename (str, optional): 챕터 구조 파일명. 없으면 책 전체 구조 파일과 매칭 결과 파일을 수정
+        persist (bool, optional): False면 파일을 수정하지 않고 수정된 세그먼트만 미리 계산 (검증 전 확인용)
+
+    Returns:
+        dict: 수정된 세그먼트, 세그먼트를 찾지 못하면 None
+    """
+    edits = {key: value for key, value in edits.items() if key in EDITABLE_SEGMENT_FIELDS}
+    if structure_filename:
+        return _rewrite_segment_in_file(NOVELS_PROCESSED_PATH / structure_filename, order, edits, persist)
+
+    structure_segment = _rewrite_segment_in_file(NOVELS_PROCESSED_PATH / f"{file_id}_structure.json", order, edits, persist)
+    matched_segment = _rewrite_segment_in_file(NOVELS_MATCHED_PATH / f"{file_id}_matching.json", order, edits, persist)
+    return matched_segment or structure_segment
@@ -0,0 +1,303 @@
+import re
+import time
+import bisect
+import logging
+import threading
+from contextlib import ContextDecorator
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 외부 API 호출 지연용 기본 버킷 (초)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 오디오 크기 버킷 (바이트)
+BYTES_BUCKETS = (4096, 16384, 65536, 262144, 1048576, 4194304)
+# 파이프라인 단계 소요 시간 버킷 (초)
+STAGE_BUCKETS = (0.1, 1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+METRIC_NAME_PATTERN = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*$')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape_label(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """레이블 조합별 값을 보관하는 지표의 공통 부분."""
+
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        if not METRIC_NAME_PATTERN.match(name):
+            raise ValueError(f"잘못된 지표 이름입니다: {name}")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: 레이블이 맞지 않습니다. 필요: {self.labelnames}, 받음: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        """(접미사, 레이블 값, 추가 레이블, 값) 목록"""
+        with self._lock:
+            return [("", key, None, value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, key, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """단조 증가 카운터. rate()로 초당 값을 구합니다."""
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class _InProgress(ContextDecorator):
+    def __init__(self, gauge, labels):
+        self._gauge = gauge
+        self._labels = labels
+
+    def __enter__(self):
+        self._gauge.inc(**self._labels)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._gauge.dec(**self._labels)
+        return False
+
+
+class Gauge(_Metric):
+    """증감하는 현재 값 (진행 중인 작업 수 등)."""
+
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def track_inprogress(self, **labels):
+        """진행 중인 동안 값을 1 올리는 컨텍스트 매니저 / 데코레이터."""
+        return _InProgress(self, labels)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def _recreate_cm(self):
+        # 데코레이터로 동시에 여러 번 호출될 수 있으므로 호출마다 새 타이머 사용
+        return _Timer(self._histogram, self._labels)
+
+    def __enter__(self):
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._histogram.observe(time.monotonic() - self._started, **self._labels)
+        return False
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램. histogram_quantile()로 분위수를 구합니다."""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            entry["buckets"][bisect.bisect_left(self.buckets, value)] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def time(self, **labels):
+        """구간 소요 시간을 기록하는 컨텍스트 매니저 / 데코레이터."""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = sorted((key, {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]})
+                           for key, v in self._values.items())
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), entry["buckets"]):
+                cumulative += count
+                samples.append(("_bucket", key, [("le", _format_value(bound))], cumulative))
+            samples.append(("_sum", key, None, entry["sum"]))
+            samples.append(("_count", key, None, entry["count"]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    프로세스 전역 지표 저장소. Prometheus 텍스트 형식(0.0.4)으로 내보냅니다.
+
+    기존 모듈이 이미 집계하는 통계(get_stats)는 수집 함수(collector)로 등록하여 조회 시점에 변환합니다.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"이미 등록된 지표입니다: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector):
+        """
+        조회 시점에 호출되는 수집 함수를 등록합니다.
+        collector()는 (이름, 유형, 설명, [(레이블 dict, 값)]) 목록을 반환합니다.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        # 여러 수집 함수가 같은 이름의 지표를 내보낼 수 있으므로 이름별로 모아서 출력
+        families = {}
+        for collector in collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                logger.warning(f"지표 수집 함수 실행 실패: {e}")
+                continue
+            for name, type_name, documentation, samples in collected:
+                families.setdefault(name, (type_name, documentation, []))[2].extend(samples)
+        for name, (type_name, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+metrics_registry = MetricsRegistry()
+
+# --- 외부 API ---
+GEMINI_CALL_SECONDS = metrics_registry.histogram(
+    "gemini_call_duration_seconds", "Gemini 호출의 모델 응답 시간 (재시도 포함)", ("function", "model"))
+GEMINI_QUEUE_WAIT_SECONDS = metrics_registry.histogram(
+    "gemini_queue_wait_seconds", "Gemini 할당량 제어기 대기 + 백오프 시간", ("function",))
+GEMINI_CALLS_TOTAL = metrics_registry.counter(
+    "gemini_calls_total", "Gemini 호출 수", ("function", "model", "outcome"))
+GEMINI_CALLS_IN_PROGRESS = metrics_registry.gauge(
+    "gemini_calls_in_progress", "진행 중인 Gemini 호출 수 (대기 포함)")
+
+ELEVENLABS_SYNTHESIS_SECONDS = metrics_registry.histogram(
+    "elevenlabs_synthesis_duration_seconds", "ElevenLabs 음성 합성 요청 응답 시간")
+ELEVENLABS_SLOT_WAIT_SECONDS = metrics_registry.histogram(
+    "elevenlabs_slot_wait_seconds", "ElevenLabs 동시 요청 슬롯 대기 시간")
+ELEVENLABS_AUDIO_BYTES = metrics_registry.histogram(
+    "elevenlabs_audio_bytes", "합성된 오디오 크기 (바이트)", buckets=BYTES_BUCKETS)
+ELEVENLABS_REQUESTS_TOTAL = metrics_registry.counter(
+    "elevenlabs_requests_total", "ElevenLabs 음성 합성 요청 수 (HTTP 상태 코드별)", ("status",))
+ELEVENLABS_REQUESTS_IN_PROGRESS = metrics_registry.gauge(
+    "elevenlabs_requests_in_progress", "진행 중인 ElevenLabs 음성 합성 요청 수")
+
+EXTERNAL_API_THROTTLED_TOTAL = metrics_registry.counter(
+    "external_api_throttled_total", "외부 API의 429 (할당량 초과) 응답 수", ("api",))
+
+# --- 합성 스케줄러 ---
+SCHEDULER_QUEUE_WAIT_SECONDS = metrics_registry.histogram(
+    "scheduler_queue_wait_seconds", "합성 슬롯 대기 시간 (우선순위 등급별)", ("priority",))
+SCHEDULER_WAITING = metrics_registry.gauge(
+    "scheduler_waiting_requests", "합성 슬롯을 기다리는 요청 수 (우선순위 등급별)", ("priority",))
+SCHEDULER_REJECTED_TOTAL = metrics_registry.counter(
+    "scheduler_rejected_jobs_total", "입장 제어로 거부한 합성 작업 수", ("priority", "reason"))
+
+# --- 작업 / 파이프라인 ---
+JOBS_IN_PROGRESS = metrics_registry.gauge(
+    "audiobook_jobs_in_progress", "진행 중인 작업 수 (analysis / chapters / generate / recast / segment)", ("kind",))
+PIPELINE_STAGE_SECONDS = metrics_registry.histogram(
+    "pipeline_stage_duration_seconds", "파이프라인 단계 소요 시간", ("stage", "status"), buckets=STAGE_BUCKETS)
+SEGMENTS_TOTAL = metrics_registry.counter(
+    "audiobook_segments_total", "처리한 오디오 세그먼트 수 (rate()로 초당 세그먼트 수)", ("outcome",))
+SEGMENTS_IN_PROGRESS = metrics_registry.gauge(
+    "audiobook_segments_in_progress", "합성 중인 세그먼트 수")
+
+
+def stage_metric_name(stage_name):
+    """챕터별 단계 이름(structure_12 등)을 레이블 값으로 쓰도록 번호를 제거합니다."""
+    return re.sub(r'_\d+$', '', stage_name)
+
+
+def cache_collector(name, stats_func, hit_keys=("hits",), miss_keys=("misses",)):
+    """
+    캐시의 get_stats() 결과를 cache_lookups_total / cache_hit_ratio 지표로 변환하는 수집 함수를 만듭니다.
+    """
+    def _collect():
+        stats = stats_func()
+        hits = sum(stats.get(key, 0) for key in hit_keys)
+        misses = sum(stats.get(key, 0) for key in miss_keys)
+        total = hits + misses
+        return [
+            ("cache_lookups_total", "counter", "캐시 조회 수",
+             [({"cache": name, "result": "hit"}, hits), ({"cache": name, "result": "miss"}, misses)]),
+            ("cache_hit_ratio", "gauge", "프로세스 시작 이후 캐시 적중률",
+             [({"cache": name}, round(hits / total, 4) if total else 0.0)]),
+        ]
+    return _collect
@@ -0,0 +1,208 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from services.gemini_service import extract_characters_from_text, analyze_novel_structure
+from services.text_storage_service import save_character_analysis, save_novel_structure_analysis
+from services.matching_service import match_with_cache, load_voice_actors, save_matching_result
+from services.elevenlabs_service import generate_complete_audiobook, validate_character_voice_map
+from services.metrics import PIPELINE_STAGE_SECONDS, JOBS_IN_PROGRESS, stage_metric_name
+from services.tracing import span, bind_trace, traced_job
+from services.job_store import tracked_job
+from services.synthesis_scheduler import AdmissionRejectedError
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 파이프라인 동시 실행 스레드 수 (독립적인 Gemini 분석이 동시에 실행될 수 있도록 최소 2)
+PIPELINE_MAX_WORKERS = 4
+
+
+class PipelineStage:
+    """의존성 그래프의 한 단계."""
+
+    def __init__(self, name, func, depends_on=None):
+        self.name = name
+        self.func = func  # func(results) -> 결과. results는 완료된 선행 단계들의 결과 dict
+        self.depends_on = list(depends_on or [])
+
+
+def run_stage_graph(stages, max_workers=PIPELINE_MAX_WORKERS, propagate=()):
+    """
+    단계들을 의존성 그래프 순서로 실행합니다. 선행 단계가 모두 끝난 단계는 즉시 실행되며,
+    서로 독립적인 단계는 동시에 실행됩니다. 선행 단계가 실패하면 후속 단계는 건너뜁니다.
+
+    Args:
+        stages (list): PipelineStage 객체의 리스트
+        max_workers (int, optional): 동시에 실행할 최대 단계 수
+        propagate (tuple, optional): 단계 실패로 기록하지 않고, 실행 중인 단계가 끝난 뒤 그대로 다시 발생시킬 예외 종류
+
+    Returns:
+        tuple: (단계별 결과 dict, 단계별 실행 정보 dict)
+    """
+    stage_map = {stage.name: stage for stage in stages}
+    for stage in stages:
+        for dep in stage.depends_on:
+            if dep not in stage_map:
+                raise ValueError(f"알 수 없는 선행 단계입니다: {stage.name} -> {dep}")
+
+    results = {}
+    propagated = None
+    timings = {name: {"status": "pending"} for name in stage_map}
+    pipeline_start = time.monotonic()
+    remaining = dict(stage_map)
+    running = {}
+
+    def _run(stage):
+        started = time.monotonic()
+        timings[stage.name].update({"status": "running", "started_at": round(started - pipeline_start, 3)})
+        status = "failed"
+        try:
+            # 선행 단계 결과만 전달
+            with span(stage.name, "stage", depends_on=stage.depends_on):
+                result = stage.func({dep: results[dep] for dep in stage.depends_on})
+            status = "completed"
+            return result
+        finally:
+            duration = time.monotonic() - started
+            timings[stage.name]["duration_seconds"] = round(duration, 3)
+            PIPELINE_STAGE_SECONDS.observe(duration, stage=stage_metric_name(stage.name), status=status)
+
+    # 각 단계는 작업 스레드에서 실행되므로 현재 작업 트레이스를 넘겨줌
+    _run = bind_trace(_run)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as executor:
+        while remaining or running:
+            # 실행 가능한 단계 제출 / 실패한 선행 단계가 있는 단계는 건너뜀
+            for name, stage in list(remaining.items()):
+                dep_status = [timings[dep]["status"] for dep in stage.depends_on]
+                if any(status in ("failed", "skipped") for status in dep_status):
+                    timings[name] = {"status": "skipped", "reason": "선행 단계 실패"}
+                    del remaining[name]
+                elif all(status == "completed" for status in dep_status):
+                    running[executor.submit(_run, stage)] = name
+                    del remaining[name]
+
+            if not running:
+                break
+
+            done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    timings[name]["status"] = "completed"
+                except propagate as e:
+                    timings[name]["status"] = "failed"
+                    propagated = propagated or e
+                except Exception as e:
+                    logger.error(f"파이프라인 단계 '{name}' 실패: {e}")
+                    timings[name]["status"] = "failed"
+                    timings[name]["error"] = str(e)
+
+    if propagated is not None:
+        raise propagated
+    timings["_total"] = {"duration_seconds": round(time.monotonic() - pipeline_start, 3)}
+    return results, timings
+
+
+@tracked_job("analysis")
+@JOBS_IN_PROGRESS.track_inprogress(kind="analysis")
+@traced_job("analysis")
+def run_analysis_pipeline(file_id, novel_text, generate_audio=False):
+    """
+    업로드된 소설에 대해 등장인물 분석 → 성우 매칭, 구조 분석, (선택) 오디오북 생성을 한 번에 실행합니다.
+
+    등장인물 분석과 구조 분석은 동시에 실행되며, 성우 매칭은 등장인물 분석이 끝나는 즉시 시작됩니다.
+    매칭 결과 저장은 매칭과 구조 분석이 모두 끝난 뒤에 수행됩니다.
+
+    Args:
+        file_id (str): 소설 파일 ID
+        novel_text (str): 소설 전체 텍스트
+        generate_audio (bool, optional): 매칭 후 오디오북 생성까지 실행할지 여부
+
+    Returns:
+        dict: 성공 여부, 단계별 결과 요약 및 단계별 소요 시간
+
+    Raises:
+        AdmissionRejectedError: 오디오북 생성 단계가 합성 대기량 상한에 걸려 거부된 경우 (분석 결과는 저장됨)
+    """
+
+    def characters_stage(_):
+        characters = extract_characters_from_text(novel_text)
+        if not characters:
+            raise RuntimeError("등장인물 분석 결과가 비어 있습니다.")
+        if not save_character_analysis(file_id, characters):
+            raise RuntimeError("등장인물 분석 결과 저장에 실패했습니다.")
+        return characters
+
+    def structure_stage(_):
+        structure_data = analyze_novel_structure(novel_text)
+        if not structure_data:
+            raise RuntimeError("소설 구조 분석 결과가 비어 있습니다.")
+        if isinstance(structure_data, dict) and "error" in structure_data:
+            raise ValueError(structure_data["error"])
+        if not save_novel_structure_analysis(file_id, structure_data):
+            raise RuntimeError("소설 구조 분석 결과 저장에 실패했습니다.")
+        return structure_data
+
+    def matching_stage(deps):
+        voice_actors = load_voice_actors()
+        if not voice_actors:
+            raise RuntimeError("성우 데이터를 불러오지 못했습니다.")
+        character_voice_map = match_with_cache(deps["characters"], voice_actors)
+        if not character_voice_map:
+            raise RuntimeError("등장인물-성우 매칭 결과가 비어 있습니다.")
+        return character_voice_map
+
+    def save_matching_stage(deps):
+        structure_data = deps["structure"]
+        story_items = structure_data["segments"] if isinstance(structure_data, dict) and "segments" in structure_data else structure_data
+        result_data = {
+            "character_voice_map": deps["matching"],
+            "story_items": story_items
+        }
+        save_result = save_matching_result(file_id, result_data)
+        if not save_result.get("success"):
+            raise RuntimeError(save_result.get("error"))
+        return result_data
+
+    def generate_stage(deps):
+        # 생성 시작 전에 매칭된 voice_id를 한 번에 검증 (세그먼트마다 실패하는 것을 방지)
+        validation = validate_character_voice_map(deps["save_matching"]["character_voice_map"])
+        if not validation.get("valid"):
+            raise ValueError(f"일부 등장인물에 유효하지 않은 성우 음성 ID가 배정되어 있습니다: {validation.get('invalid')}")
+        result, status_code = generate_complete_audiobook(file_id, deps["save_matching"])
+        if status_code != 200:
+            raise RuntimeError(result.get("error", "오디오북 생성에 실패했습니다."))
+        return result
+
+    stages = [
+        PipelineStage("characters", characters_stage),
+        PipelineStage("structure", structure_stage),
+        PipelineStage("matching", matching_stage, depends_on=["characters"]),
+        PipelineStage("save_matching", save_matching_stage, depends_on=["matching", "structure"]),
+    ]
+    if generate_audio:
+        stages.append(PipelineStage("generate", generate_stage, depends_on=["save_matching"]))
+
+    results, timings = run_stage_graph(stages, propagate=(AdmissionRejectedError,))
+    success = all(timings[stage.name]["status"] == "completed" for stage in stages)
+
+    summary = {
+        "success": success,
+        "file_id": file_id,
+        "stages": timings,
+    }
+    if "characters" in results:
+        summary["character_count"] = len(results["characters"])
+    if "structure" in results:
+        summary["segment_count"] = len(results["structure"]) if isinstance(results["structure"], list) else None
+    if "matching" in results:
+        summary["character_voice_map"] = results["matching"]
+    if "generate" in results:
+        summary["generation"] = {
+            "successful_segments": results["generate"].get("successful_segments"),
+            "failed_segments": results["generate"].get("failed_segments"),
+        }
+    return summary
@@ -0,0 +1,316 @@
+import os
+import time
+import math
+import asyncio
+import random
+import logging
+import threading
+from collections import deque
+
+from services.metrics import EXTERNAL_API_THROTTLED_TOTAL
+from services.tracing import span
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 서버 워커 프로세스 수 (serve.py가 설정). 프로젝트 전체 할당량을 워커마다 나눠 가짐
+WEB_CONCURRENCY = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+
+# Gemini 할당량 설정 (환경 변수로 조정 가능, 워커가 여러 개면 워커당 몫으로 나눔)
+GEMINI_RPM_LIMIT = max(1, int(os.environ.get("GEMINI_RPM_LIMIT", 15)) // WEB_CONCURRENCY)          # 분당 요청 수
+GEMINI_TPM_LIMIT = max(1, int(os.environ.get("GEMINI_TPM_LIMIT", 1000000)) // WEB_CONCURRENCY)     # 분당 토큰 수 (입력 + 출력)
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", 5))
+GEMINI_BACKOFF_BASE = float(os.environ.get("GEMINI_BACKOFF_BASE", 1.0))   # 초
+GEMINI_BACKOFF_MAX = float(os.environ.get("GEMINI_BACKOFF_MAX", 60.0))    # 초
+
+# 할당량 윈도우 (1분)
+QUOTA_WINDOW_SECONDS = 60.0
+
+# 재시도 대상 HTTP 상태 코드 (할당량 초과, 일시적 서버 오류)
+RETRYABLE_STATUS_CODES = {429, 500, 503, 504}
+
+
+def estimate_tokens(text):
+    """
+    텍스트의 토큰 수를 오프라인으로 추정합니다.
+
+    한글/한자 등 비ASCII 문자는 문자당 약 1토큰, ASCII 문자는 4자당 약 1토큰으로 계산합니다.
+    실제 토크나이저보다 약간 크게 잡아 할당량을 넘지 않도록 합니다.
+
+    Args:
+        text (str): 토큰 수를 추정할 텍스트
+
+    Returns:
+        int: 추정 토큰 수
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    non_ascii_chars = len(text) - ascii_chars
+    return int(math.ceil(ascii_chars / 4.0 + non_ascii_chars * 1.0))
+
+
+def is_retryable_error(error):
+    """할당량 초과(429) 또는 일시적 서버 오류인지 확인합니다."""
+    code = getattr(error, "code", None)
+    if callable(code):  # grpc 오류는 code()가 메서드인 경우가 있음
+        try:
+            code = code()
+        except Exception:
+            code = None
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    return type(error).__name__ in ("ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded")
+
+
+class GeminiRateGovernor:
+    """
+    프로세스 전체에서 공유되는 Gemini 호출 허용 제어기.
+
+    최근 1분 동안의 요청 수(RPM)와 토큰 수(TPM)를 슬라이딩 윈도우로 추적하여,
+    예산이 허용될 때까지 호출을 대기시킵니다. 할당량 오류 시 지터가 적용된 지수 백오프로 재시도하며,
+    대기 시간(queue wait)과 모델 응답 시간(model latency)을 분리하여 집계합니다.
+    """
+
+    def __init__(self, rpm_limit=GEMINI_RPM_LIMIT, tpm_limit=GEMINI_TPM_LIMIT,
+                 max_retries=GEMINI_MAX_RETRIES, backoff_base=GEMINI_BACKOFF_BASE,
+                 backoff_max=GEMINI_BACKOFF_MAX, window_seconds=QUOTA_WINDOW_SECONDS):
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.window_seconds = window_seconds
+
+        self._condition = threading.Condition()
+        self._reservations = deque()  # [timestamp, tokens] 리스트 (사후 보정을 위해 가변 리스트 사용)
+        self._tokens_in_window = 0
+
+        self._stats = {
+            "calls": 0,
+            "failures": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "total_queue_wait_seconds": 0.0,
+            "total_model_latency_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+            "estimated_tokens": 0,
+            "actual_tokens": 0,
+        }
+
+    def _prune(self, now):
+        """윈도우를 벗어난 예약을 제거합니다. (lock 보유 상태에서 호출)"""
+        while self._reservations and now - self._reservations[0][0] >= self.window_seconds:
+            _, tokens = self._reservations.popleft()
+            self._tokens_in_window -= tokens
+
+    def _try_reserve(self, tokens):
+        """
+        예산이 있으면 예약하고 (예약, 0)을, 없으면 (None, 가장 오래된 예약이 만료될 때까지 남은 시간)을 반환합니다.
+        (lock 보유 상태에서 호출)
+        """
+        now = time.monotonic()
+        self._prune(now)
+
+        within_rpm = len(self._reservations) < self.rpm_limit
+        # 단일 요청이 TPM 한도보다 큰 경우, 윈도우가 빌 때 단독으로 허용
+        within_tpm = (self._tokens_in_window + tokens <= self.tpm_limit) or not self._reservations
+
+        if within_rpm and within_tpm:
+            reservation = [now, tokens]
+            self._reservations.append(reservation)
+            self._tokens_in_window += tokens
+            return reservation, 0.0
+        return None, self.window_seconds - (now - self._reservations[0][0])
+
+    def acquire(self, tokens):
+        """
+        RPM/TPM 예산 안에서 호출 1건을 예약합니다. 예산이 없으면 대기합니다.
+
+        Args:
+            tokens (int): 이번 호출에 필요한 추정 토큰 수 (입력 + 출력)
+
+        Returns:
+            tuple: (예약 객체, 대기한 시간(초))
+        """
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                reservation, wait_seconds = self._try_reserve(tokens)
+                if reservation is not None:
+                    return reservation, time.monotonic() - start
+                # 가장 오래된 예약이 만료될 때까지 대기
+                self._condition.wait(timeout=max(wait_seconds, 0.01))
+
+    async def aacquire(self, tokens):
+        """acquire의 async 버전. 이벤트 루프를 막지 않도록 asyncio.sleep으로 대기합니다."""
+        start = time.monotonic()
+        while True:
+            with self._condition:
+                reservation, wait_seconds = self._try_reserve(tokens)
+            if reservation is not None:
+                return reservation, time.monotonic() - start
+            # reconcile()로 예산이 먼저 풀릴 수 있으므로 최대 1초마다 다시 확인
+            await asyncio.sleep(min(max(wait_seconds, 0.01), 1.0))
+
+    def reconcile(self, reservation, actual_tokens):
+        """실제 사용 토큰 수로 예약을 보정합니다."""
+        if actual_tokens is None:
+            return
+        with self._condition:
+            delta = actual_tokens - reservation[1]
+            if reservation in self._reservations:
+                reservation[1] = actual_tokens
+                self._tokens_in_window += delta
+            self._stats["actual_tokens"] += actual_tokens
+            if delta < 0:
+                self._condition.notify_all()
+
+    def _backoff_seconds(self, attempt):
+        """지터가 적용된 지수 백오프 시간을 계산합니다. (full jitter)"""
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _new_call_stats(self, label, input_tokens, expected_output_tokens):
+        estimated_tokens = int(input_tokens or 0) + int(expected_output_tokens or 0)
+        with self._condition:
+            self._stats["estimated_tokens"] += estimated_tokens
+        return {
+            "label": label,
+            "estimated_tokens": estimated_tokens,
+            "actual_tokens": None,
+            "attempts": 0,
+            "queue_wait_seconds": 0.0,
+            "model_latency_seconds": 0.0,
+        }
+
+    def _handle_failure(self, error, attempt, call_stats):
+        """
+        실패한 시도를 기록하고 재시도 전 백오프 시간을 반환합니다.
+        재시도할 수 없으면 예외를 다시 발생시킵니다. (except 절 안에서 호출)
+        """
+        label = call_stats["label"]
+        throttled = getattr(error, "code", None) == 429 or type(error).__name__ in ("ResourceExhausted", "TooManyRequests")
+        if throttled:
+            EXTERNAL_API_THROTTLED_TOTAL.inc(api="gemini")
+        if not is_retryable_error(error) or attempt >= self.max_retries:
+            self._record(call_stats, failed=True)
+            raise
+        backoff = self._backoff_seconds(attempt)
+        with self._condition:
+            self._stats["retries"] += 1
+            if throttled:
+                self._stats["rate_limited"] += 1
+        logger.warning(f"[{label}] Gemini 호출 재시도 {attempt + 1}/{self.max_retries} ({backoff:.2f}초 후): {error}")
+        # 백오프 대기 시간은 모델 지연이 아닌 대기 시간으로 집계
+        call_stats["queue_wait_seconds"] += backoff
+        return backoff, throttled
+
+    def _handle_success(self, result, reservation, call_stats):
+        call_stats["actual_tokens"] = _usage_total_tokens(result)
+        self.reconcile(reservation, call_stats["actual_tokens"])
+        self._record(call_stats, failed=False)
+        logger.info(
+            f"[{call_stats['label']}] Gemini 호출 완료: 대기 {call_stats['queue_wait_seconds']:.2f}초, "
+            f"모델 지연 {call_stats['model_latency_seconds']:.2f}초, 시도 {call_stats['attempts']}회"
+        )
+        return result, call_stats
+
+    def call(self, func, input_tokens, expected_output_tokens=0, label="gemini"):
+        """
+        할당량 제어를 적용하여 func를 호출합니다.
+
+        Args:
+            func (callable): 인자 없이 호출되는 실제 API 호출 함수
+            input_tokens (int): 입력 토큰 수 (count_tokens 또는 추정치)
+            expected_output_tokens (int, optional): 예상 출력 토큰 수
+            label (str, optional): 로그에 사용할 호출 이름
+
+        Returns:
+            tuple: (func의 반환값, 호출 통계 dict)
+
+        Raises:
+            Exception: 재시도 횟수를 모두 소진했거나 재시도할 수 없는 오류인 경우 마지막 예외
+        """
+        call_stats = self._new_call_stats(label, input_tokens, expected_output_tokens)
+        for attempt in range(self.max_retries + 1):
+            with span(f"{label}.quota_wait", "wait", tokens=call_stats["estimated_tokens"]):
+                reservation, waited = self.acquire(call_stats["estimated_tokens"])
+            call_stats["queue_wait_seconds"] += waited
+            call_stats["attempts"] += 1
+
+            started = time.monotonic()
+            try:
+                with span(label, "gemini", attempt=attempt + 1):
+                    result = func()
+            except Exception as e:
+                call_stats["model_latency_seconds"] += time.monotonic() - started
+                backoff, throttled = self._handle_failure(e, attempt, call_stats)
+                with span(f"{label}.backoff", "sleep", attempt=attempt + 1, throttled=throttled):
+                    time.sleep(backoff)
+                continue
+
+            call_stats["model_latency_seconds"] += time.monotonic() - started
+            return self._handle_success(result, reservation, call_stats)
+
+    async def acall(self, coro_func, input_tokens, expected_output_tokens=0, label="gemini"):
+        """
+        call의 async 버전. coro_func는 인자 없이 호출하면 코루틴을 반환하는 함수입니다. (재시도마다 새로 호출)
+        할당량 대기와 백오프 모두 이벤트 루프를 막지 않습니다.
+        """
+        call_stats = self._new_call_stats(label, input_tokens, expected_output_tokens)
+        for attempt in range(self.max_retries + 1):
+            with span(f"{label}.quota_wait", "wait", tokens=call_stats["estimated_tokens"]):
+                reservation, waited = await self.aacquire(call_stats["estimated_tokens"])
+            call_stats["queue_wait_seconds"] += waited
+            call_stats["attempts"] += 1
+
+            started = time.monotonic()
+            try:
+                with span(label, "gemini", attempt=attempt + 1):
+                    result = await coro_func()
+            except Exception as e:
+                call_stats["model_latency_seconds"] += time.monotonic() - started
+                backoff, throttled = self._handle_failure(e, attempt, call_stats)
+                with span(f"{label}.backoff", "sleep", attempt=attempt + 1, throttled=throttled):
+                    await asyncio.sleep(backoff)
+                continue
+
+            call_stats["model_latency_seconds"] += time.monotonic() - started
+            return self._handle_success(result, reservation, call_stats)
+
+    def _record(self, call_stats, failed):
+        with self._condition:
+            self._stats["calls"] += 1
+            if failed:
+                self._stats["failures"] += 1
+            self._stats["total_queue_wait_seconds"] += call_stats["queue_wait_seconds"]
+            self._stats["total_model_latency_seconds"] += call_stats["model_latency_seconds"]
+            self._stats["max_queue_wait_seconds"] = max(self._stats["max_queue_wait_seconds"], call_stats["queue_wait_seconds"])
+
+    def get_stats(self):
+        """누적 통계와 현재 윈도우 사용량을 반환합니다."""
+        with self._condition:
+            self._prune(time.monotonic())
+            stats = dict(self._stats)
+            stats.update({
+                "rpm_limit": self.rpm_limit,
+                "tpm_limit": self.tpm_limit,
+                "requests_in_window": len(self._reservations),
+                "tokens_in_window": self._tokens_in_window,
+            })
+        calls = stats["calls"] or 1
+        stats["avg_queue_wait_seconds"] = stats["total_queue_wait_seconds"] / calls
+        stats["avg_model_latency_seconds"] = stats["total_model_latency_seconds"] / calls
+        return stats
+
+
+def _usage_total_tokens(response):
+    """Gemini 응답의 usage_metadata에서 실제 사용 토큰 수를 꺼냅니다. 없으면 None."""
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None) if usage is not None else None
+    return int(total) if total else None
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+gemini_rate_governor = GeminiRateGovernor()
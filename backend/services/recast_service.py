@@ -0,0 +1,152 @@
+import os
+import logging
+
+from services.text_storage_service import get_metadata
+from services.matching_service import (
+    load_matching_result, save_matching_result, load_structure_analysis, load_character_analysis
+)
+from services.matching_cache import matching_cache
+from services.voice_actor_catalog import voice_actor_catalog
+from services.elevenlabs_service import synthesize_segments, synthesis_scheduler, AUDIO_OUTPUT_FOLDER
+from services.chapter_service import chapter_audio_key, load_chapter_structure
+from services.segment_pack import segment_exists
+from services.metrics import JOBS_IN_PROGRESS
+from services.tracing import traced_job
+from services.job_store import tracked_job
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+
+def _segment_scopes(file_id):
+    """
+    오디오가 저장되는 단위(책 전체 / 챕터별)마다 (출력 폴더 키, 세그먼트 리스트)를 반환합니다.
+    """
+    scopes = []
+    story_items = load_structure_analysis(file_id)
+    if isinstance(story_items, dict):
+        story_items = story_items.get("segments", [])
+    if story_items:
+        scopes.append((file_id, story_items))
+    for chapter in (get_metadata(file_id) or {}).get("chapters", []):
+        segments = load_chapter_structure(file_id, chapter["index"])
+        if segments:
+            scopes.append((chapter_audio_key(file_id, chapter["index"]), segments))
+    return scopes
+
+
+def _audio_exists(audio_key, order):
+    try:
+        return segment_exists(os.path.join(AUDIO_OUTPUT_FOLDER, audio_key), order)
+    except (TypeError, ValueError):
+        return False
+
+
+def plan_recast(file_id, voice_changes):
+    """
+    성우 변경으로 다시 생성해야 하는 세그먼트를 계산합니다.
+    세그먼트에 직접 지정된 voice_id가 있으면 화자의 배정과 무관하므로 대상에서 제외합니다.
+
+    Args:
+        file_id (str): 소설 파일 ID
+        voice_changes (dict): 등장인물 이름 → 새 voice_id
+
+    Returns:
+        dict: {"changes": 실제로 바뀌는 항목, "character_voice_map": 변경 후 매핑, "scopes": [(출력 폴더 키, 대상 세그먼트)],
+               "total_characters": 생성된 전체 세그먼트의 글자 수, "recast_characters": 다시 생성할 글자 수}
+
+    Raises:
+        ValueError: 매칭 결과가 없는 경우
+    """
+    matching = load_matching_result(file_id)
+    if not matching.get("success"):
+        raise ValueError(matching.get("error", "매칭 결과를 찾을 수 없습니다."))
+    matching_data = matching["data"]
+    current_map = matching_data.get("character_voice_map", {})
+
+    changes = {name: voice_id for name, voice_id in voice_changes.items() if voice_id and current_map.get(name) != voice_id}
+    new_map = {**current_map, **changes}
+
+    scopes, total_characters, recast_characters = [], 0, 0
+    for audio_key, segments in _segment_scopes(file_id):
+        affected = []
+        for segment in segments:
+            if not _audio_exists(audio_key, segment.get("order")):
+                continue
+            text_length = len(segment.get("text") or "")
+            total_characters += text_length
+            if segment.get("speaker") in changes and not segment.get("voice_id"):
+                affected.append(segment)
+                recast_characters += text_length
+        if affected:
+            scopes.append((audio_key, affected))
+
+    return {
+        "changes": changes,
+        "character_voice_map": new_map,
+        "matching_data": matching_data,
+        "scopes": scopes,
+        "total_characters": total_characters,
+        "recast_characters": recast_characters,
+    }
+
+
+@tracked_job("recast")
+@JOBS_IN_PROGRESS.track_inprogress(kind="recast")
+@traced_job("recast")
+def recast_characters(file_id, voice_changes):
+    """
+    등장인물의 성우를 바꾸고, 그 인물의 대사만 다시 생성합니다. 다른 오디오 파일은 건드리지 않습니다.
+
+    Args:
+        file_id (str): 소설 파일 ID
+        voice_changes (dict): 등장인물 이름 → 새 voice_id
+
+    Returns:
+        tuple: (결과 dict, HTTP 상태 코드)
+
+    Raises:
+        AdmissionRejectedError: 합성 대기량이 상한을 넘은 경우 (매칭 결과를 바꾸지 않음)
+    """
+    try:
+        plan = plan_recast(file_id, voice_changes)
+    except ValueError as e:
+        return {"error": str(e)}, 404
+
+    changes = plan["changes"]
+    if not changes:
+        return {"success": True, "message": "변경된 성우가 없습니다.", "file_id": file_id, "regenerated_segments": 0}, 200
+
+    # 입장 제어를 매칭 결과 저장 전에 통과해야 함 (거부된 뒤 다시 요청해도 변경 내용이 남아 있도록)
+    with synthesis_scheduler.admit(sum(len(segments) for _, segments in plan["scopes"])):
+        # 1. 매칭 결과 갱신 (이후 전체/세그먼트 생성도 새 매핑을 사용)
+        matching_data = {**plan["matching_data"], "character_voice_map": plan["character_voice_map"]}
+        save_result = save_matching_result(file_id, matching_data)
+        if not save_result.get("success"):
+            return {"error": save_result.get("error")}, 500
+
+        # 사용자가 고른 배정을 매칭 캐시에도 반영 (같은 인물을 다시 매칭할 때 유지)
+        characters = [c for c in load_character_analysis(file_id) if c.get("name") in changes]
+        if characters:
+            matching_cache.store(characters, changes, voice_actor_catalog.version, include_narrator=False)
+
+        # 2. 영향받는 세그먼트만 동시 합성 경로로 다시 생성
+        regenerated, failed = [], []
+        for audio_key, segments in plan["scopes"]:
+            results, failures = synthesize_segments(audio_key, segments, plan["character_voice_map"], write_info=False)
+            regenerated.extend({"audio_key": audio_key, **r} for r in results)
+            failed.extend({"audio_key": audio_key, **f} for f in failures)
+
+    saved_characters = plan["total_characters"] - plan["recast_characters"]
+    logger.info(f"성우 변경 완료: {file_id} {changes} - {len(regenerated)}개 재생성, API 글자 수 {saved_characters}자 절약")
+    return {
+        "success": not failed,
+        "message": f"{len(changes)}명의 성우를 변경하고 {len(regenerated)}개 세그먼트를 다시 생성했습니다.",
+        "file_id": file_id,
+        "changes": changes,
+        "regenerated_segments": len(regenerated),
+        "failed_segments": len(failed),
+        "failed_details": failed,
+        "characters_regenerated": plan["recast_characters"],
+        "characters_saved": saved_characters,
+    }, 200
@@ -0,0 +1,288 @@
+import io
+import os
+import sys
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import hmac
+import logging
+import threading
+from collections import Counter, deque
+
+from flask import request, g
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 무작위로 프로파일링할 요청 비율 (0이면 헤더로 요청한 경우에만)
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+# 기본 프로파일링 방식: "sample" (벽시계 스택 샘플링, 플레임 그래프용) / "cprofile" (함수별 호출 통계)
+PROFILE_MODE = os.environ.get("PROFILE_MODE", "sample")
+# 스택 샘플링 간격 (초)
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.005))
+# 집계하는 서로 다른 스택의 최대 개수 (초과분은 버리고 개수만 기록)
+PROFILE_MAX_STACKS = int(os.environ.get("PROFILE_MAX_STACKS", 20000))
+PROFILE_HISTORY = int(os.environ.get("PROFILE_HISTORY", 100))
+# 관리자 토큰. 없으면 관리자 요청을 모두 거부 (fail closed)
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+# 토큰 없이 로컬(127.0.0.1 / ::1) 요청을 관리자 요청으로 취급할지 여부.
+# 같은 호스트의 리버스 프록시 뒤에서는 모든 요청이 로컬 주소로 들어오므로, 프록시 없이 개발할 때만 켬
+ADMIN_ALLOW_LOCAL = os.environ.get("ADMIN_ALLOW_LOCAL", "false").lower() in ("1", "true", "yes")
+
+PROFILE_HEADER = "X-Profile"
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+PROFILE_MODES = ("sample", "cprofile")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LIBRARY_PREFIXES = tuple(sorted({os.path.dirname(os.__file__), sys.prefix, sys.base_prefix}, key=len, reverse=True))
+
+
+def is_admin_request(req):
+    """관리자 엔드포인트 / 프로파일링 헤더를 허용할 요청인지 확인합니다."""
+    if ADMIN_TOKEN:
+        return hmac.compare_digest(req.headers.get(ADMIN_TOKEN_HEADER, ""), ADMIN_TOKEN)
+    return ADMIN_ALLOW_LOCAL and req.remote_addr in ("127.0.0.1", "::1")
+
+
+def _frame_label(code):
+    """플레임 그래프에 표시할 프레임 이름 (함수 (상대 경로:줄))"""
+    filename = code.co_filename
+    if filename.startswith(BACKEND_DIR):
+        filename = os.path.relpath(filename, BACKEND_DIR)
+    else:
+        for prefix in _LIBRARY_PREFIXES:
+            if filename.startswith(prefix):
+                filename = os.path.relpath(filename, prefix)
+                break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame):
+    """
+    스레드의 현재 프레임을 바깥→안쪽 순서의 "a;b;c" 문자열로 만듭니다.
+    서버 스레드의 공통 프레임(socketserver / werkzeug)은 Flask wsgi_app부터 잘라 냅니다.
+    """
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(_frame_label(code))
+        if code.co_name == "wsgi_app":
+            break
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class _StackSampler:
+    """
+    프로파일링 중인 요청 스레드의 스택을 일정 간격으로 기록하는 백그라운드 스레드.
+    대상 요청이 없으면 대기 상태로 멈추므로 프로파일링을 하지 않을 때는 비용이 없습니다.
+    """
+
+    def __init__(self, profiler):
+        self._profiler = profiler
+        self._targets = {}  # 스레드 ident -> 요청 기록
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def add(self, record):
+        with self._condition:
+            self._targets[threading.get_ident()] = record
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def remove(self):
+        with self._condition:
+            self._targets.pop(threading.get_ident(), None)
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._targets:
+                    self._condition.wait()
+                targets = dict(self._targets)
+            frames = sys._current_frames()
+            for ident, record in targets.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    record["samples"] += 1
+                    self._profiler._add_stack(record["route"], _collapse(frame))
+            del frames
+            time.sleep(self._profiler.interval)
+
+
+class RequestProfiler:
+    """
+    요청 단위 프로파일러 (Flask before/after_request 훅).
+
+    - 헤더 "X-Profile: 1" (또는 "sample" / "cprofile")를 보낸 관리자 요청, 또는 sample_rate 비율의 요청만 프로파일링
+    - 스택 샘플링 결과는 라우트별로 접힌 스택(collapsed stacks)으로 집계 → flamegraph.pl / speedscope에서 바로 사용
+    - cProfile 결과는 라우트별 pstats로 누적
+    - 대상이 아닌 요청에는 헤더 확인과 난수 비교만 추가됩니다.
+    """
+
+    def __init__(self, sample_rate=PROFILE_SAMPLE_RATE, mode=PROFILE_MODE, interval=PROFILE_INTERVAL,
+                 max_stacks=PROFILE_MAX_STACKS, history=PROFILE_HISTORY):
+        self.sample_rate = sample_rate
+        self.mode = mode if mode in PROFILE_MODES else "sample"
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self._stacks = Counter()  # "라우트;프레임;..." -> 샘플 수
+        self._dropped_samples = 0
+        self._routes = {}
+        self._pstats = {}
+        self._recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._sampler = _StackSampler(self)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.after_request(self._after_request)
+
+    def configure(self, sample_rate=None, mode=None, interval=None):
+        """실행 중에 프로파일링 비율 / 방식 / 샘플링 간격을 바꿉니다."""
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"지원하지 않는 프로파일링 방식입니다: {mode} (가능: {', '.join(PROFILE_MODES)})")
+        if sample_rate is not None:
+            self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        if mode is not None:
+            self.mode = mode
+        if interval is not None:
+            self.interval = max(0.001, float(interval))
+        return self.get_config()
+
+    def get_config(self):
+        return {"sample_rate": self.sample_rate, "mode": self.mode, "interval_seconds": self.interval}
+
+    def _requested_mode(self, req):
+        header = req.headers.get(PROFILE_HEADER)
+        if header is not None:
+            if header.lower() in ("0", "false", "off") or not is_admin_request(req):
+                return None
+            return header.lower() if header.lower() in PROFILE_MODES else self.mode
+        if self.sample_rate and random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def _before_request(self):
+        mode = self._requested_mode(request)
+        if mode is None:
+            return None
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        record = {
+            "id": uuid.uuid4().hex[:12],
+            "route": f"{request.method} {rule}",
+            "path": request.path,
+            "mode": mode,
+            "samples": 0,
+            "started": time.perf_counter(),
+        }
+        if mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                record["profile"] = profile
+            except ValueError:
+                # 다른 프로파일러가 이미 동작 중인 경우 (Python 3.12+ 등) 스택 샘플링으로 대체
+                record["mode"] = "sample"
+        if record["mode"] == "sample":
+            self._sampler.add(record)
+        g._request_profile = record
+        return None
+
+    def _after_request(self, response):
+        record = g.get("_request_profile")
+        if record is not None:
+            response.headers["X-Profile-Id"] = record["id"]
+        return response
+
+    def _teardown_request(self, exc):
+        record = g.pop("_request_profile", None)
+        if record is None:
+            return
+        duration = time.perf_counter() - record.pop("started")
+        profile = record.pop("profile", None)
+        if profile is not None:
+            profile.disable()
+        else:
+            self._sampler.remove()
+
+        summary = dict(record, duration_ms=round(duration * 1000, 2), error=str(exc) if exc else None)
+        with self._lock:
+            route = self._routes.setdefault(record["route"], {"requests": 0, "total_ms": 0.0, "max_ms": 0.0, "samples": 0})
+            route["requests"] += 1
+            route["total_ms"] += summary["duration_ms"]
+            route["max_ms"] = max(route["max_ms"], summary["duration_ms"])
+            route["samples"] += record["samples"]
+            if profile is not None:
+                stats = self._pstats.get(record["route"])
+                if stats is None:
+                    self._pstats[record["route"]] = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            self._recent.append(summary)
+
+    def _add_stack(self, route, stack):
+        key = f"{route};{stack}"
+        with self._lock:
+            if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                self._dropped_samples += 1
+                return
+            self._stacks[key] += 1
+
+    def get_summary(self):
+        """설정, 라우트별 집계, 최근 프로파일링한 요청 목록"""
+        with self._lock:
+            routes = {
+                name: dict(info, total_ms=round(info["total_ms"], 2), avg_ms=round(info["total_ms"] / info["requests"], 2))
+                for name, info in self._routes.items()
+            }
+            recent = list(self._recent)
+            distinct_stacks = len(self._stacks)
+            dropped = self._dropped_samples
+        return {
+            "config": self.get_config(),
+            "routes": dict(sorted(routes.items(), key=lambda item: item[1]["total_ms"], reverse=True)),
+            "recent": recent[::-1],
+            "distinct_stacks": distinct_stacks,
+            "dropped_samples": dropped,
+        }
+
+    def collapsed_stacks(self, route=None):
+        """
+        접힌 스택 텍스트 ("라우트;프레임;... 샘플수" 한 줄씩).
+        flamegraph.pl, speedscope, inferno 등에 그대로 넣을 수 있습니다.
+        """
+        with self._lock:
+            items = list(self._stacks.items())
+        prefix = f"{route};" if route else None
+        lines = [f"{stack} {count}" for stack, count in sorted(items) if prefix is None or stack.startswith(prefix)]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def pstats_report(self, route=None, sort="cumulative", limit=50):
+        """cProfile로 누적한 라우트별 함수 통계를 텍스트로 반환합니다."""
+        with self._lock:
+            routes = {name: stats for name, stats in self._pstats.items() if route is None or name == route}
+            output = io.StringIO()
+            for name, stats in sorted(routes.items()):
+                output.write(f"=== {name} ===\n")
+                stats.stream = output
+                stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._dropped_samples = 0
+            self._routes.clear()
+            self._pstats.clear()
+            self._recent.clear()
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+request_profiler = RequestProfiler()
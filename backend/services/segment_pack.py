@@ -0,0 +1,262 @@
+import os
+import re
+import mmap
+import time
+import struct
+import logging
+import threading
+
+from services.file_lock import InterProcessLock
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 팩 인덱스 형식
+# 헤더: 매직, 버전, 세그먼트 수, 데이터 파일 이름 길이 + 데이터 파일 이름(최대 64바이트)
+# 레코드(고정 폭 16바이트): 세그먼트 순서, 데이터 파일 내 오프셋, 길이 - 순서 오름차순
+PACK_MAGIC = b"SGPK"
+PACK_VERSION = 1
+PACK_HEADER = struct.Struct("<4sII64s")
+PACK_RECORD = struct.Struct("<IQI")
+PACK_INDEX_FILE = "segments.pidx"
+PACK_DATA_PATTERN = re.compile(r"^segments\.(\d+)\.pack$")
+
+# 생성 완료 후 자동으로 팩으로 압축할지 여부 (선택적 형식)
+AUDIO_PACK_SEGMENTS = os.environ.get("AUDIO_PACK_SEGMENTS", "false").lower() in ("1", "true", "yes")
+
+SEGMENT_FILE_PATTERN = re.compile(r"^(\d+)\.mp3$")
+
+# 폴더마다 압축을 한 번에 하나만 실행하도록 잡는 잠금 파일 (여러 워커 프로세스 사이에서도)
+PACK_LOCK_FILE = "segments.lock"
+
+# HTTP 응답으로 팩 세그먼트를 스트리밍할 때 한 번에 복사하는 크기
+PACK_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def segment_filename(order):
+    return f"{int(order):03d}.mp3"
+
+
+class PackedSegmentReader:
+    """
+    한 책(또는 챕터) 폴더의 팩을 메모리 맵으로 열어 세그먼트를 복사 없이 잘라 제공하는 리더.
+    인덱스는 세그먼트 순서 → (오프셋, 길이) dict로 한 번만 읽습니다.
+    """
+
+    def __init__(self, folder):
+        index_path = os.path.join(folder, PACK_INDEX_FILE)
+        with open(index_path, 'rb') as f:
+            raw = f.read()
+        magic, version, count, data_name = PACK_HEADER.unpack_from(raw, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"지원하지 않는 팩 인덱스입니다: {index_path}")
+        self.data_name = data_name.rstrip(b"\0").decode("ascii")
+        self.entries = {}
+        for i in range(count):
+            order, offset, length = PACK_RECORD.unpack_from(raw, PACK_HEADER.size + i * PACK_RECORD.size)
+            self.entries[order] = (offset, length)
+
+        self._file = open(os.path.join(folder, self.data_name), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.signature = _index_signature(folder)
+
+    def read(self, order, start=0, stop=None):
+        """세그먼트(또는 그 일부 바이트 범위)를 memoryview로 반환합니다. 없으면 None."""
+        entry = self.entries.get(int(order))
+        if entry is None:
+            return None
+        offset, length = entry
+        stop = length if stop is None else min(stop, length)
+        return memoryview(self._data)[offset + start:offset + stop]
+
+    def iter_chunks(self, order, start=0, stop=None, chunk_size=PACK_STREAM_CHUNK_SIZE):
+        """
+        세그먼트(또는 그 일부 바이트 범위)를 chunk_size 크기의 bytes로 나눠 내보냅니다.
+        WSGI 응답 본문은 bytes여야 하므로(PEP 3333) memoryview 대신 이것을 사용합니다.
+        """
+        view = self.read(order, start, stop)
+        if view is None:
+            return
+        try:
+            for pos in range(0, len(view), chunk_size):
+                yield bytes(view[pos:pos + chunk_size])
+        finally:
+            view.release()
+
+    def length(self, order):
+        entry = self.entries.get(int(order))
+        return entry[1] if entry else None
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            try:
+                self._data.close()
+            except BufferError:
+                # 아직 응답 중인 memoryview가 있으면 가비지 컬렉션 시 정리됨
+                pass
+        self._file.close()
+
+
+def _index_signature(folder):
+    try:
+        st = os.stat(os.path.join(folder, PACK_INDEX_FILE))
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+_compact_locks = {}
+
+
+def get_pack_reader(folder):
+    """폴더의 팩 리더를 반환합니다. 팩이 없으면 None. 팩이 다시 압축되면 새로 엽니다."""
+    signature = _index_signature(folder)
+    with _readers_lock:
+        reader = _readers.get(folder)
+        if signature is None:
+            if reader:
+                reader.close()
+                del _readers[folder]
+            return None
+        if reader is None or reader.signature != signature:
+            if reader:
+                reader.close()
+            reader = PackedSegmentReader(folder)
+            _readers[folder] = reader
+        return reader
+
+
+def _evict_reader(folder):
+    """캐시된 리더를 닫고 제거합니다 (Windows에서는 메모리 맵이 열린 파일을 지울 수 없음)."""
+    with _readers_lock:
+        reader = _readers.pop(folder, None)
+    if reader:
+        reader.close()
+
+
+def _compact_lock(folder):
+    with _readers_lock:
+        lock = _compact_locks.get(folder)
+        if lock is None:
+            lock = _compact_locks[folder] = InterProcessLock(os.path.join(folder, PACK_LOCK_FILE))
+        return lock
+
+
+def list_segment_files(folder):
+    """
+    폴더의 세그먼트 파일 이름 목록(NNN.mp3, 오름차순)을 반환합니다. 팩에 들어 있는 세그먼트와 개별 파일을 합칩니다.
+    """
+    orders = set()
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            match = SEGMENT_FILE_PATTERN.match(name)
+            if match:
+                orders.add(int(match.group(1)))
+    reader = get_pack_reader(folder)
+    if reader:
+        orders.update(reader.entries.keys())
+    return [segment_filename(order) for order in sorted(orders)]
+
+
+def segment_exists(folder, order):
+    if os.path.exists(os.path.join(folder, segment_filename(order))):
+        return True
+    reader = get_pack_reader(folder)
+    return bool(reader and int(order) in reader.entries)
+
+
+def compact_folder(folder):
+    """
+    폴더의 개별 세그먼트 파일을 하나의 데이터 파일 + 고정 폭 인덱스로 압축합니다.
+    개별 파일이 팩보다 우선하므로(재생성된 세그먼트), 기존 팩 내용에 개별 파일을 덮어써서 새 팩을 만듭니다.
+
+    같은 폴더의 압축은 프로세스 사이에서도 한 번에 하나만 실행됩니다 (겹치면 서로의 데이터 파일을 지울 수 있음).
+
+    Returns:
+        dict: 팩에 들어간 세그먼트 수, 제거한 개별 파일 수, 팩 크기
+    """
+    with _compact_lock(folder):
+        return _compact_folder_locked(folder)
+
+
+def _compact_folder_locked(folder):
+    loose = {}
+    for name in os.listdir(folder):
+        match = SEGMENT_FILE_PATTERN.match(name)
+        if match:
+            path = os.path.join(folder, name)
+            st = os.stat(path)
+            loose[int(match.group(1))] = (path, (st.st_ino, st.st_mtime_ns))
+    if not loose:
+        return {"segments": 0, "removed_files": 0, "pack_bytes": 0}
+
+    old_reader = get_pack_reader(folder)
+    orders = sorted(set(loose) | set(old_reader.entries if old_reader else ()))
+    generation = time.time_ns()
+    data_name = f"segments.{generation}.pack"
+    data_path = os.path.join(folder, data_name)
+    records = []
+    offset = 0
+    tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(data_path + tmp_suffix, 'wb') as out:
+        for order in orders:
+            if order in loose:
+                with open(loose[order][0], 'rb') as f:
+                    data = f.read()
+            else:
+                data = bytes(old_reader.read(order))
+            out.write(data)
+            records.append(PACK_RECORD.pack(order, offset, len(data)))
+            offset += len(data)
+    os.replace(data_path + tmp_suffix, data_path)
+
+    # 인덱스를 마지막에 교체 (인덱스가 가리키는 데이터 파일은 항상 완전함)
+    index_path = os.path.join(folder, PACK_INDEX_FILE)
+    with open(index_path + tmp_suffix, 'wb') as f:
+        f.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, len(records), data_name.encode("ascii")))
+        f.write(b"".join(records))
+    os.replace(index_path + tmp_suffix, index_path)
+
+    # 이전 데이터 파일 정리. 이 프로세스의 리더는 먼저 닫고, 다른 프로세스가 아직 메모리 맵으로 열고 있어
+    # 지울 수 없는 파일(Windows)은 남겨 두었다가 다음 압축 때 다시 정리
+    _evict_reader(folder)
+    for name in os.listdir(folder):
+        match = PACK_DATA_PATTERN.match(name)
+        if match and name != data_name:
+            try:
+                os.remove(os.path.join(folder, name))
+            except FileNotFoundError:
+                pass
+            except PermissionError as e:
+                logger.warning(f"사용 중인 이전 팩 데이터 파일은 다음 압축 때 정리합니다: {e}")
+
+    # 압축하는 동안 바뀌지 않은 개별 파일만 제거 (그 사이 재생성된 세그먼트는 유지)
+    removed = 0
+    for order, (path, signature) in loose.items():
+        try:
+            st = os.stat(path)
+            if (st.st_ino, st.st_mtime_ns) == signature:
+                os.remove(path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+
+    summary = {"segments": len(records), "removed_files": removed, "pack_bytes": offset}
+    logger.info(f"세그먼트 팩 압축: {folder} {summary}")
+    return summary
+
+
+def compact_all(audio_root):
+    """audio_root 아래 모든 책/챕터 폴더를 압축합니다."""
+    results = {}
+    for dirpath, _, filenames in os.walk(audio_root):
+        if any(SEGMENT_FILE_PATTERN.match(name) for name in filenames):
+            try:
+                results[os.path.relpath(dirpath, audio_root)] = compact_folder(dirpath)
+            except Exception as e:
+                logger.error(f"세그먼트 팩 압축 실패 ({dirpath}): {e}")
+                results[os.path.relpath(dirpath, audio_root)] = {"error": str(e)}
+    return results
@@ -0,0 +1,295 @@
+import os
+import time
+import heapq
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from services.metrics import SCHEDULER_QUEUE_WAIT_SECONDS, SCHEDULER_REJECTED_TOTAL, SCHEDULER_WAITING
+from services.rate_governor import WEB_CONCURRENCY
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+
+# 우선순위 등급별 가중치. 슬롯이 빌 때 등급/사용자(flow)마다 가중치에 비례해 나눠 줌 (bulk도 굶지 않음)
+PRIORITY_WEIGHTS = {
+    PRIORITY_INTERACTIVE: float(os.environ.get("SCHED_INTERACTIVE_WEIGHT", 8)),
+    PRIORITY_BULK: float(os.environ.get("SCHED_BULK_WEIGHT", 1)),
+}
+# 우선순위를 지정하지 않은 작업은 세그먼트 수가 이 값 이하면 interactive(미리 듣기, 세그먼트 재생성 등), 넘으면 bulk
+SCHED_PREVIEW_SEGMENTS = int(os.environ.get("SCHED_PREVIEW_SEGMENTS", 100))
+# 입장 제어: 등급별로 받아 둔(아직 합성하지 않은) 세그먼트 수 상한 / 사용자당 동시 합성 작업 수 상한 (워커 수로 나눈 워커당 몫)
+SCHED_MAX_PENDING_SEGMENTS = {
+    PRIORITY_INTERACTIVE: max(1, int(os.environ.get("SCHED_MAX_PENDING_INTERACTIVE", 2000)) // WEB_CONCURRENCY),
+    PRIORITY_BULK: max(1, int(os.environ.get("SCHED_MAX_PENDING_BULK", 50000)) // WEB_CONCURRENCY),
+}
+SCHED_MAX_JOBS_PER_TENANT = int(os.environ.get("SCHED_MAX_JOBS_PER_TENANT", 4))
+# 입장 거부 시 Retry-After (초)
+SCHED_RETRY_AFTER_SECONDS = int(os.environ.get("SCHED_RETRY_AFTER_SECONDS", 30))
+
+DEFAULT_TENANT = "anonymous"
+
+
+class AdmissionRejectedError(Exception):
+    """대기 중인 합성량이 상한을 넘어 새 합성 작업을 받지 않는 경우 (잠시 후 다시 시도)"""
+
+    def __init__(self, message, priority, retry_after=SCHED_RETRY_AFTER_SECONDS):
+        self.priority = priority
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+class ScheduleContext:
+    """현재 작업의 사용자(tenant)와 우선순위 등급. 우선순위가 None이면 세그먼트 수로 정합니다."""
+
+    __slots__ = ("tenant", "priority", "ticket")
+
+    def __init__(self, tenant, priority=None, ticket=None):
+        self.tenant = tenant
+        self.priority = priority
+        self.ticket = ticket
+
+
+_current_schedule = contextvars.ContextVar("current_schedule", default=None)
+
+
+def normalize_priority(priority):
+    """요청 값(헤더/본문)을 등급 이름으로 바꿉니다. 알 수 없는 값이면 None"""
+    if not priority:
+        return None
+    priority = str(priority).strip().lower()
+    if priority in ("interactive", "preview", "high"):
+        return PRIORITY_INTERACTIVE
+    if priority in ("bulk", "batch", "low"):
+        return PRIORITY_BULK
+    return None
+
+
+def current_schedule():
+    return _current_schedule.get() or ScheduleContext(DEFAULT_TENANT)
+
+
+def bind_schedule(tenant, priority=None):
+    """요청 처리 스레드의 사용자 / 우선순위(헤더 값 그대로)를 지정하고 reset_schedule()에 넘길 토큰을 반환합니다."""
+    return _current_schedule.set(ScheduleContext(tenant or DEFAULT_TENANT, normalize_priority(priority)))
+
+
+def reset_schedule(token):
+    _current_schedule.reset(token)
+
+
+@contextmanager
+def scheduling(tenant=None, priority=None):
+    """
+    이 블록 안에서 실행하는 합성의 사용자 / 우선순위를 지정합니다. (지정하지 않은 값은 바깥 컨텍스트 값을 따름)
+    작업 스레드(bind_trace), 공유 이벤트 루프(async_runtime), 작업 큐 항목으로도 이어집니다.
+    """
+    outer = current_schedule()
+    token = _current_schedule.set(ScheduleContext(tenant or outer.tenant, priority or outer.priority, outer.ticket))
+    try:
+        yield _current_schedule.get()
+    finally:
+        _current_schedule.reset(token)
+
+
+class AdmissionTicket:
+    """입장한 합성 작업 하나. 세그먼트가 끝날 때마다 done()으로 대기량을 줄이고, 작업이 끝나면 남은 양을 반납합니다."""
+
+    def __init__(self, scheduler, tenant, priority, segments):
+        self.scheduler = scheduler
+        self.tenant = tenant
+        self.priority = priority
+        self.remaining = segments
+
+    def extend(self, count):
+        """바깥 작업 안에서 합성할 세그먼트가 더 생긴 경우 (챕터 파이프라인의 챕터별 합성 등)"""
+        self.scheduler._adjust_pending(self, count)
+
+    def done(self, count=1):
+        self.scheduler._adjust_pending(self, -count)
+
+
+class FairScheduler:
+    """
+    ElevenLabs 합성 슬롯(ELEVENLABS_MAX_CONCURRENCY개)을 나눠 주는 가중 공정 큐 (start-time fair queuing).
+
+    - flow = (우선순위 등급, 사용자). 요청마다 가상 시작 시각 max(V, flow의 마지막 종료 시각)을 붙이고,
+      flow의 종료 시각을 비용(글자 수) / 가중치만큼 늘립니다. 슬롯이 비면 가상 시작 시각이 가장 이른 요청부터 실행합니다.
+      5,000 세그먼트 책을 만드는 사용자가 있어도 다른 사용자의 미리 듣기는 자기 몫만큼 바로 슬롯을 받습니다.
+    - 입장 제어(admit): 등급별 대기 세그먼트 수와 사용자당 동시 작업 수가 상한을 넘으면 AdmissionRejectedError
+    - 대기 시간은 등급별로 scheduler_queue_wait_seconds 지표와 get_stats()에 기록합니다.
+
+    슬롯 배정은 공유 이벤트 루프 안에서만 일어나며, fork 이후 자식 프로세스에서는 상태를 새로 만듭니다.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset_slots()
+        self._pending = {priority: 0 for priority in PRIORITY_WEIGHTS}
+        self._tenant_jobs = {}
+        self._stats = {priority: {"dispatched": 0, "rejected": 0, "total_wait_seconds": 0.0, "max_wait_seconds": 0.0}
+                       for priority in PRIORITY_WEIGHTS}
+
+    def _reset_slots(self):
+        self._pid = os.getpid()
+        self._in_use = 0
+        self._heap = []
+        self._seq = 0
+        self._virtual_time = 0.0
+        self._flow_finish = {}
+        self._waiting = {priority: 0 for priority in PRIORITY_WEIGHTS}
+
+    # --- 입장 제어 ---
+
+    def resolve_priority(self, segment_count, default=None):
+        """요청에서 지정한 우선순위 > 작업 종류의 기본값 > 세그먼트 수 순서로 등급을 정합니다."""
+        priority = current_schedule().priority or default
+        if priority:
+            return priority
+        return PRIORITY_INTERACTIVE if segment_count <= SCHED_PREVIEW_SEGMENTS else PRIORITY_BULK
+
+    @contextmanager
+    def admit(self, segment_count, priority=None):
+        """
+        합성 작업 하나를 입장시키고, 블록 안의 합성에 작업의 우선순위 등급을 적용합니다.
+        이미 입장한 작업 안에서 호출되면(성우 변경 / 챕터 파이프라인 안의 synthesize_segments 등)
+        바깥 작업의 입장권에 세그먼트 수만 더해서 씁니다.
+
+        Args:
+            segment_count (int): 합성할 세그먼트 수 (모르면 0. 안쪽 호출이 나중에 더함)
+            priority (str, optional): 요청에서 우선순위를 지정하지 않았을 때 쓸 등급 (없으면 세그먼트 수로 결정)
+
+        Raises:
+            AdmissionRejectedError: 등급의 대기 세그먼트 수나 사용자의 동시 작업 수가 상한을 넘는 경우
+        """
+        schedule = current_schedule()
+        if schedule.ticket is not None:
+            schedule.ticket.extend(segment_count)
+            yield schedule.ticket
+            return
+
+        priority = self.resolve_priority(segment_count, priority)
+        tenant = schedule.tenant
+        with self._lock:
+            reason = None
+            if self._tenant_jobs.get(tenant, 0) >= SCHED_MAX_JOBS_PER_TENANT:
+                reason = "tenant_jobs"
+                message = f"사용자 '{tenant}'의 합성 작업이 이미 {SCHED_MAX_JOBS_PER_TENANT}개 진행 중입니다."
+            # 대기열이 비어 있으면 상한보다 큰 책도 받음 (영원히 거부되지 않도록)
+            elif self._pending[priority] and self._pending[priority] + segment_count > SCHED_MAX_PENDING_SEGMENTS[priority]:
+                reason = "pending_segments"
+                message = (f"{priority} 대기열이 가득 찼습니다. (대기 {self._pending[priority]}개 + 요청 {segment_count}개 "
+                           f"> 상한 {SCHED_MAX_PENDING_SEGMENTS[priority]}개)")
+            if reason:
+                self._stats[priority]["rejected"] += 1
+            else:
+                self._pending[priority] += segment_count
+                self._tenant_jobs[tenant] = self._tenant_jobs.get(tenant, 0) + 1
+        if reason:
+            SCHEDULER_REJECTED_TOTAL.inc(priority=priority, reason=reason)
+            logger.warning(f"합성 작업 입장 거부: {message}")
+            raise AdmissionRejectedError(message, priority)
+
+        ticket = AdmissionTicket(self, tenant, priority, segment_count)
+        token = _current_schedule.set(ScheduleContext(tenant, priority, ticket))
+        try:
+            yield ticket
+        finally:
+            _current_schedule.reset(token)
+            ticket.done(ticket.remaining)
+            with self._lock:
+                self._tenant_jobs[tenant] -= 1
+                if not self._tenant_jobs[tenant]:
+                    del self._tenant_jobs[tenant]
+
+    def _adjust_pending(self, ticket, count):
+        # 챕터 파이프라인은 여러 스레드가 같은 입장권을 쓰므로 잠금 안에서 함께 갱신
+        with self._lock:
+            count = max(count, -ticket.remaining)
+            ticket.remaining += count
+            self._pending[ticket.priority] += count
+
+    # --- 슬롯 (공유 이벤트 루프 안에서만) ---
+
+    async def acquire(self, cost=1):
+        """
+        합성 슬롯을 받을 때까지 기다립니다. 현재 컨텍스트의 사용자 / 등급으로 순서를 정합니다.
+
+        Returns:
+            str: 적용된 우선순위 등급 (release()에 전달)
+        """
+        if self._pid != os.getpid():
+            self._reset_slots()
+        schedule = current_schedule()
+        priority = schedule.priority or PRIORITY_INTERACTIVE
+        flow = (priority, schedule.tenant)
+        queued_at = time.monotonic()
+
+        if self._in_use < self.capacity and not self._heap:
+            self._in_use += 1
+            self._record_wait(priority, 0.0)
+            return priority
+
+        start = max(self._virtual_time, self._flow_finish.get(flow, 0.0))
+        self._flow_finish[flow] = start + max(1, cost) / PRIORITY_WEIGHTS[priority]
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._heap, (start, self._seq, future, priority))
+        self._waiting[priority] += 1
+        SCHEDULER_WAITING.inc(priority=priority)
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 슬롯을 받은 직후 취소되었으면 다음 요청에 넘김
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self._waiting[priority] -= 1
+            SCHEDULER_WAITING.dec(priority=priority)
+        self._record_wait(priority, time.monotonic() - queued_at)
+        return priority
+
+    def release(self):
+        """슬롯을 반납하고, 가상 시작 시각이 가장 이른 대기 요청에 넘깁니다."""
+        while self._heap:
+            start, _, future, _ = heapq.heappop(self._heap)
+            if future.cancelled():
+                continue
+            self._virtual_time = max(self._virtual_time, start)
+            future.set_result(None)
+            return
+        self._in_use -= 1
+        if not self._in_use:
+            # 모두 비었으면 flow 기록 정리 (오래 쉰 flow가 예전 종료 시각을 들고 있지 않도록)
+            self._flow_finish.clear()
+
+    def _record_wait(self, priority, wait_seconds):
+        SCHEDULER_QUEUE_WAIT_SECONDS.observe(wait_seconds, priority=priority)
+        with self._lock:
+            stats = self._stats[priority]
+            stats["dispatched"] += 1
+            stats["total_wait_seconds"] += wait_seconds
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], wait_seconds)
+
+    def get_stats(self):
+        with self._lock:
+            classes = {}
+            for priority, stats in self._stats.items():
+                classes[priority] = {
+                    **stats,
+                    "avg_wait_seconds": stats["total_wait_seconds"] / stats["dispatched"] if stats["dispatched"] else 0.0,
+                    "weight": PRIORITY_WEIGHTS[priority],
+                    "waiting": self._waiting.get(priority, 0),
+                    "pending_segments": self._pending[priority],
+                    "max_pending_segments": SCHED_MAX_PENDING_SEGMENTS[priority],
+                }
+            tenant_jobs = dict(self._tenant_jobs)
+        return {"capacity": self.capacity, "in_use": self._in_use, "classes": classes, "tenant_jobs": tenant_jobs}
@@ -0,0 +1,224 @@
+import os
+import re
+import mmap
+import struct
+import logging
+from array import array
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 사이드카 인덱스 파일 형식
+# 헤더: 매직, 버전, 원본 텍스트 크기(바이트), 문단 수, 문장 수, 챕터 수
+INDEX_MAGIC = b"NVIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sIQIII")
+INDEX_SUFFIX = ".idx"
+
+# 문장 끝: 종결 부호(. ! ? … 。)와 뒤따르는 닫는 따옴표/괄호, 그 다음이 공백이거나 줄 끝 (UTF-8 바이트 기준)
+SENTENCE_END_PATTERN = re.compile(
+    rb'(?:[.!?]|\xe2\x80\xa6|\xe3\x80\x82)+(?:["\')\]]|\xe2\x80[\x9d\x99]|\xe3\x80[\x8d\x8f])*(?=\s|$)'
+)
+# 챕터 제목: "제1장", "제 3 화", "12화", "Chapter 4", "프롤로그", "에필로그", "외전" 등으로 시작하는 짧은 줄
+CHAPTER_HEADING_PATTERN = re.compile(
+    r'^\s*(?:제\s*\d+\s*(?:장|화|부|편|권)|\d+\s*(?:장|화)(?:\s|$|\.)|chapter\s+\d+|프롤로그|에필로그|외전)',
+    re.IGNORECASE
+)
+CHAPTER_HEADING_MAX_CHARS = 40
+
+
+def index_path_for(text_path):
+    """텍스트 파일에 대응하는 사이드카 인덱스 경로를 반환합니다."""
+    return os.path.splitext(text_path)[0] + INDEX_SUFFIX
+
+
+def _is_chapter_heading(line):
+    stripped = line.strip()
+    return 0 < len(stripped) <= CHAPTER_HEADING_MAX_CHARS and bool(CHAPTER_HEADING_PATTERN.match(stripped))
+
+
+def build_text_index(text_path):
+    """
+    UTF-8 텍스트 파일을 한 줄씩 훑어 문단/문장/챕터 제목의 바이트 오프셋 인덱스를 만들고 사이드카 파일로 저장합니다.
+    빈 줄이 아닌 각 줄을 하나의 문단으로 봅니다.
+
+    Args:
+        text_path (str): UTF-8 텍스트 파일 경로
+
+    Returns:
+        dict: 문단 수, 문장 수, 챕터 수
+    """
+    para_starts, para_ends = array("Q"), array("Q")
+    sent_starts, sent_ends = array("Q"), array("Q")
+    chapter_paras = array("I")
+
+    offset = 0
+    with open(text_path, "rb") as f:
+        for raw_line in f:
+            line = raw_line.rstrip(b"\r\n")
+            content_start = len(line) - len(line.lstrip())
+            content_end = len(line.rstrip())
+            if content_end > content_start:
+                if _is_chapter_heading(line.decode("utf-8", errors="ignore")):
+                    chapter_paras.append(len(para_starts))
+                para_starts.append(offset + content_start)
+                para_ends.append(offset + content_end)
+
+                # 문단 안의 문장 경계
+                sentence_start = content_start
+                for match in SENTENCE_END_PATTERN.finditer(line, content_start, content_end):
+                    sent_starts.append(offset + sentence_start)
+                    sent_ends.append(offset + match.end())
+                    sentence_start = match.end()
+                    while sentence_start < content_end and line[sentence_start:sentence_start + 1].isspace():
+                        sentence_start += 1
+                if sentence_start < content_end:
+                    sent_starts.append(offset + sentence_start)
+                    sent_ends.append(offset + content_end)
+            offset += len(raw_line)
+
+    tmp_path = index_path_for(text_path) + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, offset, len(para_starts), len(sent_starts), len(chapter_paras)))
+        for values in (para_starts, para_ends, sent_starts, sent_ends, chapter_paras):
+            values.tofile(f)
+    os.replace(tmp_path, index_path_for(text_path))
+
+    summary = {"paragraphs": len(para_starts), "sentences": len(sent_starts), "chapters": len(chapter_paras)}
+    logger.info(f"텍스트 인덱스 생성: {text_path} {summary}")
+    return summary
+
+
+def _load_index(text_path):
+    """
+    사이드카 인덱스를 읽습니다. 인덱스가 없거나 텍스트 크기와 맞지 않으면 None.
+
+    Returns:
+        dict | None: 오프셋 배열들
+    """
+    index_path = index_path_for(text_path)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path, "rb") as f:
+        header = f.read(INDEX_HEADER.size)
+        if len(header) < INDEX_HEADER.size:
+            return None
+        magic, version, text_size, n_para, n_sent, n_chap = INDEX_HEADER.unpack(header)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or text_size != os.path.getsize(text_path):
+            return None
+        index = {}
+        for name, typecode, count in (("para_starts", "Q", n_para), ("para_ends", "Q", n_para),
+                                      ("sent_starts", "Q", n_sent), ("sent_ends", "Q", n_sent),
+                                      ("chapter_paras", "I", n_chap)):
+            values = array(typecode)
+            values.fromfile(f, count)
+            index[name] = values
+    return index
+
+
+class NovelTextReader:
+    """
+    사이드카 인덱스와 메모리 맵으로 저장된 소설 텍스트의 일부만 읽는 리더.
+
+    파일 전체를 메모리에 올리지 않고 문단/문장/챕터 단위의 범위를 바로 잘라 읽습니다.
+    인덱스가 없거나 오래된 경우(이전에 업로드된 파일 등) 처음 열 때 다시 생성합니다.
+
+    사용 예:
+        with NovelTextReader(text_path) as reader:
+            reader.paragraphs(0, 10)
+    """
+
+    def __init__(self, text_path):
+        self.text_path = text_path
+        index = _load_index(text_path)
+        if index is None:
+            build_text_index(text_path)
+            index = _load_index(text_path)
+        self._index = index
+        self._file = open(text_path, "rb")
+        self._size = os.path.getsize(text_path)
+        # 빈 파일은 mmap할 수 없으므로 빈 바이트열로 대체
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else b""
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def paragraph_count(self):
+        return len(self._index["para_starts"])
+
+    @property
+    def sentence_count(self):
+        return len(self._index["sent_starts"])
+
+    def _decode(self, start, end):
+        return self._data[start:end].decode("utf-8", errors="replace")
+
+    def read_bytes_range(self, start, end):
+        """바이트 오프셋 범위 [start, end)의 텍스트를 반환합니다."""
+        start = max(0, min(start, self._size))
+        end = max(start, min(end, self._size))
+        return self._decode(start, end)
+
+    def paragraphs(self, start, end=None):
+        """문단 인덱스 범위 [start, end)의 문단 리스트를 반환합니다."""
+        starts, ends = self._index["para_starts"], self._index["para_ends"]
+        return [self._decode(starts[i], ends[i]) for i in range(*slice(start, end).indices(len(starts)))]
+
+    def sentences(self, start, end=None):
+        """문장 인덱스 범위 [start, end)의 문장 리스트를 반환합니다."""
+        starts, ends = self._index["sent_starts"], self._index["sent_ends"]
+        return [self._decode(starts[i], ends[i]) for i in range(*slice(start, end).indices(len(starts)))]
+
+    def paragraph_range_text(self, start, end=None):
+        """문단 범위 [start, end)를 원문 줄바꿈을 유지한 하나의 텍스트로 반환합니다."""
+        starts, ends = self._index["para_starts"], self._index["para_ends"]
+        first, last, _ = slice(start, end).indices(len(starts))
+        if first >= last:
+            return ""
+        return self._decode(starts[first], ends[last - 1])
+
+    def chapters(self):
+        """
+        챕터 목록을 반환합니다.
+
+        Returns:
+            list: [{"index", "title", "paragraph_start", "paragraph_end", "byte_offset"}, ...]
+        """
+        chapter_paras = list(self._index["chapter_paras"])
+        starts = self._index["para_starts"]
+        result = []
+        for i, para_index in enumerate(chapter_paras):
+            para_end = chapter_paras[i + 1] if i + 1 < len(chapter_paras) else len(starts)
+            result.append({
+                "index": i,
+                "title": self._decode(starts[para_index], self._index["para_ends"][para_index]).strip(),
+                "paragraph_start": para_index,
+                "paragraph_end": para_end,
+                "byte_offset": starts[para_index],
+            })
+        return result
+
+    def chapter_text(self, chapter_index):
+        """챕터 하나의 텍스트(제목 포함)를 반환합니다."""
+        chapters = self.chapters()
+        if not 0 <= chapter_index < len(chapters):
+            raise IndexError(f"챕터 인덱스 범위를 벗어났습니다: {chapter_index}")
+        chapter = chapters[chapter_index]
+        return self.paragraph_range_text(chapter["paragraph_start"], chapter["paragraph_end"])
+
+    def summary(self):
+        return {
+            "size_bytes": self._size,
+            "paragraphs": self.paragraph_count,
+            "sentences": self.sentence_count,
+            "chapters": len(self._index["chapter_paras"]),
+        }
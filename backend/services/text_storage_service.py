@@ -1,29 +1,58 @@
 import os
 import json
 import uuid
+import codecs
+import hashlib
 from datetime import datetime
 import logging
 
-# 처리된 텍스트와 메타데이터를 저장할 기본 경로
-BASE_STORAGE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app_data')
+from services.text_index_service import build_text_index, index_path_for, NovelTextReader
+from services.file_lock import InterProcessLock
+
+# 처리된 텍스트와 메타데이터를 저장할 기본 경로 (APP_DATA_DIR 환경 변수로 다른 위치를 지정할 수 있음 - 벤치마크 등)
+BASE_STORAGE_PATH = os.environ.get("APP_DATA_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app_data')
 METADATA_FILE = os.path.join(BASE_STORAGE_PATH, 'metadata.json')
 NOVELS_ORIGINAL_FOLDER = os.path.join(BASE_STORAGE_PATH, 'novels_original')
 CHARACTER_ANALYSIS_FOLDER = os.path.join(BASE_STORAGE_PATH, 'character_analysis')
 NOVELS_PROCESSED_FOLDER = os.path.join(BASE_STORAGE_PATH, 'novels_processed')
 
-# 저장 경로 및 메타데이터 파일, 분석 결과 폴더가 없으면 생성
-if not os.path.exists(BASE_STORAGE_PATH):
-    os.makedirs(BASE_STORAGE_PATH)
-if not os.path.exists(NOVELS_ORIGINAL_FOLDER):
-    os.makedirs(NOVELS_ORIGINAL_FOLDER)
-if not os.path.exists(CHARACTER_ANALYSIS_FOLDER):
-    os.makedirs(CHARACTER_ANALYSIS_FOLDER)
-if not os.path.exists(NOVELS_PROCESSED_FOLDER):
-    os.makedirs(NOVELS_PROCESSED_FOLDER)
+# 앱 시작 시 한 번 만드는 저장 폴더 (import 시점에는 디스크를 건드리지 않음)
+STORAGE_FOLDERS = (
+    NOVELS_ORIGINAL_FOLDER,
+    CHARACTER_ANALYSIS_FOLDER,
+    NOVELS_PROCESSED_FOLDER,
+    os.path.join(BASE_STORAGE_PATH, 'novels_matched'),
+    os.path.join(BASE_STORAGE_PATH, 'audio_output'),
+    os.path.join(BASE_STORAGE_PATH, 'audio_blobs'),
+)
+_storage_ready = False
+
+# 업로드 스트리밍 설정
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB 단위로 읽기/변환
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", 200 * 1024 * 1024))  # 장편 연재물까지 허용 (기본 200MB)
+# BOM이 없을 때 순서대로 시도할 인코딩 (cp949는 EUC-KR의 상위 집합)
+UPLOAD_FALLBACK_ENCODINGS = ("utf-8", "cp949")
+TEXT_PREVIEW_LENGTH = 200
+
+# 메타데이터 읽기-수정-쓰기 구간 보호용 잠금 (분석 단계가 동시에 실행될 수 있고, 워커 프로세스가 여러 개일 수 있음)
+_metadata_lock = InterProcessLock(METADATA_FILE + '.lock')
 
-if not os.path.exists(METADATA_FILE):
-    with open(METADATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump({}, f)
+def ensure_storage():
+    """
+    저장 폴더와 빈 메타데이터 파일을 만듭니다. 앱 팩토리(create_app)와 CLI 도구가 시작할 때 호출하며,
+    두 번째 호출부터는 아무것도 하지 않습니다.
+    """
+    global _storage_ready
+    if _storage_ready:
+        return
+    with _metadata_lock:
+        if _storage_ready:
+            return
+        for folder in STORAGE_FOLDERS:
+            os.makedirs(folder, exist_ok=True)
+        if not os.path.exists(METADATA_FILE):
+            save_metadata({})
+        _storage_ready = True
 
 def load_metadata():
     """메타데이터 파일에서 모든 메타데이터를 로드합니다."""
@@ -38,8 +67,73 @@ def load_metadata():
 
 def save_metadata(metadata):
     """주어진 메타데이터를 파일에 저장합니다."""
-    with open(METADATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=4)
+    with _metadata_lock:
+        # 임시 파일에 쓴 뒤 교체하여, 잠금 없이 읽는 쪽이 쓰는 도중의 파일을 보지 않도록 함
+        tmp_file = METADATA_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_file, METADATA_FILE)
+
+def update_metadata_entry(file_id, updates):
+    """
+    특정 파일 ID의 메타데이터 항목에 필드를 추가/갱신합니다. 읽기-수정-쓰기를 잠금으로 보호합니다.
+
+    Args:
+        file_id (str): 메타데이터 키 (파일 ID)
+        updates (dict): 갱신할 필드
+
+    Returns:
+        bool: 항목이 존재하여 갱신되었으면 True, 항목이 없으면 False
+    """
+    with _metadata_lock:
+        metadata = load_metadata()
+        if file_id not in metadata:
+            return False
+        metadata[file_id].update(updates)
+        save_metadata(metadata)
+        return True
+
+def _build_index_safely(text_path):
+    """문단/문장 오프셋 인덱스를 생성합니다. 실패해도 업로드는 유지하고, 리더를 처음 열 때 다시 생성합니다."""
+    try:
+        build_text_index(text_path)
+    except Exception as e:
+        logging.warning(f"텍스트 인덱스 생성 실패 ({text_path}): {e}")
+
+def _register_text_metadata(file_id, original_filename, saved_filename, size_bytes, char_count, extra=None):
+    """저장된 원본 텍스트의 메타데이터 항목을 생성합니다."""
+    with _metadata_lock:
+        metadata = load_metadata()
+        metadata[file_id] = {
+            'original_filename': original_filename,
+            'saved_filename': saved_filename,
+            'upload_timestamp': datetime.now().isoformat(),
+            'size_bytes': size_bytes,
+            'char_count': char_count, # 문자 수 (선택적)
+            **(extra or {})
+        }
+        save_metadata(metadata)
+
+def update_chapter_entry(file_id, chapter_index, updates):
+    """
+    메타데이터의 챕터 항목(metadata[file_id]["chapters"][chapter_index])에 필드를 추가/갱신합니다.
+
+    Args:
+        file_id (str): 메타데이터 키 (파일 ID)
+        chapter_index (int): 챕터 인덱스
+        updates (dict): 갱신할 필드
+
+    Returns:
+        bool: 챕터 항목이 존재하여 갱신되었으면 True
+    """
+    with _metadata_lock:
+        metadata = load_metadata()
+        chapters = metadata.get(file_id, {}).get('chapters')
+        if not chapters or not 0 <= chapter_index < len(chapters):
+            return False
+        chapters[chapter_index].update(updates)
+        save_metadata(metadata)
+        return True
 
 def save_processed_text(original_filename, text_content):
     """
@@ -62,17 +156,12 @@ def save_processed_text(original_filename, text_content):
             f.write(text_content)
         
         file_size = os.path.getsize(filepath)
+        _build_index_safely(filepath)
         
         # 메타데이터 업데이트
-        metadata = load_metadata()
-        metadata[file_id] = {
-            'original_filename': original_filename,
-            'saved_filename': saved_filename,
-            'upload_timestamp': datetime.now().isoformat(),
-            'size_bytes': file_size,
-            'char_count': len(text_content) # 문자 수 (선택적)
-        }
-        save_metadata(metadata)
+        _register_text_metadata(file_id, original_filename, saved_filename, file_size, len(text_content), {
+            'sha256': hashlib.sha256(text_content.encode('utf-8')).hexdigest()
+        })
         
         return {
             'id': file_id,
@@ -89,6 +178,161 @@ def save_processed_text(original_filename, text_content):
                 print(f"Error deleting partially saved file {filepath}: {remove_e}")
         return None
 
+def _detect_bom_encoding(head):
+    """파일 앞부분의 BOM으로 인코딩을 판별합니다. BOM이 없으면 None."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    return None
+
+def _transcode_to_utf8(chunks, encoding, out_file):
+    """
+    바이트 청크를 지정한 인코딩으로 점진적으로 디코딩하여 UTF-8로 기록하고,
+    같은 패스에서 문자 수, 내용 해시, 미리보기를 계산합니다.
+
+    Raises:
+        UnicodeDecodeError: 해당 인코딩으로 디코딩할 수 없는 경우
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+    hasher = hashlib.sha256()
+    stats = {'char_count': 0, 'size_bytes': 0, 'preview': '', 'has_content': False}
+
+    def _write(text):
+        if not text:
+            return
+        data = text.encode('utf-8')
+        out_file.write(data)
+        hasher.update(data)
+        stats['size_bytes'] += len(data)
+        stats['char_count'] += len(text)
+        if len(stats['preview']) <= TEXT_PREVIEW_LENGTH:
+            stats['preview'] += text[:TEXT_PREVIEW_LENGTH + 1 - len(stats['preview'])]
+        if not stats['has_content'] and text.strip():
+            stats['has_content'] = True
+
+    for chunk in chunks:
+        _write(decoder.decode(chunk))
+    _write(decoder.decode(b'', final=True))
+    stats['sha256'] = hasher.hexdigest()
+    return stats
+
+def _iter_file_chunks(path, chunk_size=UPLOAD_CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def _chain_chunks(first, rest):
+    if first:
+        yield first
+    yield from rest
+
+def save_uploaded_text_stream(original_filename, stream, max_bytes=UPLOAD_MAX_BYTES):
+    """
+    업로드 스트림을 청크 단위로 디스크에 기록하면서 인코딩을 판별하고 UTF-8로 변환하여 저장합니다.
+    전체 내용을 메모리에 올리지 않으며, 크기/문자 수/내용 해시를 같은 패스에서 계산합니다.
+
+    인코딩은 BOM(UTF-8/UTF-16)이 있으면 그에 따르고, 없으면 UTF-8로 변환을 시도하면서 원본을 함께 스풀합니다.
+    UTF-8이 아니면 스풀된 원본을 CP949(EUC-KR 포함)로 다시 변환합니다.
+
+    Args:
+        original_filename (str): 원본 파일의 이름입니다.
+        stream: read(size)를 지원하는 바이너리 스트림 (업로드 파일)
+        max_bytes (int, optional): 허용하는 최대 원본 크기
+
+    Returns:
+        dict: 저장된 파일의 ID, 파일명, 인코딩, 크기, 문자 수, 해시, 미리보기
+
+    Raises:
+        UnicodeDecodeError: 지원하는 인코딩으로 디코딩할 수 없는 경우
+        ValueError: 파일이 비어 있거나 최대 크기를 초과한 경우
+    """
+    file_id = str(uuid.uuid4())
+    saved_filename = f"{file_id}.txt"
+    filepath = os.path.join(NOVELS_ORIGINAL_FOLDER, saved_filename)
+    spool_path = filepath + ".upload"
+    partial_path = filepath + ".part"
+    raw_size = 0
+
+    def _spooled_chunks(spool):
+        """업로드 스트림을 읽어 원본 스풀에 기록하면서 청크를 그대로 전달합니다."""
+        nonlocal raw_size
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            raw_size += len(chunk)
+            if raw_size > max_bytes:
+                raise ValueError(f"파일 크기가 허용 한도({max_bytes // (1024 * 1024)}MB)를 초과했습니다.")
+            spool.write(chunk)
+            yield chunk
+
+    try:
+        head = stream.read(4)
+        detected = _detect_bom_encoding(head)
+        candidates = [detected] if detected else list(UPLOAD_FALLBACK_ENCODINGS)
+
+        stats, encoding = None, None
+        with open(spool_path, 'wb') as spool:
+            spool.write(head)
+            raw_size = len(head)
+            try:
+                with open(partial_path, 'wb') as out_file:
+                    stats = _transcode_to_utf8(
+                        _chain_chunks(head, _spooled_chunks(spool)), candidates[0], out_file
+                    )
+                encoding = candidates[0]
+            except UnicodeDecodeError:
+                # 나머지 업로드를 마저 스풀한 뒤 다른 인코딩으로 재시도
+                for _ in _spooled_chunks(spool):
+                    pass
+        if stats is None:
+            last_error = None
+            for candidate in candidates[1:]:
+                try:
+                    with open(partial_path, 'wb') as out_file:
+                        stats = _transcode_to_utf8(_iter_file_chunks(spool_path), candidate, out_file)
+                    encoding = candidate
+                    break
+                except UnicodeDecodeError as e:
+                    last_error = e
+            if stats is None:
+                raise last_error or UnicodeDecodeError(candidates[0], b'', 0, 1, "unsupported encoding")
+
+        if not stats['has_content']:
+            raise ValueError("File is empty or contains only whitespace.")
+
+        os.replace(partial_path, filepath)
+        _build_index_safely(filepath)
+        _register_text_metadata(file_id, original_filename, saved_filename, stats['size_bytes'], stats['char_count'], {
+            'source_encoding': encoding,
+            'source_size_bytes': raw_size,
+            'sha256': stats['sha256']
+        })
+        logging.info(f"업로드 저장 완료: {file_id} ({encoding}, {raw_size} bytes → {stats['size_bytes']} bytes)")
+        return {
+            'id': file_id,
+            'filename': saved_filename,
+            'encoding': encoding,
+            'size_bytes': stats['size_bytes'],
+            'source_size_bytes': raw_size,
+            'char_count': stats['char_count'],
+            'sha256': stats['sha256'],
+            'preview': stats['preview']
+        }
+    except Exception:
+        for path in (filepath, index_path_for(filepath)):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        for path in (spool_path, partial_path):
+            if os.path.exists(path):
+                os.remove(path)
+
 def get_processed_text_path(file_id):
     """주어진 ID에 해당하는 처리된 텍스트 파일의 경로를 반환합니다."""
     metadata = load_metadata()
@@ -97,6 +341,18 @@ def get_processed_text_path(file_id):
         return os.path.join(NOVELS_ORIGINAL_FOLDER, saved_filename)
     return None
 
+def open_text_reader(file_id):
+    """
+    저장된 소설 텍스트의 범위 리더를 엽니다. (with 문으로 사용)
+
+    Returns:
+        NovelTextReader: 리더 객체, 파일이 없으면 None
+    """
+    text_path = get_processed_text_path(file_id)
+    if not text_path or not os.path.exists(text_path):
+        return None
+    return NovelTextReader(text_path)
+
 def get_metadata(file_id=None):
     """특정 파일 ID의 메타데이터 또는 전체 메타데이터를 반환합니다."""
     all_metadata = load_metadata()
@@ -125,12 +381,11 @@ def save_character_analysis(original_file_id, analysis_data):
             json.dump(analysis_data, f, ensure_ascii=False, indent=4)
         
         # 메타데이터에 분석 파일 정보 추가 (선택적)
-        metadata = load_metadata()
-        if original_file_id in metadata:
-            metadata[original_file_id]['character_analysis_file'] = analysis_filename
-            metadata[original_file_id]['character_analysis_timestamp'] = datetime.now().isoformat()
-            save_metadata(metadata)
-        else:
+        updated = update_metadata_entry(original_file_id, {
+            'character_analysis_file': analysis_filename,
+            'character_analysis_timestamp': datetime.now().isoformat()
+        })
+        if not updated:
             # 원본 파일 ID가 메타데이터에 없는 경우 (일반적으로 발생하지 않아야 함)
             print(f"Warning: Original file ID {original_file_id} not found in metadata while saving character analysis.")
             # 이 경우, 분석 파일은 저장되지만 메타데이터에는 연결되지 않음.
@@ -161,12 +416,11 @@ def save_novel_structure_analysis(original_file_id, structure_data):
             json.dump(structure_data, f, ensure_ascii=False, indent=4)
         
         # 메타데이터에 구조 분석 파일 정보 추가
-        metadata = load_metadata()
-        if original_file_id in metadata:
-            metadata[original_file_id]['structure_analysis_file'] = analysis_filename
-            metadata[original_file_id]['structure_analysis_timestamp'] = datetime.now().isoformat()
-            save_metadata(metadata)
-        else:
+        updated = update_metadata_entry(original_file_id, {
+            'structure_analysis_file': analysis_filename,
+            'structure_analysis_timestamp': datetime.now().isoformat()
+        })
+        if not updated:
             logging.warning(f"Warning: Original file ID {original_file_id} not found in metadata while saving structure analysis.")
 
         return analysis_filename
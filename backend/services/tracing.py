@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+from datetime import datetime
+
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.job_store import job_result_status
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 작업 타임라인 기록 여부 / 저장 위치 / 보관 개수
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_FOLDER = os.path.join(BASE_STORAGE_PATH, 'traces')
+TRACE_RETENTION = int(os.environ.get("TRACE_RETENTION", 50))
+# 작업 하나에 기록하는 최대 이벤트 수 (초과분은 버리고 개수만 기록)
+TRACE_MAX_EVENTS = int(os.environ.get("TRACE_MAX_EVENTS", 200000))
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class JobTrace:
+    """
+    작업(분석 / 매칭 / 오디오 생성 등) 한 번의 타임라인.
+    스레드마다 하나의 레인(tid)을 배정하여 Chrome/Perfetto 트레이스 형식으로 내보냅니다.
+    """
+
+    def __init__(self, job_id, kind):
+        self.trace_id = f"{datetime.now():%Y%m%d-%H%M%S}-{kind}-{uuid.uuid4().hex[:8]}"
+        self.job_id = job_id
+        self.kind = kind
+        self.started_at = datetime.now().isoformat()
+        self.finished_at = None
+        self.status = "running"
+        self._origin = time.perf_counter()
+        self._events = []
+        self._lanes = {}
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def now_us(self):
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def _lane(self):
+        # 공유 이벤트 루프의 코루틴은 한 스레드에서 겹쳐 실행되므로 스레드 대신 태스크마다 레인을 배정
+        task = asyncio.current_task() if asyncio._get_running_loop() is not None else None
+        ident = ("task", id(task)) if task is not None else threading.get_ident()
+        lane = self._lanes.get(ident)
+        if lane is None:
+            name = task.get_name() if task is not None else threading.current_thread().name
+            lane = self._lanes[ident] = (len(self._lanes) + 1, name)
+        return lane[0]
+
+    def add_complete(self, name, category, start_us, duration_us, args=None):
+        """완료된 구간 이벤트(ph: X)를 현재 스레드 레인에 추가합니다."""
+        with self._lock:
+            if len(self._events) >= TRACE_MAX_EVENTS:
+                self._dropped += 1
+                return
+            event = {"name": name, "cat": category, "ph": "X", "ts": round(start_us, 1),
+                     "dur": round(max(duration_us, 0.0), 1), "pid": 1, "tid": self._lane()}
+            if args:
+                event["args"] = args
+            self._events.append(event)
+
+    def add_instant(self, name, category, args=None):
+        with self._lock:
+            if len(self._events) >= TRACE_MAX_EVENTS:
+                self._dropped += 1
+                return
+            event = {"name": name, "cat": category, "ph": "i", "s": "t", "ts": round(self.now_us(), 1),
+                     "pid": 1, "tid": self._lane()}
+            if args:
+                event["args"] = args
+            self._events.append(event)
+
+    def summary(self):
+        with self._lock:
+            event_count = len(self._events)
+            lanes = len(self._lanes)
+        return {
+            "trace_id": self.trace_id,
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": round(self.now_us() / 1e6, 3) if self.finished_at is None else self.duration_seconds,
+            "events": event_count,
+            "dropped_events": self._dropped,
+            "lanes": lanes,
+        }
+
+    def to_chrome_trace(self):
+        """Chrome(chrome://tracing) / Perfetto에서 바로 열 수 있는 JSON 객체를 반환합니다."""
+        with self._lock:
+            events = list(self._events)
+            lanes = dict(self._lanes)
+        metadata = [{"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"{self.kind} {self.job_id}"}}]
+        for tid, thread_name in lanes.values():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": thread_name}})
+            metadata.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tid, "args": {"sort_index": tid}})
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms", "otherData": self.summary()}
+
+    def finish(self, status):
+        self.duration_seconds = round(self.now_us() / 1e6, 3)
+        self.finished_at = datetime.now().isoformat()
+        self.status = status
+
+
+class TraceStore:
+    """진행 중인 작업의 트레이스(메모리)와 끝난 작업의 트레이스(디스크, 최근 N개)를 관리합니다."""
+
+    def __init__(self, root=TRACE_FOLDER, retention=TRACE_RETENTION):
+        self.root = root
+        self.retention = retention
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def _path(self, trace_id, suffix):
+        return os.path.join(self.root, f"{trace_id}{suffix}")
+
+    def begin(self, trace):
+        with self._lock:
+            self._active[trace.trace_id] = trace
+
+    def end(self, trace):
+        with self._lock:
+            self._active.pop(trace.trace_id, None)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            for suffix, payload in ((".trace.json", trace.to_chrome_trace()), (".meta.json", trace.summary())):
+                tmp_path = self._path(trace.trace_id, suffix) + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f, ensure_ascii=False)
+                os.replace(tmp_path, self._path(trace.trace_id, suffix))
+            self._prune()
+        except Exception as e:
+            logger.warning(f"트레이스 저장 실패 ({trace.trace_id}): {e}")
+
+    def _prune(self):
+        metas = sorted(name for name in os.listdir(self.root) if name.endswith(".meta.json"))
+        for name in metas[:max(0, len(metas) - self.retention)]:
+            trace_id = name[:-len(".meta.json")]
+            for suffix in (".trace.json", ".meta.json"):
+                try:
+                    os.remove(self._path(trace_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self, job_id=None):
+        """최근 트레이스 요약 목록 (최신순). 진행 중인 작업도 포함합니다."""
+        with self._lock:
+            summaries = [trace.summary() for trace in self._active.values()]
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if not name.endswith(".meta.json"):
+                    continue
+                try:
+                    with open(os.path.join(self.root, name), 'r', encoding='utf-8') as f:
+                        summaries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        if job_id:
+            summaries = [s for s in summaries if s.get("job_id") == job_id]
+        return sorted(summaries, key=lambda s: s.get("trace_id", ""), reverse=True)
+
+    def get_chrome_trace(self, trace_id):
+        """트레이스 JSON 객체를 반환합니다. 진행 중인 작업은 현재까지의 스냅샷. 없으면 None."""
+        with self._lock:
+            trace = self._active.get(trace_id)
+        if trace:
+            return trace.to_chrome_trace()
+        path = self._path(os.path.basename(trace_id), ".trace.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+trace_store = TraceStore()
+
+
+class _Span:
+    """현재 작업 트레이스에 구간을 기록하는 컨텍스트 매니저. 트레이스가 없으면 아무것도 하지 않습니다."""
+
+    __slots__ = ("_trace", "_name", "_category", "_args", "_start")
+
+    def __init__(self, name, category, args):
+        self._trace = _current_trace.get() if TRACING_ENABLED else None
+        self._name = name
+        self._category = category
+        self._args = args
+
+    def __enter__(self):
+        if self._trace is not None:
+            self._start = self._trace.now_us()
+        return self
+
+    def set(self, **args):
+        """구간이 끝나기 전에 인자(결과 크기, 상태 코드 등)를 추가합니다."""
+        if self._trace is not None:
+            self._args = {**(self._args or {}), **args}
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._trace is not None:
+            args = self._args
+            if exc_type is not None:
+                args = {**(args or {}), "error": f"{exc_type.__name__}: {exc_value}"}
+            self._trace.add_complete(self._name, self._category, self._start, self._trace.now_us() - self._start, args)
+        return False
+
+
+def span(name, category="stage", **args):
+    """
+    현재 작업 트레이스에 구간을 기록합니다.
+
+    사용 예:
+        with span("disk.write_segment", "io", order=3):
+            ...
+    """
+    return _Span(name, category, args or None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def bind_trace(func):
+    """
+    현재 작업 컨텍스트(작업 트레이스, 작업 진행률 등)를 다른 스레드(ThreadPoolExecutor 등)에서도 이어서 쓰도록 func를 감쌉니다.
+    스레드는 컨텍스트를 물려받지 않으므로 작업을 제출하는 쪽에서 감싸야 합니다.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def _run(*args, **kwargs):
+        # 같은 Context는 여러 스레드에서 동시에 들어갈 수 없으므로 호출마다 복사본에서 실행
+        return context.copy().run(func, *args, **kwargs)
+    return _run
+
+
+def traced_job(kind):
+    """
+    작업 함수 데코레이터. 첫 번째 인자(file_id)로 작업 트레이스를 시작하고, 끝나면 저장합니다.
+    이미 다른 작업 트레이스 안에서 호출되면(분석 파이프라인 안의 오디오 생성 등) 그 트레이스의 구간으로 기록합니다.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(file_id, *args, **kwargs):
+            if not TRACING_ENABLED:
+                return func(file_id, *args, **kwargs)
+            if _current_trace.get() is not None:
+                with span(f"job.{kind}", "job", file_id=file_id):
+                    return func(file_id, *args, **kwargs)
+
+            trace = JobTrace(file_id, kind)
+            trace_store.begin(trace)
+            token = _current_trace.set(trace)
+            status = "failed"
+            try:
+                with span(f"job.{kind}", "job", file_id=file_id):
+                    result = func(file_id, *args, **kwargs)
+                status = job_result_status(result)
+                return result
+            finally:
+                _current_trace.reset(token)
+                trace.finish(status)
+                trace_store.end(trace)
+        return wrapper
+    return decorator
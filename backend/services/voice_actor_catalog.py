@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.voice_matching_engine import split_feature_tags
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 기본 경로 설정
+BASE_PATH = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_DATA_PATH = Path(BASE_STORAGE_PATH)
+ACTOR_LIST_PATH = APP_DATA_PATH / 'actor_list.json'
+
+# 파일 변경(mtime) 확인 최소 간격 (초). 이 간격 안의 조회는 디스크에 접근하지 않습니다.
+CATALOG_CHECK_INTERVAL = float(os.environ.get("VOICE_CATALOG_CHECK_INTERVAL", 2.0))
+
+
+class VoiceActorCatalog:
+    """
+    성우 목록(actor_list.json)을 한 번만 읽어 메모리에 보관하는 프로세스 전역 카탈로그.
+
+    파일의 mtime/크기가 바뀌면 자동으로 다시 읽으며, id / gender / age_group / feature 태그별
+    보조 인덱스를 유지하여 필터 조회를 디스크 접근 없이 처리합니다.
+    """
+
+    def __init__(self, path=ACTOR_LIST_PATH, check_interval=CATALOG_CHECK_INTERVAL):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._signature = None      # (mtime_ns, size)
+        self._last_check = 0.0
+        self._actors = []
+        self._by_id = {}
+        self._by_gender = {}
+        self._by_age_group = {}
+        self._by_feature = {}
+        self.version = None         # 파일 내용 해시 (매칭 캐시 등에서 카탈로그 버전으로 사용)
+        self.loaded_at = None
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _ensure_fresh(self):
+        """확인 간격이 지났을 때만 파일 변경 여부를 확인하고, 바뀌었으면 다시 로드합니다."""
+        now = time.monotonic()
+        if self._signature is not None and now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self._signature is not None and now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            signature = self._file_signature()
+            if signature is None:
+                if self._signature is None:
+                    logger.error(f"성우 목록 파일이 존재하지 않습니다: {self.path}")
+                return
+            if signature != self._signature:
+                self._reload(signature)
+
+    def _reload(self, signature):
+        """파일을 읽어 인덱스를 다시 구성합니다. (lock 보유 상태에서 호출)"""
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            actors = json.loads(raw.decode('utf-8'))
+            if not isinstance(actors, list):
+                raise ValueError("성우 목록은 리스트 형식이어야 합니다.")
+        except Exception as e:
+            # 파싱 실패 시 기존 데이터를 유지 (편집 중인 파일 등)
+            logger.error(f"성우 데이터 로드 중 오류 발생: {e}")
+            return
+
+        by_id, by_gender, by_age_group, by_feature = {}, {}, {}, {}
+        for position, actor in enumerate(actors):
+            actor_id = actor.get("id")
+            if actor_id and actor_id not in by_id:
+                by_id[actor_id] = position
+            by_gender.setdefault(actor.get("gender"), []).append(position)
+            by_age_group.setdefault(actor.get("age_group"), []).append(position)
+            for tag in split_feature_tags(actor.get("feature", "")):
+                by_feature.setdefault(tag, []).append(position)
+
+        self._actors = actors
+        self._by_id = by_id
+        self._by_gender = by_gender
+        self._by_age_group = by_age_group
+        self._by_feature = by_feature
+        self._signature = signature
+        self.version = hashlib.sha1(raw).hexdigest()[:16]
+        self.loaded_at = time.time()
+        logger.info(f"{len(actors)}명의 성우 데이터를 로드했습니다. (버전 {self.version})")
+
+    def all(self):
+        """모든 성우 정보를 반환합니다. 호출자가 수정해도 카탈로그에 영향이 없도록 복사본을 반환합니다."""
+        self._ensure_fresh()
+        with self._lock:
+            return [dict(actor) for actor in self._actors]
+
+    def get(self, actor_id):
+        """ID로 성우 정보를 조회합니다. 없으면 None."""
+        self._ensure_fresh()
+        with self._lock:
+            position = self._by_id.get(actor_id)
+            return dict(self._actors[position]) if position is not None else None
+
+    def query(self, gender=None, age_group=None, feature=None):
+        """
+        조건에 맞는 성우 목록을 반환합니다. 조건은 AND로 결합됩니다.
+
+        Args:
+            gender (str, optional): "Male" / "Female"
+            age_group (str, optional): "Young" / "Middle age" / "Old"
+            feature (str | list, optional): 특성 태그 (여러 개면 모두 포함해야 함)
+
+        Returns:
+            list: 성우 정보 객체의 리스트
+        """
+        self._ensure_fresh()
+        with self._lock:
+            actors = self._actors
+            positions = None
+            filters = []
+            if gender:
+                filters.append(self._by_gender.get(gender, []))
+            if age_group:
+                filters.append(self._by_age_group.get(age_group, []))
+            if feature:
+                tags = feature if isinstance(feature, (list, tuple)) else [feature]
+                for tag in tags:
+                    filters.append(self._by_feature.get("".join(tag.split()), []))
+            for matched in filters:
+                positions = set(matched) if positions is None else positions & set(matched)
+        if positions is None:
+            return [dict(actor) for actor in actors]
+        return [dict(actors[position]) for position in sorted(positions)]
+
+    def feature_tags(self):
+        """카탈로그에 등장하는 모든 특성 태그와 성우 수를 반환합니다."""
+        self._ensure_fresh()
+        with self._lock:
+            return {tag: len(positions) for tag, positions in self._by_feature.items()}
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+voice_actor_catalog = VoiceActorCatalog()
@@ -0,0 +1,217 @@
+import os
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.voice_matching_engine import infer_gender, infer_age_group, NARRATOR_NAME, NARRATOR_TAGS
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 인덱스 저장 경로
+BASE_PATH = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+APP_DATA_PATH = Path(BASE_STORAGE_PATH)
+VOICE_INDEX_PATH = APP_DATA_PATH / 'voice_index'
+VOICE_INDEX_FILE = VOICE_INDEX_PATH / 'actor_index.npz'
+
+# 해시 n-gram 벡터 설정
+HASH_DIMENSIONS = 1024
+NGRAM_SIZES = (2, 3)
+
+# 등장인물별로 프롬프트에 넣을 후보 성우 수
+MATCH_CANDIDATES_TOP_K = int(os.environ.get("MATCH_CANDIDATES_TOP_K", 8))
+
+GENDER_TOKENS = {"Male": "남성", "Female": "여성"}
+AGE_TOKENS = {"Young": "젊은", "Middle age": "중년", "Old": "노년"}
+
+
+def hashed_ngram_vector(text, dimensions=HASH_DIMENSIONS):
+    """
+    텍스트의 문자 n-gram을 고정 차원으로 해싱한 L2 정규화 벡터를 만듭니다.
+    프로세스마다 값이 달라지는 hash() 대신 crc32를 사용하여 디스크에 저장해도 일관성을 유지합니다.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    normalized = " ".join((text or "").lower().split())
+    for n in NGRAM_SIZES:
+        for i in range(len(normalized) - n + 1):
+            gram = normalized[i:i + n]
+            if gram.strip():
+                vector[zlib.crc32(gram.encode("utf-8")) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def actor_index_text(actor):
+    """성우 정보를 인덱싱할 텍스트로 변환합니다."""
+    return " ".join([
+        GENDER_TOKENS.get(actor.get("gender"), ""),
+        AGE_TOKENS.get(actor.get("age_group"), ""),
+        actor.get("feature", "") or "",
+    ])
+
+
+def character_query_text(character):
+    """등장인물 정보를 질의 텍스트로 변환합니다. 추정한 성별/나이대를 성우 텍스트와 같은 토큰으로 덧붙입니다."""
+    if character.get("name") == NARRATOR_NAME and not character.get("description"):
+        return ", ".join(NARRATOR_TAGS)
+    text = f"{character.get('description', '')} {character.get('speech_pattern', '')}"
+    return " ".join([
+        GENDER_TOKENS.get(infer_gender(text), ""),
+        AGE_TOKENS.get(infer_age_group(text), ""),
+        text,
+    ])
+
+
+def _actor_content_hash(actor):
+    return hashlib.sha1(json.dumps(actor, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class VoiceCatalogIndex:
+    """
+    성우 특성에 대한 해시 n-gram 벡터 인덱스.
+
+    디스크(app_data/voice_index)에 저장되며, 성우 목록이 바뀌면 내용이 바뀐 성우만 다시 벡터화합니다.
+    """
+
+    def __init__(self, index_file=VOICE_INDEX_FILE):
+        self.index_file = Path(index_file)
+        self._lock = threading.Lock()
+        self._ids = []
+        self._hashes = []
+        self._matrix = np.zeros((0, HASH_DIMENSIONS), dtype=np.float32)
+        self._row_actors = []
+        self._loaded = False
+        self._synced_version = None
+
+    def _load_from_disk(self):
+        """저장된 인덱스를 불러옵니다. (lock 보유 상태에서 호출)"""
+        self._loaded = True
+        if not self.index_file.exists():
+            return
+        try:
+            with np.load(self.index_file, allow_pickle=False) as data:
+                if int(data["dimensions"]) != HASH_DIMENSIONS:
+                    return
+                self._ids = [str(x) for x in data["ids"]]
+                self._hashes = [str(x) for x in data["hashes"]]
+                self._matrix = data["vectors"].astype(np.float32)
+            logger.info(f"성우 인덱스 로드: {len(self._ids)}명 ({self.index_file})")
+        except Exception as e:
+            logger.warning(f"성우 인덱스 로드 실패, 새로 생성합니다: {e}")
+            self._ids, self._hashes = [], []
+            self._matrix = np.zeros((0, HASH_DIMENSIONS), dtype=np.float32)
+
+    def _save_to_disk(self):
+        """인덱스를 디스크에 저장합니다. (lock 보유 상태에서 호출)"""
+        try:
+            os.makedirs(self.index_file.parent, exist_ok=True)
+            # 여러 워커 프로세스가 동시에 저장해도 서로의 임시 파일을 덮어쓰지 않도록 프로세스/스레드별 이름 사용
+            tmp_file = self.index_file.with_name(f"{self.index_file.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+            np.savez(
+                tmp_file,
+                ids=np.array(self._ids),
+                hashes=np.array(self._hashes),
+                vectors=self._matrix,
+                dimensions=np.array(HASH_DIMENSIONS),
+            )
+            os.replace(tmp_file, self.index_file)
+        except Exception as e:
+            logger.warning(f"성우 인덱스 저장 실패: {e}")
+
+    def is_synced(self, version):
+        """마지막으로 동기화한 성우 목록 버전이 version과 같은지 여부 (None이면 항상 False)"""
+        return version is not None and self._synced_version == version
+
+    def sync(self, voice_actors, version=None):
+        """
+        인덱스를 주어진 성우 목록과 동기화합니다. 추가/변경된 성우만 벡터화하고, 삭제된 성우는 제거합니다.
+
+        Args:
+            voice_actors (list): 성우 정보 객체의 리스트
+            version (hashable, optional): 성우 목록 버전. 마지막으로 동기화한 버전과 같으면 아무것도 하지 않음
+
+        Returns:
+            int: 새로 벡터화한 성우 수
+        """
+        with self._lock:
+            if self.is_synced(version):
+                return 0
+            if not self._loaded:
+                self._load_from_disk()
+
+            # 내용 해시 기준으로 기존 벡터 재사용 (같은 ID가 여러 항목에 쓰인 경우도 각각 유지)
+            existing = {content_hash: self._matrix[row] for row, content_hash in enumerate(self._hashes)}
+            ids, hashes, vectors, row_actors = [], [], [], []
+            rebuilt = 0
+            for actor in voice_actors:
+                actor_id = actor.get("id")
+                if not actor_id:
+                    continue
+                content_hash = _actor_content_hash(actor)
+                vector = existing.get(content_hash)
+                if vector is None:
+                    vector = hashed_ngram_vector(actor_index_text(actor))
+                    rebuilt += 1
+                ids.append(actor_id)
+                hashes.append(content_hash)
+                vectors.append(vector)
+                row_actors.append(actor)
+
+            changed = rebuilt > 0 or hashes != self._hashes
+            self._ids, self._hashes, self._row_actors = ids, hashes, row_actors
+            self._matrix = np.stack(vectors) if vectors else np.zeros((0, HASH_DIMENSIONS), dtype=np.float32)
+            if changed:
+                self._save_to_disk()
+                logger.info(f"성우 인덱스 갱신: 전체 {len(ids)}명, 재계산 {rebuilt}명")
+            self._synced_version = version
+            return rebuilt
+
+    def top_k(self, character, k=MATCH_CANDIDATES_TOP_K):
+        """
+        등장인물과 가장 유사한 성우 k명을 반환합니다.
+
+        Args:
+            character (dict): 등장인물 정보 (name, description, speech_pattern)
+            k (int, optional): 반환할 후보 수
+
+        Returns:
+            list: 성우 정보 객체의 리스트 (유사도 내림차순)
+        """
+        with self._lock:
+            if not self._ids:
+                return []
+            query = hashed_ngram_vector(character_query_text(character))
+            scores = self._matrix @ query
+            k = min(k, len(self._ids))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [self._row_actors[int(i)] for i in top]
+
+    def candidates_for(self, characters, k=MATCH_CANDIDATES_TOP_K, include_narrator=True):
+        """
+        등장인물별 상위 후보 ID 목록과, 프롬프트에 넣을 후보 성우(합집합)를 반환합니다.
+
+        Returns:
+            tuple: ({등장인물 이름: [성우 ID, ...]}, [후보 성우 정보 리스트])
+        """
+        targets = list(characters)
+        if include_narrator and not any(c.get("name") == NARRATOR_NAME for c in targets):
+            targets.append({"name": NARRATOR_NAME})
+        candidate_ids = {}
+        union = {}
+        for character in targets:
+            top_actors = self.top_k(character, k)
+            candidate_ids[character.get("name")] = list(dict.fromkeys(actor["id"] for actor in top_actors))
+            for actor in top_actors:
+                union.setdefault(actor["id"], actor)
+        return candidate_ids, list(union.values())
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+voice_catalog_index = VoiceCatalogIndex()
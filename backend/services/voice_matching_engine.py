@@ -0,0 +1,269 @@
+import re
+import logging
+
+import numpy as np
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 점수 가중치
+TAG_WEIGHT = 1.0          # 특성 태그 유사도
+GENDER_WEIGHT = 1.0       # 성별 일치/불일치
+AGE_WEIGHT = 0.5          # 나이대 근접도
+REUSE_PENALTY = 0.6       # 이미 배정된 성우를 다시 쓸 때의 감점 (배정 횟수만큼 누적)
+
+# 1위와 점수 차이가 이 값보다 작은 후보 중 성별/나이대가 다른 성우가 있으면
+# 애매한 경우로 보고 Gemini에 판단을 맡김 (같은 성별/나이대 후보끼리의 근소한 차이는 로컬 결과 사용)
+AMBIGUITY_MARGIN = 0.1
+
+NARRATOR_NAME = "Narrator"
+
+GENDERS = ["Male", "Female"]
+AGE_GROUPS = ["Young", "Middle age", "Old"]
+
+# 인물 설명에서 성별/나이대를 추정하기 위한 키워드
+GENDER_KEYWORDS = {
+    "Male": ["남성", "남자", "소년", "청년", "아저씨", "할아버지", "아버지", "아빠", "아들", "형님", "오빠", "삼촌", "왕자", "신사", "남편", "그는 "],
+    "Female": ["여성", "여자", "소녀", "아가씨", "아주머니", "할머니", "어머니", "엄마", "딸", "언니", "누나", "이모", "공주", "숙녀", "아내", "그녀"],
+}
+AGE_KEYWORDS = {
+    "Young": ["젊은", "어린", "소년", "소녀", "청년", "아이", "학생", "대학생", "10대", "20대", "신입", "막내"],
+    "Middle age": ["중년", "30대", "40대", "50대", "아저씨", "아주머니", "아버지", "어머니", "성숙한", "장년"],
+    "Old": ["노인", "노년", "할아버지", "할머니", "늙은", "백발", "60대", "70대", "80대", "노쇠"],
+}
+
+# 인물 성격 묘사 → 성우 특성 태그 연결 (인물 설명에 직접 나오지 않는 태그를 보완)
+TRAIT_TO_TAGS = {
+    "활기": ["활기찬", "활발한", "밝은"],
+    "활발": ["활발한", "활기찬", "외향적인"],
+    "명랑": ["밝은", "활기찬"],
+    "유쾌": ["밝은", "웃긴"],
+    "쾌활": ["밝은", "활발한"],
+    "직설": ["힘있는", "자신감있는"],
+    "당당": ["자신감있는", "힘있는"],
+    "차분": ["차분한", "잔잔한"],
+    "침착": ["차분한", "진지한"],
+    "냉정": ["감정없는", "차분한"],
+    "냉철": ["감정없는", "지적인"],
+    "무뚝뚝": ["무뚝뚝한", "저음"],
+    "과묵": ["무뚝뚝한", "깊은"],
+    "다정": ["다정한", "따뜻한", "부드러운"],
+    "상냥": ["따뜻한", "부드러운", "친근한"],
+    "친절": ["친근한", "따뜻한"],
+    "온화": ["따뜻한", "부드러운"],
+    "여유": ["느긋한", "성숙한"],
+    "진지": ["진지한", "무게있는"],
+    "엄격": ["진지한", "힘있는"],
+    "카리스마": ["힘있는", "깊은", "저음"],
+    "위엄": ["무게있는", "깊은", "저음"],
+    "음침": ["어두운", "저음"],
+    "우울": ["어두운", "감성적인"],
+    "감성": ["감성적인"],
+    "귀엽": ["귀여운", "높은 목소리"],
+    "귀여": ["귀여운", "높은 목소리"],
+    "소심": ["소심한", "작은"],
+    "수줍": ["소심한", "작은"],
+    "똑똑": ["지적인", "명확한"],
+    "지적": ["지적인", "명확한"],
+    "전문": ["전문적인", "명확한"],
+    "세련": ["세련된", "깔끔한"],
+    "익살": ["웃긴", "익살스럽고 감칠맛 나는"],
+    "장난": ["웃긴", "가벼운"],
+    "사투리": ["사투리"],
+}
+
+# 내레이터에게 기대하는 목소리 특성
+NARRATOR_TAGS = ["차분한", "명확한", "중립적인", "부드러운", "잔잔한", "편안한"]
+
+
+def split_feature_tags(feature):
+    """성우 feature 문자열("밝은, 깔끔한")을 공백이 정리된 태그 리스트로 변환합니다."""
+    if not feature:
+        return []
+    return [re.sub(r"\s+", "", tag) for tag in feature.split(",") if tag.strip()]
+
+
+def _tag_stem(tag):
+    """'차분한' → '차분' 처럼 어미를 떼어 본문 검색용 어간을 만듭니다."""
+    stem = re.sub(r"(스러운|스럽고|있는|없는|한|은|인|운|된|는|적)$", "", tag)
+    return stem if len(stem) >= 2 else tag
+
+
+def infer_gender(text):
+    """인물 설명에서 성별을 추정합니다. 판단할 수 없으면 None."""
+    scores = {gender: sum(text.count(keyword) for keyword in keywords) for gender, keywords in GENDER_KEYWORDS.items()}
+    if scores["Male"] == scores["Female"]:
+        return None
+    return max(scores, key=scores.get)
+
+
+def infer_age_group(text):
+    """인물 설명에서 나이대를 추정합니다. 판단할 수 없으면 None."""
+    scores = {age: sum(text.count(keyword) for keyword in keywords) for age, keywords in AGE_KEYWORDS.items()}
+    best = max(scores, key=scores.get)
+    if scores[best] == 0 or list(scores.values()).count(scores[best]) > 1:
+        return None
+    return best
+
+
+class VoiceMatchingEngine:
+    """
+    성우 목록의 gender / age_group / feature 태그를 벡터화하여 등장인물과 성우를 로컬에서 매칭합니다.
+
+    점수 = 태그 코사인 유사도 + 성별 일치 + 나이대 근접도 - 중복 배정 감점
+    """
+
+    def __init__(self, voice_actors):
+        self.voice_actors = [actor for actor in voice_actors if actor.get("id")]
+        self.actor_ids = [actor["id"] for actor in self.voice_actors]
+
+        # 태그 어휘 구성
+        actor_tags = [split_feature_tags(actor.get("feature", "")) for actor in self.voice_actors]
+        vocabulary = sorted({tag for tags in actor_tags for tag in tags})
+        self.vocabulary = vocabulary
+        self.tag_index = {tag: i for i, tag in enumerate(vocabulary)}
+        self.tag_stems = [_tag_stem(tag) for tag in vocabulary]
+
+        # 성우 태그 행렬 (L2 정규화)
+        self.actor_matrix = np.zeros((len(self.voice_actors), len(vocabulary)), dtype=np.float32)
+        for row, tags in enumerate(actor_tags):
+            for tag in tags:
+                self.actor_matrix[row, self.tag_index[tag]] = 1.0
+        self.actor_matrix = _normalize_rows(self.actor_matrix)
+
+        # 성별 (0: Male, 1: Female, -1: 미상) / 나이대 (0~2, -1: 미상)
+        self.actor_gender = np.array([_index_or_missing(GENDERS, actor.get("gender")) for actor in self.voice_actors])
+        self.actor_age = np.array([_index_or_missing(AGE_GROUPS, actor.get("age_group")) for actor in self.voice_actors])
+
+    def _character_vector(self, text, extra_tags=None):
+        """인물 설명/말투 텍스트를 태그 공간의 벡터로 변환합니다."""
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for i, stem in enumerate(self.tag_stems):
+            if stem in text:
+                vector[i] += 1.0
+        for trait, tags in TRAIT_TO_TAGS.items():
+            if trait in text:
+                for tag in tags:
+                    index = self.tag_index.get(re.sub(r"\s+", "", tag))
+                    if index is not None:
+                        vector[index] += 0.5
+        for tag in extra_tags or []:
+            index = self.tag_index.get(tag)
+            if index is not None:
+                vector[index] += 1.0
+        return vector
+
+    def build_profiles(self, characters, include_narrator=True):
+        """
+        등장인물 목록을 (이름, 태그 벡터, 성별 인덱스, 나이대 인덱스) 프로필로 변환합니다.
+        """
+        profiles = []
+        for character in characters:
+            name = character.get("name")
+            if not name:
+                continue
+            text = f"{character.get('description', '')} {character.get('speech_pattern', '')}"
+            profiles.append({
+                "name": name,
+                "vector": self._character_vector(text),
+                "gender": _index_or_missing(GENDERS, infer_gender(text)),
+                "age": _index_or_missing(AGE_GROUPS, infer_age_group(text)),
+            })
+        if include_narrator and not any(profile["name"] == NARRATOR_NAME for profile in profiles):
+            profiles.append({
+                "name": NARRATOR_NAME,
+                "vector": self._character_vector("", extra_tags=NARRATOR_TAGS),
+                "gender": -1,
+                "age": -1,
+            })
+        return profiles
+
+    def score_matrix(self, profiles):
+        """
+        모든 등장인물 × 성우 조합의 기본 점수 행렬을 계산합니다. (중복 배정 감점 제외)
+
+        Returns:
+            np.ndarray: (등장인물 수, 성우 수) 크기의 점수 행렬
+        """
+        if not profiles or not self.voice_actors:
+            return np.zeros((len(profiles), len(self.voice_actors)), dtype=np.float32)
+
+        character_matrix = _normalize_rows(np.stack([profile["vector"] for profile in profiles]))
+        tag_similarity = character_matrix @ self.actor_matrix.T
+
+        character_gender = np.array([profile["gender"] for profile in profiles])[:, None]
+        gender_known = (character_gender >= 0) & (self.actor_gender[None, :] >= 0)
+        gender_score = np.where(gender_known, np.where(character_gender == self.actor_gender[None, :], 1.0, -1.0), 0.0)
+
+        character_age = np.array([profile["age"] for profile in profiles])[:, None]
+        age_known = (character_age >= 0) & (self.actor_age[None, :] >= 0)
+        age_distance = np.abs(character_age - self.actor_age[None, :])
+        age_score = np.where(age_known, 1.0 - 0.75 * age_distance, 0.0)
+
+        return (TAG_WEIGHT * tag_similarity + GENDER_WEIGHT * gender_score + AGE_WEIGHT * age_score).astype(np.float32)
+
+    def match(self, characters, include_narrator=True, ambiguity_margin=AMBIGUITY_MARGIN, assigned_ids=None):
+        """
+        등장인물에게 성우를 배정합니다. 앞에 나오는 인물(주요 인물)부터 순서대로 배정하며,
+        이미 배정된 성우는 배정 횟수만큼 감점하여 목소리가 겹치지 않도록 합니다.
+
+        Args:
+            characters (list): 등장인물 정보 객체의 리스트
+            include_narrator (bool, optional): Narrator 배정 포함 여부
+            ambiguity_margin (float, optional): 애매한 경우로 판단할 1위와의 점수 차이
+            assigned_ids (list, optional): 이미 다른 인물에게 배정된 성우 ID (재사용 감점에 반영)
+
+        Returns:
+            dict: {
+                "character_voice_map": {이름: 성우 ID},
+                "ambiguous": [상위 후보 점수가 근접하거나 단서가 없는 인물 이름],
+                "candidates": {이름: [(성우 ID, 점수), ...] 상위 후보}
+            }
+        """
+        profiles = self.build_profiles(characters, include_narrator=include_narrator)
+        result = {"character_voice_map": {}, "ambiguous": [], "candidates": {}}
+        if not profiles or not self.voice_actors:
+            return result
+
+        base_scores = self.score_matrix(profiles)
+        usage = np.zeros(len(self.voice_actors), dtype=np.float32)
+        for actor_id in assigned_ids or []:
+            if actor_id in self.actor_ids:
+                usage[self.actor_ids.index(actor_id)] += 1.0
+
+        for row, profile in enumerate(profiles):
+            scores = base_scores[row] - REUSE_PENALTY * usage
+            ranking = np.argsort(-scores)
+            best = int(ranking[0])
+            has_signal = bool(profile["vector"].any()) or profile["gender"] >= 0 or profile["age"] >= 0
+
+            # 1위와 근접한 후보들
+            close = np.flatnonzero(scores >= scores[best] - ambiguity_margin)
+            close = close[close != best]
+            if profile["name"] == NARRATOR_NAME:
+                # 내레이터는 성별/나이대 제약이 없으므로 근접 후보 존재 여부만 확인
+                ambiguous = close.size > 0
+            else:
+                ambiguous = bool(np.any(
+                    (self.actor_gender[close] != self.actor_gender[best]) | (self.actor_age[close] != self.actor_age[best])
+                ))
+
+            result["character_voice_map"][profile["name"]] = self.actor_ids[best]
+            result["candidates"][profile["name"]] = [
+                (self.actor_ids[int(i)], round(float(scores[int(i)]), 4)) for i in ranking[:5]
+            ]
+            if ambiguous or not has_signal:
+                result["ambiguous"].append(profile["name"])
+            usage[best] += 1.0
+
+        return result
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _index_or_missing(values, value):
+    return values.index(value) if value in values else -1
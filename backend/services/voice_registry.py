@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+
+class CachedVoiceRegistry:
+    """
+    원격 음성 목록을 TTL 기반으로 캐시하는 레지스트리.
+
+    - TTL 안에서는 메모리 캐시를 그대로 반환합니다.
+    - TTL이 지나면 기존(오래된) 목록을 즉시 반환하고 백그라운드에서 갱신합니다. (stale-while-revalidate)
+    - 갱신 요청에는 이전 ETag를 실어 보내, 목록이 바뀌지 않았으면(304) 본문 없이 만료 시간만 연장합니다.
+    - 마지막 목록을 디스크 스냅샷으로 저장하여, 재시작 직후에도 네트워크를 기다리지 않습니다.
+    """
+
+    def __init__(self, fetch_func, snapshot_path, ttl_seconds=600, min_revalidate_seconds=60, afetch_func=None):
+        """
+        Args:
+            fetch_func (callable): fetch_func(etag) -> (status_code, voices | None, etag | None).
+                                   304이면 voices는 None.
+            snapshot_path (str): 디스크 스냅샷 파일 경로
+            ttl_seconds (int, optional): 캐시 유효 시간 (초)
+            min_revalidate_seconds (int, optional): 검증 실패 시 강제 갱신을 허용하는 최소 캐시 나이 (초)
+            afetch_func (callable, optional): fetch_func의 async 버전. aget_voices()/arefresh()가 이벤트 루프에서 직접 await 함
+        """
+        self.fetch_func = fetch_func
+        self.afetch_func = afetch_func
+        self.snapshot_path = snapshot_path
+        self.ttl_seconds = ttl_seconds
+        self.min_revalidate_seconds = min_revalidate_seconds
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # 동시에 하나의 갱신만 수행 (single-flight)
+        self._voices = None
+        self._voice_ids = frozenset()
+        self._etag = None
+        self._fetched_at = 0.0
+        self._snapshot_loaded = False
+        self._refresh_thread = None
+        self._arefresh_future = None  # 이벤트 루프 안의 갱신 (async 호출끼리 single-flight)
+        self._stop_event = threading.Event()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "not_modified": 0, "errors": 0}
+
+    # --- 내부 상태 관리 ---
+
+    def _set_voices(self, voices, etag, fetched_at):
+        with self._lock:
+            self._voices = voices
+            self._voice_ids = frozenset(v.get("voice_id") for v in voices if v.get("voice_id"))
+            self._etag = etag
+            self._fetched_at = fetched_at
+
+    def _load_snapshot(self):
+        """디스크 스냅샷을 읽어 메모리 캐시를 채웁니다."""
+        self._snapshot_loaded = True
+        if not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+            self._set_voices(snapshot.get("voices", []), snapshot.get("etag"), float(snapshot.get("fetched_at", 0)))
+            logger.info(f"음성 목록 스냅샷 로드: {len(self._voices)}개 ({self.snapshot_path})")
+            return True
+        except Exception as e:
+            logger.warning(f"음성 목록 스냅샷 로드 실패: {e}")
+            return False
+
+    def _save_snapshot(self):
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            tmp_path = self.snapshot_path + ".tmp"
+            with self._lock:
+                snapshot = {"fetched_at": self._fetched_at, "etag": self._etag, "voices": self._voices}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.snapshot_path)
+        except Exception as e:
+            logger.warning(f"음성 목록 스냅샷 저장 실패: {e}")
+
+    def _age(self):
+        return time.time() - self._fetched_at
+
+    # --- 갱신 ---
+
+    def refresh(self, force=False):
+        """
+        원격 목록을 다시 가져옵니다. 다른 스레드가 이미 갱신 중이면 그 결과를 기다립니다.
+
+        Args:
+            force (bool, optional): TTL과 관계없이 갱신할지 여부
+
+        Returns:
+            bool: 사용 가능한 목록이 있으면 True
+        """
+        with self._refresh_lock:
+            # 기다리는 동안 다른 스레드가 갱신을 끝냈으면 다시 요청하지 않음
+            if not force and self._voices is not None and self._age() < self.ttl_seconds:
+                return True
+            try:
+                status_code, voices, etag = self.fetch_func(self._etag if self._voices is not None else None)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"음성 목록 갱신 실패: {e}")
+                return self._voices is not None
+            return self._apply_fetch_result(status_code, voices, etag)
+
+    async def arefresh(self, force=False):
+        """
+        refresh()의 async 버전. afetch_func를 이벤트 루프에서 직접 await 하므로 스레드를 차지하지 않습니다.
+        같은 루프에서 이미 갱신 중이면 그 결과를 기다립니다.
+        """
+        if not force and self._voices is not None and self._age() < self.ttl_seconds:
+            return True
+        if self._arefresh_future is None or self._arefresh_future.done():
+            self._arefresh_future = asyncio.ensure_future(self._arefresh_once())
+        return await asyncio.shield(self._arefresh_future)
+
+    async def _arefresh_once(self):
+        try:
+            status_code, voices, etag = await self.afetch_func(self._etag if self._voices is not None else None)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"음성 목록 갱신 실패: {e}")
+            return self._voices is not None
+        return self._apply_fetch_result(status_code, voices, etag)
+
+    def _apply_fetch_result(self, status_code, voices, etag):
+        """가져온 결과를 캐시에 반영합니다. 사용 가능한 목록이 있으면 True."""
+        if status_code == 304 and self._voices is not None:
+            self.stats["not_modified"] += 1
+            with self._lock:
+                self._fetched_at = time.time()
+            self._save_snapshot()
+            return True
+        if status_code == 200 and voices is not None:
+            self.stats["refreshes"] += 1
+            self._set_voices(voices, etag, time.time())
+            self._save_snapshot()
+            logger.info(f"음성 목록 갱신 완료: {len(voices)}개")
+            return True
+
+        self.stats["errors"] += 1
+        logger.error(f"음성 목록 갱신 실패: 상태 코드 {status_code}")
+        return self._voices is not None
+
+    def _refresh_in_background(self):
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, name="voice-registry-refresh", daemon=True).start()
+
+    def start_background_refresh(self, interval_seconds=None):
+        """주기적으로 목록을 갱신하는 데몬 스레드를 시작합니다. (이미 실행 중이면 무시)"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        interval = interval_seconds or self.ttl_seconds
+        self._stop_event.clear()
+
+        def _loop():
+            while not self._stop_event.wait(interval):
+                self.refresh(force=True)
+
+        self._refresh_thread = threading.Thread(target=_loop, name="voice-registry-periodic", daemon=True)
+        self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        self._stop_event.set()
+
+    # --- 조회 ---
+
+    def has_voices(self):
+        """메모리에 (오래됐더라도) 목록이 있어 get_voices()가 기다리지 않고 반환하는지 여부"""
+        return self._voices is not None
+
+    def get_voices(self):
+        """
+        캐시된 음성 목록을 반환합니다. 필요하면 스냅샷을 읽거나 원격 목록을 가져옵니다.
+
+        Returns:
+            tuple: (음성 목록 또는 None, 캐시 정보 dict)
+        """
+        if self._voices is None and not self._snapshot_loaded:
+            with self._refresh_lock:
+                if self._voices is None and not self._snapshot_loaded:
+                    self._load_snapshot()
+
+        if self._voices is None:
+            # 메모리/디스크 모두 비어 있으면 동기적으로 가져옴
+            self.stats["misses"] += 1
+            self.refresh(force=True)
+        else:
+            self._count_hit()
+        return self._cached_voices()
+
+    async def aget_voices(self):
+        """
+        get_voices()의 async 버전. 목록이 비어 있으면 스레드 풀을 거치지 않고 afetch_func를 직접 await 합니다.
+        (갱신 중인 스레드의 잠금을 기다리며 이벤트 루프를 막지 않도록 _refresh_lock은 잡지 않음)
+        """
+        if self._voices is None and not self._snapshot_loaded:
+            self._load_snapshot()
+
+        if self._voices is None:
+            self.stats["misses"] += 1
+            await self.arefresh(force=True)
+        else:
+            self._count_hit()
+        return self._cached_voices()
+
+    def _count_hit(self):
+        if self._age() >= self.ttl_seconds:
+            # 오래된 목록을 먼저 돌려주고 백그라운드에서 갱신
+            self.stats["stale_hits"] += 1
+            self._refresh_in_background()
+        else:
+            self.stats["hits"] += 1
+
+    def _cached_voices(self):
+        with self._lock:
+            voices = self._voices
+            info = {
+                "age_seconds": round(self._age(), 1) if voices is not None else None,
+                "stale": voices is not None and self._age() >= self.ttl_seconds,
+            }
+        return voices, info
+
+    def validate_voice_ids(self, character_voice_map):
+        """
+        character_voice_map의 모든 voice_id가 음성 목록에 있는지 한 번에 검증합니다.
+        목록에 없는 ID가 있으면, 새로 추가된 음성일 수 있으므로 (캐시가 충분히 오래된 경우) 한 번 강제 갱신 후 다시 확인합니다.
+
+        Args:
+            character_voice_map (dict): 등장인물 이름 → voice_id
+
+        Returns:
+            dict: {"checked": 검증 여부, "valid": 전체 유효 여부, "invalid": {등장인물: voice_id}}
+        """
+        voices, _ = self.get_voices()
+        if voices is None:
+            return {"checked": False, "valid": True, "invalid": {}}
+
+        def _invalid():
+            with self._lock:
+                known = self._voice_ids
+            return {name: voice_id for name, voice_id in character_voice_map.items() if voice_id not in known}
+
+        invalid = _invalid()
+        if invalid and self._age() >= self.min_revalidate_seconds:
+            self.refresh(force=True)
+            invalid = _invalid()
+        return {"checked": True, "valid": not invalid, "invalid": invalid}
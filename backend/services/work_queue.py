@@ -0,0 +1,414 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from services.text_storage_service import BASE_STORAGE_PATH
+from services.job_store import configure_sqlite
+from services.synthesis_scheduler import PRIORITY_WEIGHTS, PRIORITY_INTERACTIVE, current_schedule, scheduling
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 여러 노드의 워커가 함께 쓰는 작업 큐 (공유 저장소의 SQLite 파일. 노드 여러 대면 WORK_QUEUE_FILE을 공유 볼륨 경로로 지정)
+WORK_QUEUE_FILE = os.environ.get("WORK_QUEUE_FILE") or os.path.join(BASE_STORAGE_PATH, 'work_queue.sqlite3')
+# true면 세그먼트 합성 / 챕터 구조 분석을 큐에 게시하고 worker.py 프로세스들이 나눠서 처리
+WORK_QUEUE_ENABLED = os.environ.get("WORK_QUEUE_ENABLED", "false").lower() in ("1", "true", "yes")
+# 임대 기간 (초). 워커는 이 시간의 1/3마다 임대를 연장하며, 연장이 끊긴 항목(노드 종료 등)은 다른 워커가 다시 가져감
+WORK_LEASE_SECONDS = float(os.environ.get("WORK_LEASE_SECONDS", 60))
+# 임대가 만료되거나 실패한 항목을 다시 시도하는 최대 횟수
+WORK_MAX_ATTEMPTS = int(os.environ.get("WORK_MAX_ATTEMPTS", 3))
+# 큐가 비었을 때 / 배치 완료를 기다릴 때 확인 주기 (초)
+WORK_POLL_SECONDS = float(os.environ.get("WORK_POLL_SECONDS", 0.5))
+# 게시한 프로세스도 자기 배치 항목을 함께 처리할지 여부 (워커 노드가 하나도 없어도 책이 멈추지 않음)
+WORK_PUBLISHER_HELPS = os.environ.get("WORK_PUBLISHER_HELPS", "true").lower() in ("1", "true", "yes")
+
+ITEM_QUEUED = "queued"
+ITEM_LEASED = "leased"
+ITEM_DONE = "done"
+ITEM_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tenant TEXT NOT NULL DEFAULT '',
+    priority TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS work_items_status ON work_items (status, kind, item_id);
+CREATE INDEX IF NOT EXISTS work_items_batch ON work_items (batch_id, status);
+"""
+# 이전 버전 큐 파일에 없는 열 (사용자 / 우선순위별 공정 임대용)
+_ADDED_COLUMNS = {"tenant": "TEXT NOT NULL DEFAULT ''", "priority": "TEXT NOT NULL DEFAULT ''"}
+
+# kind → 처리 함수(payload dict → 결과 dict). 처리 함수가 예외를 던지면 실패로 기록하고 다시 시도
+_handlers = {}
+
+
+class NonRetryableError(Exception):
+    """다시 시도해도 같은 결과가 나오는 실패 (잘못된 요청 등). 처리 함수가 던지면 바로 실패로 기록합니다."""
+
+
+def register_handler(kind):
+    """작업 종류의 처리 함수를 등록하는 데코레이터. 큐를 쓰는 서비스 모듈에서 등록합니다."""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Lease:
+    """워커가 임대한 항목 하나. token이 맞아야 결과를 기록할 수 있음 (만료 후 다른 워커가 가져간 항목의 결과는 버림)"""
+
+    __slots__ = ("item_id", "batch_id", "kind", "payload", "tenant", "priority", "attempts", "token")
+
+    def __init__(self, row, token):
+        self.item_id = row["item_id"]
+        self.batch_id = row["batch_id"]
+        self.kind = row["kind"]
+        self.payload = json.loads(row["payload"])
+        self.tenant = row["tenant"] or None
+        self.priority = row["priority"] or None
+        self.attempts = row["attempts"] + 1
+        self.token = token
+
+
+class WorkQueue:
+    """
+    여러 노드의 워커가 공유하는 작업 큐.
+
+    - publish(): 작업 항목 여러 개를 하나의 배치로 게시
+    - lease(): 대기 중이거나 임대가 만료된 항목을 원자적으로(BEGIN IMMEDIATE) 가져가고 만료 시각을 기록
+    - renew(): 처리 중인 항목의 임대 연장 (생존 신호)
+    - complete() / fail(): 임대 토큰이 맞을 때만 결과 기록. 실패는 WORK_MAX_ATTEMPTS까지 다시 대기열로
+    - 만료된 임대는 다음 lease() 때 다른 워커가 가져가므로, 노드가 죽어도 배치가 멈추지 않음
+    """
+
+    def __init__(self, path=WORK_QUEUE_FILE, lease_seconds=WORK_LEASE_SECONDS, max_attempts=WORK_MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+
+    def _connection(self):
+        # sqlite3 연결은 스레드 / 프로세스(fork) 간에 공유하지 않음
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            # 여러 노드가 공유 볼륨의 같은 파일을 쓰므로 기본은 WAL이 아닌 롤백 저널 (SQLITE_JOURNAL_MODE)
+            configure_sqlite(conn)
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(work_items)")}
+            for name, definition in _ADDED_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE work_items ADD COLUMN {name} {definition}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # --- 게시 ---
+
+    def publish(self, kind, payloads, batch_id=None):
+        """
+        작업 항목들을 하나의 배치로 게시합니다. 현재 합성 스케줄러 컨텍스트의 사용자 / 우선순위 등급을 함께 기록합니다.
+
+        Returns:
+            tuple: (batch_id, 게시 순서대로의 item_id 리스트)
+        """
+        batch_id = batch_id or uuid.uuid4().hex
+        schedule = current_schedule()
+        priority = schedule.priority or PRIORITY_INTERACTIVE
+        conn = self._connection()
+        now = time.time()
+        item_ids = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for payload in payloads:
+                cursor = conn.execute(
+                    "INSERT INTO work_items (batch_id, kind, payload, status, tenant, priority, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (batch_id, kind, json.dumps(payload, ensure_ascii=False), ITEM_QUEUED, schedule.tenant, priority, now)
+                )
+                item_ids.append(cursor.lastrowid)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return batch_id, item_ids
+
+    # --- 임대 ---
+
+    def lease(self, owner, kinds=None, batch_id=None, limit=1):
+        """
+        처리할 항목을 최대 limit개 임대합니다. 임대가 만료된 항목도 대상이며, 시도 횟수를 넘긴 항목은 실패로 정리합니다.
+
+        항목은 flow(사용자, 우선순위 등급)마다 공정하게 나눠 줍니다. 지금 임대 중인 항목 수 / 등급 가중치가
+        가장 작은 flow의 가장 오래된 항목부터 가져가므로, 먼저 게시된 큰 책이 다른 사용자의 항목을 막지 않습니다.
+
+        Returns:
+            list: Lease 리스트 (없으면 빈 리스트)
+        """
+        conn = self._connection()
+        now = time.time()
+        condition = "(status = ? OR (status = ? AND lease_expires < ?))"
+        params = [ITEM_QUEUED, ITEM_LEASED, now]
+        if kinds:
+            condition += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params.extend(kinds)
+        if batch_id:
+            condition += " AND batch_id = ?"
+            params.append(batch_id)
+
+        leases = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for _ in range(limit):
+                flows = conn.execute(f"SELECT tenant, priority, MIN(item_id) AS first_item FROM work_items WHERE {condition} "
+                                     "GROUP BY tenant, priority", params).fetchall()
+                if not flows:
+                    break
+                active = {(row["tenant"], row["priority"]): row["n"] for row in conn.execute(
+                    "SELECT tenant, priority, COUNT(*) AS n FROM work_items WHERE status = ? AND lease_expires >= ? "
+                    "GROUP BY tenant, priority", (ITEM_LEASED, now)).fetchall()}
+                flow = min(flows, key=lambda f: ((active.get((f["tenant"], f["priority"]), 0) + 1) / PRIORITY_WEIGHTS.get(f["priority"], 1),
+                                                 f["first_item"]))
+                row = conn.execute("SELECT * FROM work_items WHERE item_id = ?", (flow["first_item"],)).fetchone()
+                if row["status"] == ITEM_LEASED:
+                    logger.warning(f"임대 만료 항목 회수: {row['item_id']} ({row['kind']}, 이전 워커 {row['lease_owner']})")
+                    if row["attempts"] >= self.max_attempts:
+                        conn.execute("UPDATE work_items SET status = ?, error = ?, finished_at = ?, lease_token = NULL WHERE item_id = ?",
+                                     (ITEM_FAILED, f"임대 만료 {row['attempts']}회 (워커 응답 없음)", now, row["item_id"]))
+                        continue
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE work_items SET status = ?, attempts = attempts + 1, lease_owner = ?, lease_token = ?, lease_expires = ? "
+                    "WHERE item_id = ?",
+                    (ITEM_LEASED, owner, token, now + self.lease_seconds, row["item_id"])
+                )
+                leases.append(Lease(row, token))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return leases
+
+    def renew(self, leases):
+        """
+        임대를 연장합니다.
+
+        Returns:
+            list: 임대를 잃은 (만료 후 다른 워커가 가져간) Lease 리스트
+        """
+        conn = self._connection()
+        expires = time.time() + self.lease_seconds
+        lost = []
+        for lease in leases:
+            cursor = conn.execute("UPDATE work_items SET lease_expires = ? WHERE item_id = ? AND lease_token = ? AND status = ?",
+                                  (expires, lease.item_id, lease.token, ITEM_LEASED))
+            if cursor.rowcount == 0:
+                lost.append(lease)
+        return lost
+
+    def complete(self, lease, result):
+        """결과를 기록합니다. 임대를 잃었으면 기록하지 않고 False를 반환합니다."""
+        cursor = self._connection().execute(
+            "UPDATE work_items SET status = ?, result = ?, error = NULL, finished_at = ?, lease_token = NULL "
+            "WHERE item_id = ? AND lease_token = ?",
+            (ITEM_DONE, json.dumps(result, ensure_ascii=False), time.time(), lease.item_id, lease.token)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, lease, error, retry=True):
+        """실패를 기록합니다. 시도 횟수가 남아 있으면 다시 대기열에 넣습니다. 임대를 잃었으면 False."""
+        retry = retry and lease.attempts < self.max_attempts
+        cursor = self._connection().execute(
+            "UPDATE work_items SET status = ?, error = ?, finished_at = ?, lease_token = NULL, lease_owner = NULL "
+            "WHERE item_id = ? AND lease_token = ?",
+            (ITEM_QUEUED if retry else ITEM_FAILED, error, None if retry else time.time(), lease.item_id, lease.token)
+        )
+        return cursor.rowcount == 1
+
+    # --- 배치 ---
+
+    def batch_counts(self, batch_id):
+        rows = self._connection().execute("SELECT status, COUNT(*) AS n FROM work_items WHERE batch_id = ? GROUP BY status",
+                                          (batch_id,)).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def batch_results(self, batch_id):
+        """
+        배치 항목의 결과 (item_id → {"status", "result", "error", "attempts"}). 끝난 항목만 포함합니다.
+        """
+        rows = self._connection().execute(
+            "SELECT item_id, status, result, error, attempts FROM work_items WHERE batch_id = ? AND status IN (?, ?)",
+            (batch_id, ITEM_DONE, ITEM_FAILED)
+        ).fetchall()
+        return {row["item_id"]: {
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+        } for row in rows}
+
+    def delete_batch(self, batch_id):
+        self._connection().execute("DELETE FROM work_items WHERE batch_id = ?", (batch_id,))
+
+    def get_stats(self):
+        conn = self._connection()
+        now = time.time()
+        counts = {row["status"]: row["n"] for row in
+                  conn.execute("SELECT status, COUNT(*) AS n FROM work_items GROUP BY status").fetchall()}
+        expired = conn.execute("SELECT COUNT(*) FROM work_items WHERE status = ? AND lease_expires < ?",
+                               (ITEM_LEASED, now)).fetchone()[0]
+        owners = [row[0] for row in conn.execute(
+            "SELECT DISTINCT lease_owner FROM work_items WHERE status = ? AND lease_expires >= ?", (ITEM_LEASED, now)).fetchall()]
+        return {"enabled": WORK_QUEUE_ENABLED, "items": counts, "expired_leases": expired, "active_workers": owners}
+
+
+class QueueWorker:
+    """
+    큐에서 항목을 임대해 처리하는 워커. worker.py 프로세스와, 배치를 게시한 프로세스(자기 배치만)가 사용합니다.
+    별도 스레드가 처리 중인 항목의 임대를 lease_seconds / 3마다 연장합니다.
+    """
+
+    def __init__(self, queue, concurrency=4, kinds=None, batch_id=None, owner=None):
+        self.queue = queue
+        self.concurrency = max(1, concurrency)
+        self.kinds = list(kinds) if kinds else None
+        self.batch_id = batch_id
+        self.owner = owner or worker_name()
+        self._active = {}
+        self._active_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.processed = 0
+
+    def stop(self):
+        self._stop.set()
+
+    def _renew_loop(self):
+        interval = max(0.1, self.queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            with self._active_lock:
+                leases = list(self._active.values())
+            if not leases:
+                continue
+            try:
+                for lease in self.queue.renew(leases):
+                    logger.warning(f"임대를 잃었습니다: 항목 {lease.item_id} ({lease.kind}). 결과는 기록되지 않습니다.")
+            except sqlite3.Error as e:
+                logger.warning(f"임대 연장 실패: {e}")
+
+    def _process(self, lease):
+        try:
+            handler = _handlers.get(lease.kind)
+            if handler is None:
+                raise LookupError(f"처리 함수가 등록되지 않은 작업 종류입니다: {lease.kind}")
+            # 게시한 사용자 / 등급으로 이 노드의 합성 스케줄러 순서를 받음
+            with scheduling(lease.tenant, lease.priority):
+                result = handler(lease.payload)
+            if not self.queue.complete(lease, result):
+                logger.warning(f"임대가 만료되어 결과를 버립니다: 항목 {lease.item_id}")
+        except Exception as e:
+            logger.error(f"작업 항목 처리 실패: {lease.item_id} ({lease.kind}, 시도 {lease.attempts}): {e}")
+            try:
+                self.queue.fail(lease, str(e), retry=not isinstance(e, NonRetryableError))
+            except sqlite3.Error as db_error:
+                logger.error(f"실패 기록 실패 ({lease.item_id}): {db_error}")
+        finally:
+            with self._active_lock:
+                self._active.pop(lease.item_id, None)
+            self.processed += 1
+
+    def run(self, until=None):
+        """
+        stop()이 호출되거나 until()이 True를 반환할 때까지 항목을 임대해 처리합니다.
+        처리 중인 항목이 concurrency개를 넘지 않도록 빈 자리만큼만 임대합니다.
+        """
+        renewer = threading.Thread(target=self._renew_loop, name="work-lease-renew", daemon=True)
+        renewer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="work") as executor:
+                while not self._stop.is_set():
+                    if until is not None and until():
+                        break
+                    with self._active_lock:
+                        free = self.concurrency - len(self._active)
+                    leases = []
+                    if free > 0:
+                        try:
+                            leases = self.queue.lease(self.owner, self.kinds, self.batch_id, free)
+                        except sqlite3.Error as e:
+                            logger.warning(f"작업 항목 임대 실패: {e}")
+                    for lease in leases:
+                        with self._active_lock:
+                            self._active[lease.item_id] = lease
+                        executor.submit(self._process, lease)
+                    if not leases:
+                        self._stop.wait(WORK_POLL_SECONDS)
+        finally:
+            self._stop.set()
+
+
+def run_batch(kind, payloads, concurrency=4, on_item_done=None):
+    """
+    항목들을 하나의 배치로 게시하고 모두 끝날 때까지 기다립니다.
+    WORK_PUBLISHER_HELPS이면 기다리는 동안 이 프로세스도 자기 배치 항목을 처리합니다.
+
+    Args:
+        kind (str): 작업 종류 (register_handler로 등록된 이름)
+        payloads (list): 항목별 payload dict
+        concurrency (int, optional): 이 프로세스에서 동시에 처리할 항목 수
+        on_item_done (callable, optional): 항목이 끝날 때마다 끝난 개수를 받아 호출 (진행률 보고용)
+
+    Returns:
+        list: payloads 순서대로 {"status", "result", "error", "attempts"}
+    """
+    if not payloads:
+        return []
+    batch_id, item_ids = work_queue.publish(kind, payloads)
+    total = len(item_ids)
+    reported = 0
+
+    def _finished():
+        nonlocal reported
+        counts = work_queue.batch_counts(batch_id)
+        done = counts.get(ITEM_DONE, 0) + counts.get(ITEM_FAILED, 0)
+        if on_item_done is not None and done > reported:
+            on_item_done(done - reported)
+        reported = done
+        return done >= total
+
+    try:
+        if WORK_PUBLISHER_HELPS:
+            QueueWorker(work_queue, concurrency=concurrency, batch_id=batch_id).run(until=_finished)
+        while not _finished():
+            time.sleep(WORK_POLL_SECONDS)
+        results = work_queue.batch_results(batch_id)
+    finally:
+        work_queue.delete_batch(batch_id)
+    return [results[item_id] for item_id in item_ids]
+
+
+# 프로세스 전체에서 공유되는 인스턴스
+work_queue = WorkQueue()
@@ -0,0 +1,102 @@
+import os
+import time
+import sqlite3
+import tempfile
+import unittest
+
+from services.work_queue import WorkQueue, ITEM_DONE, ITEM_FAILED, ITEM_LEASED, ITEM_QUEUED
+
+
+class WorkQueueLeaseTest(unittest.TestCase):
+    """임대 만료 후 회수와, 임대를 잃은 워커의 결과 기록 거부를 확인합니다."""
+
+    LEASE_SECONDS = 0.05
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "work_queue.sqlite3")
+        self.queue = WorkQueue(self.path, lease_seconds=self.LEASE_SECONDS, max_attempts=2)
+        self.batch_id, (self.item_id,) = self.queue.publish("test", [{"n": 1}])
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _row(self):
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        try:
+            return conn.execute("SELECT * FROM work_items WHERE item_id = ?", (self.item_id,)).fetchone()
+        finally:
+            conn.close()
+
+    def _expire(self):
+        time.sleep(self.LEASE_SECONDS * 2)
+
+    def test_live_lease_is_not_reclaimed(self):
+        self.queue.lease_seconds = 60
+        (lease,) = self.queue.lease("worker-a")
+        self.assertEqual(self.queue.lease("worker-b"), [])
+        self.assertTrue(self.queue.complete(lease, {"ok": True}))
+        self.assertEqual(self._row()["status"], ITEM_DONE)
+
+    def test_expired_lease_is_reclaimed_by_another_worker(self):
+        (stale,) = self.queue.lease("worker-a")
+        self._expire()
+        (fresh,) = self.queue.lease("worker-b")
+
+        self.assertEqual(fresh.item_id, stale.item_id)
+        self.assertNotEqual(fresh.token, stale.token)
+        self.assertEqual(fresh.attempts, 2)
+        row = self._row()
+        self.assertEqual((row["status"], row["lease_owner"]), (ITEM_LEASED, "worker-b"))
+
+    def test_stale_token_cannot_complete(self):
+        (stale,) = self.queue.lease("worker-a")
+        self._expire()
+        (fresh,) = self.queue.lease("worker-b")
+
+        self.assertFalse(self.queue.complete(stale, {"from": "a"}))
+        self.assertEqual(self._row()["status"], ITEM_LEASED)
+        self.assertTrue(self.queue.complete(fresh, {"from": "b"}))
+        results = self.queue.batch_results(self.batch_id)
+        self.assertEqual(results[self.item_id]["result"], {"from": "b"})
+
+    def test_stale_token_cannot_fail(self):
+        (stale,) = self.queue.lease("worker-a")
+        self._expire()
+        (fresh,) = self.queue.lease("worker-b")
+
+        self.assertFalse(self.queue.fail(stale, "late failure"))
+        row = self._row()
+        self.assertEqual((row["status"], row["lease_token"]), (ITEM_LEASED, fresh.token))
+        self.assertIsNone(row["error"])
+
+    def test_stale_token_cannot_renew(self):
+        (stale,) = self.queue.lease("worker-a")
+        self._expire()
+        self.queue.lease("worker-b")
+        self.assertEqual(self.queue.renew([stale]), [stale])
+
+    def test_expired_lease_fails_after_max_attempts(self):
+        self.queue.lease("worker-a")
+        self._expire()
+        self.queue.lease("worker-b")
+        self._expire()
+
+        self.assertEqual(self.queue.lease("worker-c"), [])
+        row = self._row()
+        self.assertEqual(row["status"], ITEM_FAILED)
+        self.assertIsNone(row["lease_token"])
+
+    def test_failed_item_is_requeued_until_max_attempts(self):
+        (first,) = self.queue.lease("worker-a")
+        self.assertTrue(self.queue.fail(first, "boom"))
+        self.assertEqual(self._row()["status"], ITEM_QUEUED)
+
+        (second,) = self.queue.lease("worker-a")
+        self.assertTrue(self.queue.fail(second, "boom"))
+        self.assertEqual(self._row()["status"], ITEM_FAILED)
+
+
+if __name__ == "__main__":
+    unittest.main()
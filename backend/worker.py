@@ -0,0 +1,52 @@
+"""
+분산 작업 워커 (노드 여러 대에서 세그먼트 합성 / 챕터 구조 분석을 나눠 처리).
+
+API 서버를 WORK_QUEUE_ENABLED=true로 실행하면 오디오북 생성과 챕터 파이프라인이 작업 항목을 공유 큐(WORK_QUEUE_FILE)에 게시합니다.
+이 스크립트는 큐에서 항목을 일정 시간 임대(WORK_LEASE_SECONDS)해 처리하고, 처리하는 동안 임대를 연장하며,
+결과 파일을 공유 저장소(APP_DATA_DIR)에 기록합니다. 워커가 죽어 임대가 만료된 항목은 다른 워커가 다시 가져갑니다.
+
+모든 노드는 같은 APP_DATA_DIR(공유 볼륨)과 WORK_QUEUE_FILE을 보고, 시계가 동기화되어 있어야 합니다.
+API 할당량(ELEVENLABS_MAX_CONCURRENCY 등)은 워커 프로세스마다 따로 적용됩니다.
+
+사용 예 (backend 폴더에서):
+    python worker.py --concurrency 4
+    python worker.py --kinds synthesize_segment --concurrency 8
+"""
+import sys
+import signal
+import logging
+import argparse
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="오디오북 분산 작업 워커")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 처리할 항목 수")
+    parser.add_argument("--kinds", default="", help="처리할 작업 종류 (쉼표 구분, 기본값: 전체)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # 처리 함수 등록 (chapter_service가 elevenlabs_service도 불러옴)
+    import services.chapter_service  # noqa: F401
+    from services.work_queue import QueueWorker, work_queue
+
+    kinds = [kind.strip() for kind in args.kinds.split(",") if kind.strip()] or None
+    worker = QueueWorker(work_queue, concurrency=args.concurrency, kinds=kinds)
+
+    def _stop(signum, frame):
+        # 새 항목은 임대하지 않고, 처리 중인 항목이 끝나면 종료
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+    print(f"작업 워커 시작: {worker.owner} (동시 {worker.concurrency}개, 큐 {work_queue.path})", flush=True)
+    worker.run()
+    print(f"작업 워커 종료: 처리한 항목 {worker.processed}개", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
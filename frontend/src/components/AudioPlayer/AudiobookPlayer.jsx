@@ -36,7 +36,8 @@ const AudiobookPlayer = ({ fileId, title, onBack }) => {
           generated_segments = 0, 
           total_segments = 0, 
           audio_files = [],
-          segment_texts = {}
+          segment_texts = {},
+          segment_versions = {}
         } = statusData;
         
         console.log('세그먼트 텍스트:', segment_texts);
@@ -82,7 +83,7 @@ const AudiobookPlayer = ({ fileId, title, onBack }) => {
           const segmentNumber = parseInt(filename.split('.')[0]);
           return {
             id: segmentNumber,
-            url: apiService.getAudioFileUrl(fileId, segmentNumber),
+            url: apiService.getAudioFileUrl(fileId, segmentNumber, segment_versions?.[filename]),
             order: segmentNumber,
             filename: filename,
             text: segment_texts?.[filename] || "대사 내용 없음"
@@ -255,6 +256,14 @@ const AudiobookPlayer = ({ fileId, title, onBack }) => {
         return;
       }
       
+      // 다시 생성된 세그먼트는 새 버전 URL과 텍스트로 교체
+      const versions = statusData.segment_versions || {};
+      const texts = statusData.segment_texts || {};
+      setAudioSegments(prev => prev.map(segment => {
+        const url = apiService.getAudioFileUrl(fileId, segment.order, versions[segment.filename]);
+        return url === segment.url ? segment : { ...segment, url, text: texts[segment.filename] || segment.text };
+      }));
+      
       toast.showInfo('최신 상태입니다.', 'REFRESH_STATUS');
       setIsLoading(false);
       setStatusMessage('오디오북 상태가 최신입니다.');
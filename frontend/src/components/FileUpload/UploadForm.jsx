@@ -3,7 +3,7 @@ import { useDropzone } from 'react-dropzone';
 import Button from '../UI/Button';
 import StatusMessage from '../UI/StatusMessage';
 
-const MAX_FILE_SIZE_BYTES = 10 * 1024 * 1024; // 10MB
+const MAX_FILE_SIZE_BYTES = 200 * 1024 * 1024; // 200MB (서버 MAX_UPLOAD_MB와 맞춤)
 const ALLOWED_FILE_TYPE = 'text/plain';
 
 const UploadForm = ({ onFileSelect, selectedFile, fileError, isUploading }) => {
@@ -77,7 +77,7 @@ const UploadForm = ({ onFileSelect, selectedFile, fileError, isUploading }) => {
             TXT 파일을 이곳에 끌어다 놓거나 클릭하여 업로드하세요.
           </p>
           <p className="sub-text">
-            최대 10MB 크기의 TXT 파일을 지원합니다.
+            최대 200MB 크기의 TXT 파일(UTF-8, CP949/EUC-KR)을 지원합니다.
           </p>
         </div>
       </div>
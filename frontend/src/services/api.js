@@ -129,6 +129,50 @@ const apiService = {
     }
   },
   
+  // 등장인물 분석 + 구조 분석 + 성우 매칭을 한 번에 실행 (단계별 소요 시간 포함)
+  runAnalysisPipeline: async (fileId, options = {}) => {
+    try {
+      const response = await apiClient.post(`/pipeline/${fileId}`, options);
+      return response.data;
+    } catch (error) {
+      console.error(`분석 파이프라인 실행 실패 (fileId ${fileId}):`, error);
+      throw extractErrorInfo(error);
+    }
+  },
+
+  // 챕터 나누기 (chapters를 주면 사용자 지정 챕터 사용)
+  detectChapters: async (fileId, chapters = null) => {
+    try {
+      const response = await apiClient.post(`/chapters/${fileId}/detect`, chapters ? { chapters } : {});
+      return response.data;
+    } catch (error) {
+      console.error(`챕터 나누기 실패 (fileId ${fileId}):`, error);
+      throw extractErrorInfo(error);
+    }
+  },
+
+  // 챕터별 처리 상태 조회
+  getChapters: async (fileId) => {
+    try {
+      const response = await apiClient.get(`/chapters/${fileId}`);
+      return response.data;
+    } catch (error) {
+      console.error(`챕터 상태 조회 실패 (fileId ${fileId}):`, error);
+      throw extractErrorInfo(error);
+    }
+  },
+
+  // 챕터별 분석/오디오 생성 시작 (백그라운드)
+  processChapters: async (fileId, options = {}) => {
+    try {
+      const response = await apiClient.post(`/chapters/${fileId}/process`, options);
+      return response.data;
+    } catch (error) {
+      console.error(`챕터 처리 시작 실패 (fileId ${fileId}):`, error);
+      throw extractErrorInfo(error);
+    }
+  },
+
   // 매칭 결과 조회
   getCharacterVoiceMapping: async (fileId) => {
     try {
@@ -195,9 +239,37 @@ const apiService = {
     }
   },
 
-  // 오디오 파일 URL 가져오기
-  getAudioFileUrl: (fileId, segmentId) => {
-    return `${apiClient.defaults.baseURL}/audiobook/files/${fileId}/${segmentId}`;
+  // 세그먼트 하나만 수정하여 다시 생성
+  regenerateSegment: async (fileId, order, edits = {}) => {
+    try {
+      const response = await apiClient.post(`/audiobook/segments/${fileId}/${order}`, edits);
+      return response.data;
+    } catch (error) {
+      console.error(`세그먼트 재생성 실패 (fileId: ${fileId}, order: ${order}):`, error);
+      throw extractErrorInfo(error);
+    }
+  },
+
+  // 등장인물 성우 변경 (해당 인물의 대사만 다시 생성)
+  recastCharacters: async (fileId, characterVoiceMap) => {
+    try {
+      const response = await apiClient.post(`/audiobook/recast/${fileId}`, { character_voice_map: characterVoiceMap });
+      return response.data;
+    } catch (error) {
+      console.error(`성우 변경 실패 (fileId: ${fileId}):`, error);
+      throw extractErrorInfo(error);
+    }
+  },
+
+  // 오디오 파일 URL 가져오기 (version이 바뀌면 브라우저 캐시 대신 새 파일을 받음)
+  getAudioFileUrl: (fileId, segmentId, version = null) => {
+    const url = `${apiClient.defaults.baseURL}/audiobook/files/${fileId}/${segmentId}`;
+    return version ? `${url}?v=${version}` : url;
+  },
+
+  // 챕터 오디오 파일 URL 가져오기
+  getChapterAudioFileUrl: (fileId, chapterIndex, segmentId) => {
+    return `${apiClient.defaults.baseURL}/chapters/${fileId}/${chapterIndex}/audio/${segmentId}`;
   }
 };
 